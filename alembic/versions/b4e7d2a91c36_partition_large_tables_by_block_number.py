@@ -0,0 +1,91 @@
+"""Partition large tables by block number
+
+Revision ID: b4e7d2a91c36
+Revises: 5c5375de15fd
+Create Date: 2026-10-18 10:12:44.512083
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b4e7d2a91c36"
+down_revision = "5c5375de15fd"
+branch_labels = None
+depends_on = None
+
+# must match BLOCK_PARTITION_SIZE in mev_inspect.crud.shared
+BLOCK_PARTITION_SIZE = 100_000
+
+PRIMARY_KEYS = {
+    "classified_traces": ["block_number", "transaction_hash", "trace_address"],
+    "transfers": ["block_number", "transaction_hash", "trace_address"],
+    "swaps": ["block_number", "transaction_hash", "trace_address"],
+    "miner_payments": ["block_number", "transaction_hash"],
+}
+
+
+def upgrade():
+    # existing rows aren't moved, the old table becomes the partition for
+    # every block up to the first partition boundary after its last block
+    # partitions for later blocks are created by the writers as needed
+    for table_name, primary_key in PRIMARY_KEYS.items():
+        legacy_table_name = f"{table_name}_legacy"
+        last_block_number = (
+            op.get_bind().execute(f"SELECT MAX(block_number) FROM {table_name}")
+        ).scalar()
+
+        op.execute(f"ALTER TABLE {table_name} RENAME TO {legacy_table_name}")
+        op.execute(f"ALTER INDEX {table_name}_pkey RENAME TO {legacy_table_name}_pkey")
+
+        op.execute(
+            f"""
+            CREATE TABLE {table_name}
+                (LIKE {legacy_table_name} INCLUDING DEFAULTS)
+                PARTITION BY RANGE (block_number)
+            """
+        )
+        op.create_primary_key(f"{table_name}_pkey", table_name, primary_key)
+
+        if last_block_number is None:
+            op.drop_table(legacy_table_name)
+            continue
+
+        legacy_before_block_number = (
+            int(last_block_number) // BLOCK_PARTITION_SIZE + 1
+        ) * BLOCK_PARTITION_SIZE
+
+        # a matching check constraint lets the attach skip its own scan
+        op.execute(
+            f"""
+            ALTER TABLE {legacy_table_name}
+                ADD CONSTRAINT {legacy_table_name}_range
+                CHECK (block_number < {legacy_before_block_number})
+            """
+        )
+        op.execute(
+            f"""
+            ALTER TABLE {table_name}
+                ATTACH PARTITION {legacy_table_name}
+                FOR VALUES FROM (MINVALUE) TO ({legacy_before_block_number})
+            """
+        )
+        op.execute(
+            f"ALTER TABLE {legacy_table_name} DROP CONSTRAINT {legacy_table_name}_range"
+        )
+
+
+def downgrade():
+    for table_name, primary_key in PRIMARY_KEYS.items():
+        unpartitioned_table_name = f"{table_name}_unpartitioned"
+
+        op.execute(
+            f"""
+            CREATE TABLE {unpartitioned_table_name}
+                (LIKE {table_name} INCLUDING DEFAULTS)
+            """
+        )
+        op.execute(f"INSERT INTO {unpartitioned_table_name} SELECT * FROM {table_name}")
+
+        op.drop_table(table_name)
+        op.execute(f"ALTER TABLE {unpartitioned_table_name} RENAME TO {table_name}")
+        op.create_primary_key(f"{table_name}_pkey", table_name, primary_key)
@@ -0,0 +1,51 @@
+"""Create block prices table
+
+Revision ID: c2f9a6d4e871
+Revises: b4e7d2a91c36
+Create Date: 2026-10-18 11:03:27.846201
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c2f9a6d4e871"
+down_revision = "b4e7d2a91c36"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "block_prices",
+        sa.Column("block_number", sa.Numeric, nullable=False),
+        sa.Column("token_address", sa.String(256), nullable=False),
+        sa.Column("usd_price", sa.Numeric, nullable=False),
+        sa.PrimaryKeyConstraint("block_number", "token_address"),
+    )
+
+    # finds the blocks whose prices change when new prices are written
+    op.create_index("ix_blocks_block_timestamp", "blocks", ["block_timestamp"])
+
+    op.execute(
+        """
+        INSERT INTO block_prices (block_number, token_address, usd_price)
+        SELECT b.block_number, t.token_address, p.usd_price
+        FROM blocks b
+        CROSS JOIN (SELECT DISTINCT token_address FROM prices) t
+        CROSS JOIN LATERAL (
+            SELECT usd_price
+            FROM prices
+            WHERE
+                token_address = t.token_address
+                AND timestamp <= b.block_timestamp
+            ORDER BY timestamp DESC
+            LIMIT 1
+        ) p
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_blocks_block_timestamp", "blocks")
+    op.drop_table("block_prices")
@@ -3,19 +3,44 @@ import logging
 import os
 import sys
 from datetime import datetime
+from typing import List, Optional
 
 import click
 import dramatiq
 
+from mev_inspect.abi import build_abi_registry
+from mev_inspect.block_cache import (
+    BLOCK_CACHE_DIR_ENV,
+    DEFAULT_BLOCK_CACHE_MAX_SIZE_BYTES,
+)
+from mev_inspect.block_files import BlockFileSource
+from mev_inspect.classifiers.trace import DEFAULT_DECODE_CACHE_SIZE
 from mev_inspect.concurrency import coro
 from mev_inspect.crud.prices import write_prices
+from mev_inspect.crud.summary import update_summary_for_block_range
 from mev_inspect.db import get_inspect_session, get_trace_session
-from mev_inspect.inspector import MEVInspector
-from mev_inspect.prices import fetch_prices, fetch_prices_range
+from mev_inspect.inspector import (
+    DEFAULT_INITIAL_CONCURRENCY,
+    DEFAULT_MAX_CONCURRENCY,
+    MEVInspector,
+)
+from mev_inspect.pipeline import DEFAULT_QUEUE_SIZE
+from mev_inspect.prices import (
+    DEFAULT_PRICE_FETCH_CONCURRENCY,
+    DEFAULT_REQUEST_BURST,
+    DEFAULT_REQUESTS_PER_SECOND,
+    PRICE_CACHE_DIR_ENV,
+    PriceCache,
+    TokenBucket,
+    fetch_prices,
+    fetch_prices_range,
+)
+from mev_inspect.provider import DEFAULT_RPC_BATCH_SIZE
 from mev_inspect.queue.broker import connect_broker
 from mev_inspect.queue.tasks import (
     LOW_PRIORITY,
     LOW_PRIORITY_QUEUE,
+    backfill_export_range_task,
     backfill_export_task,
     inspect_many_blocks_task,
 )
@@ -72,34 +97,212 @@ async def fetch_block_command(block_number: int, rpc: str):
 @click.option(
     "--max-concurrency",
     type=int,
-    help="maximum number of concurrent connections",
-    default=5,
+    help="maximum number of blocks to fetch at a time",
+    default=DEFAULT_MAX_CONCURRENCY,
+)
+@click.option(
+    "--initial-concurrency",
+    type=int,
+    help="number of blocks' worth of RPC requests to start with",
+    default=DEFAULT_INITIAL_CONCURRENCY,
+)
+@click.option(
+    "--adaptive-concurrency/--fixed-concurrency",
+    help="adapt RPC concurrency to the node, or always fetch "
+    "--max-concurrency blocks at a time",
+    default=True,
 )
 @click.option(
     "--request-timeout", type=int, help="timeout for requests to nodes", default=500
 )
+@click.option(
+    "--decode-cache-size",
+    type=int,
+    help="number of decoded calls to cache per ABI, 0 to disable",
+    default=DEFAULT_DECODE_CACHE_SIZE,
+)
+@click.option(
+    "--classifier-workers",
+    type=int,
+    help="number of processes to classify blocks in, 0 to classify in the event loop",
+    default=0,
+)
+@click.option(
+    "--queue-size",
+    type=int,
+    help="maximum number of blocks waiting between fetch, classify and write",
+    default=DEFAULT_QUEUE_SIZE,
+)
+@click.option(
+    "--rpc-batch-size",
+    type=int,
+    help="maximum number of RPC requests to send in one JSON-RPC batch",
+    default=DEFAULT_RPC_BATCH_SIZE,
+)
+@click.option(
+    "--rpc-hedge-after-seconds",
+    type=float,
+    help="with several comma separated --rpc endpoints, "
+    "also send requests slower than this to a second endpoint",
+    default=None,
+)
+@click.option(
+    "--block-cache-dir",
+    help="directory to cache raw blocks in, unset to disable",
+    default=lambda: os.environ.get(BLOCK_CACHE_DIR_ENV),
+)
+@click.option(
+    "--block-cache-max-size-bytes",
+    type=int,
+    help="size the block cache is evicted down to",
+    default=DEFAULT_BLOCK_CACHE_MAX_SIZE_BYTES,
+)
+@click.option(
+    "--from-dir",
+    type=click.Path(exists=True, file_okay=False),
+    help="read blocks from <block_number>.json files instead of the node",
+    default=None,
+)
+@click.option(
+    "--from-archive",
+    type=click.Path(exists=True, dir_okay=False),
+    help="read blocks from a zip or uncompressed tar archive "
+    "of <block_number>.json files",
+    default=None,
+)
 @coro
 async def inspect_many_blocks_command(
     after_block: int,
     before_block: int,
     rpc: str,
     max_concurrency: int,
+    initial_concurrency: int,
+    adaptive_concurrency: bool,
     request_timeout: int,
+    decode_cache_size: int,
+    classifier_workers: int,
+    queue_size: int,
+    rpc_batch_size: int,
+    rpc_hedge_after_seconds: Optional[float],
+    block_cache_dir: Optional[str],
+    block_cache_max_size_bytes: int,
+    from_dir: Optional[str],
+    from_archive: Optional[str],
 ):
+    if from_dir is not None and from_archive is not None:
+        raise click.UsageError("Use only one of --from-dir and --from-archive")
+
+    block_files_path = from_dir if from_dir is not None else from_archive
+    block_source = (
+        BlockFileSource(block_files_path) if block_files_path is not None else None
+    )
+
+    if block_source is not None:
+        missing_block_numbers = [
+            block_number
+            for block_number in range(after_block, before_block)
+            if block_number not in block_source
+        ]
+
+        if missing_block_numbers:
+            block_source.close()
+            raise click.UsageError(
+                f"{block_files_path} is missing {len(missing_block_numbers)} blocks: "
+                + _format_block_numbers(missing_block_numbers)
+            )
+
     inspect_db_session = get_inspect_session()
-    trace_db_session = get_trace_session()
+    trace_db_session = get_trace_session() if block_source is None else None
 
     inspector = MEVInspector(
         rpc,
         max_concurrency=max_concurrency,
+        initial_concurrency=initial_concurrency,
+        adaptive_concurrency=adaptive_concurrency,
         request_timeout=request_timeout,
+        decode_cache_size=decode_cache_size,
+        classifier_workers=classifier_workers,
+        queue_size=queue_size,
+        rpc_batch_size=rpc_batch_size,
+        rpc_hedge_after_seconds=rpc_hedge_after_seconds,
+        block_cache_dir=block_cache_dir,
+        block_cache_max_size_bytes=block_cache_max_size_bytes,
     )
-    await inspector.inspect_many_blocks(
-        inspect_db_session=inspect_db_session,
-        trace_db_session=trace_db_session,
-        after_block=after_block,
-        before_block=before_block,
+
+    try:
+        await inspector.inspect_many_blocks(
+            inspect_db_session=inspect_db_session,
+            trace_db_session=trace_db_session,
+            after_block=after_block,
+            before_block=before_block,
+            block_source=block_source,
+        )
+    finally:
+        inspector.close()
+
+        if block_source is not None:
+            block_source.close()
+
+
+@cli.command()
+@click.argument("after_block", type=int)
+@click.argument("before_block", type=int)
+@click.option("--rpc", default=lambda: os.environ.get(RPC_URL_ENV, ""))
+@click.option(
+    "--block-cache-dir",
+    help="directory to cache raw blocks in",
+    default=lambda: os.environ.get(BLOCK_CACHE_DIR_ENV, ""),
+)
+@click.option(
+    "--block-cache-max-size-bytes",
+    type=int,
+    help="size the block cache is evicted down to",
+    default=DEFAULT_BLOCK_CACHE_MAX_SIZE_BYTES,
+)
+@click.option(
+    "--max-concurrency",
+    type=int,
+    help="maximum number of blocks to fetch at a time",
+    default=DEFAULT_MAX_CONCURRENCY,
+)
+@click.option(
+    "--rpc-batch-size",
+    type=int,
+    help="maximum number of RPC requests to send in one JSON-RPC batch",
+    default=DEFAULT_RPC_BATCH_SIZE,
+)
+@coro
+async def prewarm_block_cache_command(
+    after_block: int,
+    before_block: int,
+    rpc: str,
+    block_cache_dir: str,
+    block_cache_max_size_bytes: int,
+    max_concurrency: int,
+    rpc_batch_size: int,
+):
+    if not block_cache_dir:
+        raise click.UsageError(
+            f"--block-cache-dir or {BLOCK_CACHE_DIR_ENV} is required"
+        )
+
+    trace_db_session = get_trace_session()
+
+    inspector = MEVInspector(
+        rpc,
+        max_concurrency=max_concurrency,
+        rpc_batch_size=rpc_batch_size,
+        block_cache_dir=block_cache_dir,
+        block_cache_max_size_bytes=block_cache_max_size_bytes,
     )
+    try:
+        await inspector.prewarm_block_cache(
+            trace_db_session=trace_db_session,
+            after_block=after_block,
+            before_block=before_block,
+        )
+    finally:
+        inspector.close()
 
 
 @cli.command()
@@ -150,14 +353,39 @@ def enqueue_many_blocks_command(start_block: int, end_block: int, batch_size: in
 
 
 @cli.command()
-def fetch_all_prices():
+@click.option(
+    "--price-cache-dir",
+    help="directory to cache fetched prices in, unset to disable",
+    default=lambda: os.environ.get(PRICE_CACHE_DIR_ENV),
+)
+@click.option(
+    "--max-concurrency",
+    type=int,
+    help="maximum number of tokens to fetch prices for at once",
+    default=DEFAULT_PRICE_FETCH_CONCURRENCY,
+)
+@click.option(
+    "--requests-per-second",
+    type=float,
+    help="sustained rate of price API requests",
+    default=DEFAULT_REQUESTS_PER_SECOND,
+)
+@coro
+async def fetch_all_prices(
+    price_cache_dir: Optional[str],
+    max_concurrency: int,
+    requests_per_second: float,
+):
     inspect_db_session = get_inspect_session()
 
     logger.info("Fetching prices")
-    prices = fetch_prices()
-
-    logger.info("Writing prices")
-    write_prices(inspect_db_session, prices)
+    async for prices in fetch_prices(
+        price_cache=PriceCache(price_cache_dir) if price_cache_dir else None,
+        max_concurrency=max_concurrency,
+        rate_limiter=TokenBucket(requests_per_second, DEFAULT_REQUEST_BURST),
+    ):
+        logger.info(f"Writing {len(prices)} prices")
+        write_prices(inspect_db_session, prices)
 
 
 @cli.command()
@@ -177,17 +405,20 @@ def enqueue_s3_export(block_number: int):
 @cli.command()
 @click.argument("after_block", type=int)
 @click.argument("before_block", type=int)
-def enqueue_many_s3_exports(after_block: int, before_block: int):
+@click.argument("batch_size", type=int, default=1000)
+def enqueue_many_s3_exports(after_block: int, before_block: int, batch_size: int):
     broker = connect_broker()
-    export_actor = dramatiq.actor(
-        backfill_export_task,
+    export_range_actor = dramatiq.actor(
+        backfill_export_range_task,
         broker=broker,
         queue_name=LOW_PRIORITY_QUEUE,
         priority=LOW_PRIORITY,
     )
     logger.info(f"Sending blocks {after_block} to {before_block} to queue")
-    for block_number in range(after_block, before_block):
-        export_actor.send(block_number)
+    for batch_after_block in range(after_block, before_block, batch_size):
+        batch_before_block = min(batch_after_block + batch_size, before_block)
+        logger.info(f"Sending {batch_after_block} to {batch_before_block}")
+        export_range_actor.send(batch_after_block, batch_before_block)
 
 
 @cli.command()
@@ -201,19 +432,74 @@ def s3_export(block_number: int):
 @cli.command()
 @click.argument("after", type=click.DateTime(formats=["%Y-%m-%d", "%m-%d-%Y"]))
 @click.argument("before", type=click.DateTime(formats=["%Y-%m-%d", "%m-%d-%Y"]))
-def fetch_range(after: datetime, before: datetime):
+@click.option(
+    "--price-cache-dir",
+    help="directory to cache fetched prices in, unset to disable",
+    default=lambda: os.environ.get(PRICE_CACHE_DIR_ENV),
+)
+@click.option(
+    "--max-concurrency",
+    type=int,
+    help="maximum number of tokens to fetch prices for at once",
+    default=DEFAULT_PRICE_FETCH_CONCURRENCY,
+)
+@click.option(
+    "--requests-per-second",
+    type=float,
+    help="sustained rate of price API requests",
+    default=DEFAULT_REQUESTS_PER_SECOND,
+)
+@coro
+async def fetch_range(
+    after: datetime,
+    before: datetime,
+    price_cache_dir: Optional[str],
+    max_concurrency: int,
+    requests_per_second: float,
+):
     inspect_db_session = get_inspect_session()
 
     logger.info("Fetching prices")
-    prices = fetch_prices_range(after, before)
+    async for prices in fetch_prices_range(
+        after,
+        before,
+        price_cache=PriceCache(price_cache_dir) if price_cache_dir else None,
+        max_concurrency=max_concurrency,
+        rate_limiter=TokenBucket(requests_per_second, DEFAULT_REQUEST_BURST),
+    ):
+        logger.info(f"Writing {len(prices)} prices")
+        write_prices(inspect_db_session, prices)
 
-    logger.info("Writing prices")
-    write_prices(inspect_db_session, prices)
+
+@cli.command()
+@click.argument("after_block", type=int)
+@click.argument("before_block", type=int)
+def update_summary_command(after_block: int, before_block: int):
+    inspect_db_session = get_inspect_session()
+
+    logger.info(f"Updating summary for blocks {after_block} to {before_block}")
+    update_summary_for_block_range(inspect_db_session, after_block, before_block)
+    inspect_db_session.commit()
+
+
+@cli.command()
+def build_abi_registry_command():
+    logger.info("Building ABI registry")
+    build_abi_registry()
 
 
 def get_rpc_url() -> str:
     return os.environ["RPC_URL"]
 
 
+def _format_block_numbers(block_numbers: List[int], limit: int = 10) -> str:
+    formatted = ", ".join(str(block_number) for block_number in block_numbers[:limit])
+
+    if len(block_numbers) > limit:
+        formatted += ", ..."
+
+    return formatted
+
+
 if __name__ == "__main__":
     cli()
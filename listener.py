@@ -12,6 +12,7 @@ from mev_inspect.crud.latest_block_update import (
     update_latest_block,
 )
 from mev_inspect.db import get_inspect_session, get_trace_session
+from mev_inspect.http_session import get_shared_http_session, log_connection_stats
 from mev_inspect.inspector import MEVInspector
 from mev_inspect.provider import get_base_provider
 from mev_inspect.queue.broker import connect_broker
@@ -65,6 +66,9 @@ async def run():
             export_actor,
         )
 
+    log_connection_stats()
+    await get_shared_http_session().close()
+
     logger.info("Stopping...")
 
 
@@ -112,11 +116,14 @@ async def inspect_next_block(
 async def ping_healthcheck_url(url):
     retry_options = ExponentialRetry(attempts=3)
 
-    async with RetryClient(
-        raise_for_status=False, retry_options=retry_options
-    ) as client:
-        async with client.get(url) as _response:
-            pass
+    # reuses the RPC connection pool, so the client is not closed here
+    client = RetryClient(
+        client_session=get_shared_http_session().get_session(),
+        raise_for_status=False,
+        retry_options=retry_options,
+    )
+    async with client.get(url) as _response:
+        pass
 
 
 if __name__ == "__main__":
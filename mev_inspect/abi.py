@@ -1,14 +1,24 @@
 import json
+import logging
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic import parse_obj_as
 
-from mev_inspect.schemas.abi import ABI
+from mev_inspect.schemas.abi import (
+    ABI,
+    ABIFunctionDescription,
+    CompiledABI,
+    CompiledABIFunction,
+)
 from mev_inspect.schemas.traces import Protocol
 
 THIS_FILE_DIRECTORY = Path(__file__).parents[0]
 ABI_DIRECTORY_PATH = THIS_FILE_DIRECTORY / "abis"
+ABI_REGISTRY_PATH = THIS_FILE_DIRECTORY / "abi_registry.json"
+
+logger = logging.getLogger(__name__)
 
 
 def get_abi_path(abi_name: str, protocol: Optional[Protocol]) -> Optional[Path]:
@@ -37,8 +47,93 @@ def get_raw_abi(abi_name: str, protocol: Optional[Protocol]) -> Optional[str]:
 def get_abi(abi_name: str, protocol: Optional[Protocol]) -> Optional[ABI]:
     abi_path = get_abi_path(abi_name, protocol)
     if abi_path is not None:
-        with abi_path.open() as abi_file:
-            abi_json = json.load(abi_file)
-            return parse_obj_as(ABI, abi_json)
+        return _load_abi(abi_path)
 
     return None
+
+
+def compile_abi(abi: ABI) -> CompiledABI:
+    return [
+        CompiledABIFunction.from_description(description)
+        for description in abi
+        if isinstance(description, ABIFunctionDescription)
+    ]
+
+
+def get_compiled_abi(
+    abi_name: str, protocol: Optional[Protocol]
+) -> Optional[CompiledABI]:
+    """
+    Returns the compiled ABI from the registry built by build_abi_registry
+    if it is up to date, otherwise compiles it from the JSON ABI
+    """
+    abi_path = get_abi_path(abi_name, protocol)
+    if abi_path is None:
+        return None
+
+    registry = _load_abi_registry()
+    if registry is not None:
+        compiled_abi = registry.get(_get_registry_key(abi_path))
+        if compiled_abi is not None:
+            return compiled_abi
+
+    return compile_abi(_load_abi(abi_path))
+
+
+def build_abi_registry() -> None:
+    registry = {
+        _get_registry_key(abi_path): [
+            function.dict() for function in compile_abi(_load_abi(abi_path))
+        ]
+        for abi_path in _get_all_abi_paths()
+    }
+
+    with ABI_REGISTRY_PATH.open("w") as registry_file:
+        json.dump(registry, registry_file, separators=(",", ":"))
+
+    _load_abi_registry.cache_clear()
+
+
+@lru_cache(maxsize=1)
+def _load_abi_registry() -> Optional[Dict[str, CompiledABI]]:
+    if not _is_abi_registry_fresh():
+        return None
+
+    try:
+        with ABI_REGISTRY_PATH.open() as registry_file:
+            registry_json = json.load(registry_file)
+    except (OSError, ValueError):
+        logger.warning("Could not read ABI registry, falling back to JSON ABIs")
+        return None
+
+    # built from our own ABIs by build_abi_registry, so skip validation
+    return {
+        key: [CompiledABIFunction.construct(**function) for function in functions]
+        for key, functions in registry_json.items()
+    }
+
+
+def _is_abi_registry_fresh() -> bool:
+    if not ABI_REGISTRY_PATH.is_file():
+        return False
+
+    registry_modified_at = ABI_REGISTRY_PATH.stat().st_mtime
+
+    return all(
+        abi_path.stat().st_mtime <= registry_modified_at
+        for abi_path in _get_all_abi_paths()
+    )
+
+
+def _get_all_abi_paths() -> List[Path]:
+    return sorted(ABI_DIRECTORY_PATH.glob("**/*.json"))
+
+
+def _get_registry_key(abi_path: Path) -> str:
+    return abi_path.relative_to(ABI_DIRECTORY_PATH).with_suffix("").as_posix()
+
+
+def _load_abi(abi_path: Path) -> ABI:
+    with abi_path.open() as abi_file:
+        abi_json = json.load(abi_file)
+        return parse_obj_as(ABI, abi_json)
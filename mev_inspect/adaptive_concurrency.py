@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Coroutine, Deque, Dict, Optional
+
+from aiohttp.client_exceptions import ClientResponseError
+from web3 import Web3
+from web3.types import RPCEndpoint, RPCResponse
+
+DEFAULT_DECREASE_FACTOR = 0.5
+
+# responses slower than this many times their method's average are a
+# sign of an overloaded node
+DEFAULT_LATENCY_TOLERANCE = 5.0
+
+# responses faster than this are never considered slow
+MIN_SLOW_RESPONSE_SECONDS = 0.1
+
+# weight of the latest response in each method's average latency
+LATENCY_SMOOTHING = 0.1
+
+CONGESTION_STATUS_CODES = (429, 503)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConcurrencyStats:
+    limit: int
+    in_flight: int
+    increases: int = 0
+    decreases: int = 0
+    timeouts: int = 0
+    rate_limited: int = 0
+    slow_responses: int = 0
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits concurrent requests with additive increase, multiplicative decrease
+
+    While the limit is in use and responses are healthy, it grows by one
+    for every limit requests that succeed. A timeout, a 429 or 503 response,
+    or a response much slower than usual for its method cuts it by
+    decrease_factor. Requests started before the last cut don't cut it
+    again, so a burst of failures from one overloaded moment counts once.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        max_limit: int,
+        min_limit: int = 1,
+        decrease_factor: float = DEFAULT_DECREASE_FACTOR,
+        latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+    ):
+        if not min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                f"Initial limit {initial_limit} must be "
+                f"between {min_limit} and {max_limit}"
+            )
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self._last_decrease_at = 0.0
+        self._latencies_by_method: Dict[str, float] = {}
+        self._stats = ConcurrencyStats(limit=initial_limit, in_flight=0)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    async def acquire(self) -> float:
+        """Waits for a free slot and returns when the request started"""
+        while self._in_flight >= self.limit:
+            waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.cancelled():
+                    # pass on the slot this waiter was woken up for
+                    self._wake_waiters()
+                raise
+
+        self._in_flight += 1
+        return time.monotonic()
+
+    def release(
+        self,
+        method: str,
+        started_at: float,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        self._in_flight -= 1
+        latency_seconds = time.monotonic() - started_at
+
+        if error is not None:
+            if isinstance(error, asyncio.TimeoutError):
+                self._stats.timeouts += 1
+                self._decrease(started_at, "timeout")
+            elif _is_rate_limited(error):
+                self._stats.rate_limited += 1
+                self._decrease(started_at, "rate limit")
+        else:
+            average_latency_seconds = self._latencies_by_method.get(method)
+
+            if average_latency_seconds is None:
+                self._latencies_by_method[method] = latency_seconds
+            else:
+                self._latencies_by_method[method] += LATENCY_SMOOTHING * (
+                    latency_seconds - average_latency_seconds
+                )
+
+            if (
+                average_latency_seconds is not None
+                and latency_seconds > MIN_SLOW_RESPONSE_SECONDS
+                and latency_seconds > self.latency_tolerance * average_latency_seconds
+            ):
+                self._stats.slow_responses += 1
+                self._decrease(started_at, f"slow {method}")
+            else:
+                self._increase()
+
+        self._wake_waiters()
+
+    def get_stats(self) -> ConcurrencyStats:
+        return ConcurrencyStats(
+            limit=self.limit,
+            in_flight=self._in_flight,
+            increases=self._stats.increases,
+            decreases=self._stats.decreases,
+            timeouts=self._stats.timeouts,
+            rate_limited=self._stats.rate_limited,
+            slow_responses=self._stats.slow_responses,
+        )
+
+    def log_stats(self) -> None:
+        stats = self.get_stats()
+        logger.info(
+            f"RPC concurrency limit: {stats.limit} of {self.max_limit}, "
+            f"increased {stats.increases} times, decreased {stats.decreases} "
+            f"times after {stats.timeouts} timeouts, "
+            f"{stats.rate_limited} rate limits "
+            f"and {stats.slow_responses} slow responses"
+        )
+
+    def _increase(self) -> None:
+        # only grow a limit that is actually in use
+        if self._in_flight + 1 < self.limit or self._limit >= self.max_limit:
+            return
+
+        previous_limit = self.limit
+        self._limit = min(self._limit + 1 / self._limit, float(self.max_limit))
+
+        if self.limit > previous_limit:
+            self._stats.increases += 1
+            logger.debug(f"Raised RPC concurrency limit to {self.limit}")
+
+    def _decrease(self, started_at: float, reason: str) -> None:
+        if started_at < self._last_decrease_at:
+            return
+
+        self._limit = max(self._limit * self.decrease_factor, float(self.min_limit))
+        self._last_decrease_at = time.monotonic()
+        self._stats.decreases += 1
+        logger.info(f"Lowered RPC concurrency limit to {self.limit} after {reason}")
+
+    def _wake_waiters(self) -> None:
+        free_slots = self.limit - self._in_flight
+
+        while free_slots > 0 and len(self._waiters) > 0:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free_slots -= 1
+
+
+async def adaptive_concurrency_middleware(
+    make_request: Callable[[RPCEndpoint, Any], Any],
+    web3: Web3,  # pylint: disable=unused-argument
+    limiter: AdaptiveConcurrencyLimiter,
+) -> Callable[[RPCEndpoint, Any], Coroutine[Any, Any, RPCResponse]]:
+    """
+    Creates middleware that runs requests under the limiter. Add it after
+    the retry middleware so every attempt takes its own slot.
+    """
+
+    async def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+        started_at = await limiter.acquire()
+
+        try:
+            response = await make_request(method, params)
+        except BaseException as e:
+            limiter.release(method, started_at, error=e)
+            raise
+
+        limiter.release(method, started_at)
+        return response
+
+    return middleware
+
+
+def get_adaptive_concurrency_middleware(
+    limiter: AdaptiveConcurrencyLimiter,
+) -> Callable[..., Coroutine[Any, Any, Any]]:
+    async def middleware(
+        make_request: Callable[[RPCEndpoint, Any], Any], web3: Web3
+    ) -> Callable[[RPCEndpoint, Any], Coroutine[Any, Any, RPCResponse]]:
+        return await adaptive_concurrency_middleware(make_request, web3, limiter)
+
+    return middleware
+
+
+def _is_rate_limited(error: BaseException) -> bool:
+    return (
+        isinstance(error, ClientResponseError)
+        and error.status in CONGESTION_STATUS_CODES
+    )
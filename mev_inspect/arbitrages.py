@@ -1,5 +1,5 @@
 from itertools import groupby
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 from mev_inspect.schemas.arbitrages import Arbitrage
 from mev_inspect.schemas.swaps import Swap
@@ -7,8 +7,55 @@ from mev_inspect.utils import equal_within_percent
 
 MAX_TOKEN_AMOUNT_PERCENT_DIFFERENCE = 0.01
 
+# None searches routes of any length
+DEFAULT_MAX_ROUTE_LENGTH: Optional[int] = None
 
-def get_arbitrages(swaps: List[Swap]) -> List[Arbitrage]:
+
+class _SwapGraph:
+    """
+    Adjacency index over the swaps of a transaction
+
+    A swap can only be followed by swaps taking its output token, so swaps
+    are indexed by their input token and by the addresses a previous swap
+    can connect through.
+    """
+
+    def __init__(self, swaps: List[Swap]):
+        self.swaps = swaps
+        self._indexes_by_token_and_from: Dict[Tuple[str, str], List[int]] = {}
+        self._indexes_by_token_and_contract: Dict[Tuple[str, str], List[int]] = {}
+
+        for index, swap in enumerate(swaps):
+            self._indexes_by_token_and_from.setdefault(
+                (swap.token_in_address, swap.from_address), []
+            ).append(index)
+            self._indexes_by_token_and_contract.setdefault(
+                (swap.token_in_address, swap.contract_address), []
+            ).append(index)
+
+    def get_next_swap_indexes(self, swap_out: Swap) -> List[int]:
+        token = swap_out.token_out_address
+        candidate_indexes = set(
+            self._indexes_by_token_and_from.get((token, swap_out.contract_address), [])
+        )
+        candidate_indexes.update(
+            self._indexes_by_token_and_contract.get((token, swap_out.to_address), [])
+        )
+        candidate_indexes.update(
+            self._indexes_by_token_and_from.get((token, swap_out.to_address), [])
+        )
+
+        return [
+            index
+            for index in sorted(candidate_indexes)
+            if _swap_outs_match_swap_ins(swap_out, self.swaps[index])
+        ]
+
+
+def get_arbitrages(
+    swaps: List[Swap],
+    max_route_length: Optional[int] = DEFAULT_MAX_ROUTE_LENGTH,
+) -> List[Arbitrage]:
     get_transaction_hash = lambda swap: swap.transaction_hash
     swaps_by_transaction = groupby(
         sorted(swaps, key=get_transaction_hash),
@@ -20,12 +67,16 @@ def get_arbitrages(swaps: List[Swap]) -> List[Arbitrage]:
     for _, transaction_swaps in swaps_by_transaction:
         all_arbitrages += _get_arbitrages_from_swaps(
             list(transaction_swaps),
+            max_route_length=max_route_length,
         )
 
     return all_arbitrages
 
 
-def _get_arbitrages_from_swaps(swaps: List[Swap]) -> List[Arbitrage]:
+def _get_arbitrages_from_swaps(
+    swaps: List[Swap],
+    max_route_length: Optional[int] = DEFAULT_MAX_ROUTE_LENGTH,
+) -> List[Arbitrage]:
     """
     An arbitrage is defined as multiple swaps in a series that result in the initial token being returned
     to the initial sender address.
@@ -48,14 +99,21 @@ def _get_arbitrages_from_swaps(swaps: List[Swap]) -> List[Arbitrage]:
     if len(start_ends) == 0:
         return []
 
-    used_swaps: List[Swap] = []
+    swap_graph = _SwapGraph(swaps)
+    used_swap_ids: Set[int] = set()
 
     for (start, ends) in start_ends:
-        if start in used_swaps:
+        if id(start) in used_swap_ids:
             continue
 
-        unused_ends = [end for end in ends if end not in used_swaps]
-        route = _get_shortest_route(start, unused_ends, swaps)
+        unused_ends = [end for end in ends if id(end) not in used_swap_ids]
+        route = _get_shortest_route(
+            start,
+            unused_ends,
+            swaps,
+            max_route_length=max_route_length,
+            swap_graph=swap_graph,
+        )
 
         if route is not None:
             start_amount = route[0].token_in_amount
@@ -79,7 +137,7 @@ def _get_arbitrages_from_swaps(swaps: List[Swap]) -> List[Arbitrage]:
             )
 
             all_arbitrages.append(arb)
-            used_swaps.extend(route)
+            used_swap_ids.update(id(swap) for swap in route)
 
     if len(all_arbitrages) == 1:
         return all_arbitrages
@@ -96,52 +154,87 @@ def _get_shortest_route(
     end_swaps: List[Swap],
     all_swaps: List[Swap],
     max_route_length: Optional[int] = None,
+    swap_graph: Optional[_SwapGraph] = None,
 ) -> Optional[List[Swap]]:
+    """
+    Breadth first search from start_swap through all_swaps to any of end_swaps
+
+    Neighbours are visited in the order of all_swaps, so among routes of the
+    same length the first one in that order wins
+    """
     if len(end_swaps) == 0:
         return None
 
     if max_route_length is not None and max_route_length < 2:
         return None
 
-    for end_swap in end_swaps:
-        if _swap_outs_match_swap_ins(start_swap, end_swap):
-            return [start_swap, end_swap]
+    end_swap = _get_matching_end_swap(start_swap, end_swaps)
+    if end_swap is not None:
+        return [start_swap, end_swap]
 
-    if max_route_length is not None and max_route_length == 2:
-        return None
+    if swap_graph is None:
+        swap_graph = _SwapGraph(all_swaps)
 
-    other_swaps = [
-        swap for swap in all_swaps if (swap is not start_swap and swap not in end_swaps)
-    ]
+    excluded_swap_ids = {id(start_swap)} | {id(end_swap) for end_swap in end_swaps}
+    visited_indexes: Set[int] = set()
+    previous_indexes: Dict[int, Optional[int]] = {}
 
-    if len(other_swaps) == 0:
-        return None
+    current_level: List[Tuple[Optional[int], Swap]] = [(None, start_swap)]
+    route_length = 2
 
-    shortest_remaining_route = None
-    max_remaining_route_length = (
-        None if max_route_length is None else max_route_length - 1
-    )
+    while len(current_level) > 0:
+        route_length += 1
+        if max_route_length is not None and route_length > max_route_length:
+            return None
 
-    for next_swap in other_swaps:
-        if _swap_outs_match_swap_ins(start_swap, next_swap):
-            shortest_from_next = _get_shortest_route(
-                next_swap,
-                end_swaps,
-                other_swaps,
-                max_route_length=max_remaining_route_length,
-            )
+        next_level: List[Tuple[Optional[int], Swap]] = []
 
-            if shortest_from_next is not None and (
-                shortest_remaining_route is None
-                or len(shortest_from_next) < len(shortest_remaining_route)
-            ):
-                shortest_remaining_route = shortest_from_next
-                max_remaining_route_length = len(shortest_from_next) - 1
+        for current_index, current_swap in current_level:
+            for next_index in swap_graph.get_next_swap_indexes(current_swap):
+                next_swap = swap_graph.swaps[next_index]
 
-    if shortest_remaining_route is None:
-        return None
-    else:
-        return [start_swap] + shortest_remaining_route
+                if next_index in visited_indexes or id(next_swap) in excluded_swap_ids:
+                    continue
+
+                visited_indexes.add(next_index)
+                previous_indexes[next_index] = current_index
+
+                end_swap = _get_matching_end_swap(next_swap, end_swaps)
+                if end_swap is not None:
+                    return (
+                        [start_swap]
+                        + _get_route_to(next_index, previous_indexes, swap_graph)
+                        + [end_swap]
+                    )
+
+                next_level.append((next_index, next_swap))
+
+        current_level = next_level
+
+    return None
+
+
+def _get_matching_end_swap(swap: Swap, end_swaps: List[Swap]) -> Optional[Swap]:
+    for end_swap in end_swaps:
+        if _swap_outs_match_swap_ins(swap, end_swap):
+            return end_swap
+
+    return None
+
+
+def _get_route_to(
+    index: int,
+    previous_indexes: Dict[int, Optional[int]],
+    swap_graph: _SwapGraph,
+) -> List[Swap]:
+    route: List[Swap] = []
+    current_index: Optional[int] = index
+
+    while current_index is not None:
+        route.append(swap_graph.swaps[current_index])
+        current_index = previous_indexes[current_index]
+
+    return list(reversed(route))
 
 
 def _get_all_start_end_swaps(swaps: List[Swap]) -> List[Tuple[Swap, List[Swap]]]:
@@ -152,22 +245,30 @@ def _get_all_start_end_swaps(swaps: List[Swap]) -> List[Tuple[Swap, List[Swap]]]
     - not swap[start].from_address in all_pool_addresses
     - not swap[end].to_address in all_pool_addresses
     """
-    pool_addrs = [swap.contract_address for swap in swaps]
+    pool_addrs = {swap.contract_address for swap in swaps}
     valid_start_ends: List[Tuple[Swap, List[Swap]]] = []
 
+    end_indexes_by_token_and_to: Dict[Tuple[str, str], List[int]] = {}
+    for index, swap in enumerate(swaps):
+        end_indexes_by_token_and_to.setdefault(
+            (swap.token_out_address, swap.to_address), []
+        ).append(index)
+
     for index, potential_start_swap in enumerate(swaps):
-        ends_for_start: List[Swap] = []
-        remaining_swaps = swaps[:index] + swaps[index + 1 :]
-
-        for potential_end_swap in remaining_swaps:
-            if (
-                potential_start_swap.token_in_address
-                == potential_end_swap.token_out_address
-                and potential_start_swap.from_address == potential_end_swap.to_address
-                and not potential_start_swap.from_address in pool_addrs
-            ):
-
-                ends_for_start.append(potential_end_swap)
+        if potential_start_swap.from_address in pool_addrs:
+            continue
+
+        ends_for_start = [
+            swaps[end_index]
+            for end_index in end_indexes_by_token_and_to.get(
+                (
+                    potential_start_swap.token_in_address,
+                    potential_start_swap.from_address,
+                ),
+                [],
+            )
+            if end_index != index
+        ]
 
         if len(ends_for_start) > 0:
             valid_start_ends.append((potential_start_swap, ends_for_start))
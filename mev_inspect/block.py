@@ -1,10 +1,12 @@
 import asyncio
 import logging
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
 
 from sqlalchemy import orm
 from web3 import Web3
 
+from mev_inspect.block_cache import BlockCache
 from mev_inspect.fees import fetch_base_fee_per_gas
 from mev_inspect.schemas.blocks import Block
 from mev_inspect.schemas.receipts import Receipt
@@ -13,6 +15,8 @@ from mev_inspect.utils import hex_to_int
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 async def get_latest_block_number(base_provider) -> int:
     latest_block = await base_provider.make_request(
@@ -23,21 +27,70 @@ async def get_latest_block_number(base_provider) -> int:
     return hex_to_int(latest_block["result"]["number"])
 
 
+@dataclass
+class TraceDBBlocks:
+    """Block data found in the trace DB for a range of blocks, by block number"""
+
+    block_timestamps: Dict[int, int] = field(default_factory=dict)
+    block_receipts: Dict[int, List[Receipt]] = field(default_factory=dict)
+    block_traces: Dict[int, List[Trace]] = field(default_factory=dict)
+    base_fees_per_gas: Dict[int, int] = field(default_factory=dict)
+
+
 async def create_from_block_number(
     w3: Web3,
     block_number: int,
     trace_db_session: Optional[orm.Session],
+    trace_db_blocks: Optional[TraceDBBlocks] = None,
+    block_cache: Optional[BlockCache] = None,
 ) -> Block:
+    """
+    Returns the block from block_cache if it's there. Otherwise builds it from
+    trace_db_blocks if given, or from the trace DB, and fetches whatever is
+    missing from the node
+    """
+    if block_cache is not None:
+        cached_block = block_cache.get(block_number)
+        if cached_block is not None:
+            return cached_block
+
+    if trace_db_blocks is None:
+        trace_db_blocks = (
+            find_block_range(trace_db_session, block_number, block_number + 1)
+            if trace_db_session is not None
+            else TraceDBBlocks()
+        )
+
     block_timestamp, receipts, traces, base_fee_per_gas = await asyncio.gather(
-        _find_or_fetch_block_timestamp(w3, block_number, trace_db_session),
-        _find_or_fetch_block_receipts(w3, block_number, trace_db_session),
-        _find_or_fetch_block_traces(w3, block_number, trace_db_session),
-        _find_or_fetch_base_fee_per_gas(w3, block_number, trace_db_session),
+        _find_or_fetch(
+            trace_db_blocks.block_timestamps,
+            block_number,
+            _fetch_block_timestamp,
+            w3,
+        ),
+        _find_or_fetch(
+            trace_db_blocks.block_receipts,
+            block_number,
+            _fetch_block_receipts,
+            w3,
+        ),
+        _find_or_fetch(
+            trace_db_blocks.block_traces,
+            block_number,
+            _fetch_block_traces,
+            w3,
+        ),
+        _find_or_fetch(
+            trace_db_blocks.base_fees_per_gas,
+            block_number,
+            fetch_base_fee_per_gas,
+            w3,
+        ),
     )
 
     miner_address = _get_miner_address_from_traces(traces)
 
-    return Block(
+    block = Block(
         block_number=block_number,
         block_timestamp=block_timestamp,
         miner=miner_address,
@@ -46,59 +99,88 @@ async def create_from_block_number(
         receipts=receipts,
     )
 
+    if block_cache is not None:
+        block_cache.put(block)
 
-async def _find_or_fetch_block_timestamp(
-    w3,
-    block_number: int,
-    trace_db_session: Optional[orm.Session],
-) -> int:
-    if trace_db_session is not None:
-        existing_block_timestamp = _find_block_timestamp(trace_db_session, block_number)
-        if existing_block_timestamp is not None:
-            return existing_block_timestamp
+    return block
 
-    return await _fetch_block_timestamp(w3, block_number)
 
-
-async def _find_or_fetch_block_receipts(
-    w3,
-    block_number: int,
+async def create_from_block_range(
+    w3: Web3,
+    after_block_number: int,
+    before_block_number: int,
     trace_db_session: Optional[orm.Session],
-) -> List[Receipt]:
-    if trace_db_session is not None:
-        existing_block_receipts = _find_block_receipts(trace_db_session, block_number)
-        if existing_block_receipts is not None:
-            return existing_block_receipts
+    block_cache: Optional[BlockCache] = None,
+) -> List[Block]:
+    trace_db_blocks = (
+        find_block_range(trace_db_session, after_block_number, before_block_number)
+        if trace_db_session is not None
+        and not is_block_range_cached(
+            block_cache, after_block_number, before_block_number
+        )
+        else TraceDBBlocks()
+    )
 
-    return await _fetch_block_receipts(w3, block_number)
+    return list(
+        await asyncio.gather(
+            *[
+                create_from_block_number(
+                    w3,
+                    block_number,
+                    trace_db_session,
+                    trace_db_blocks=trace_db_blocks,
+                    block_cache=block_cache,
+                )
+                for block_number in range(after_block_number, before_block_number)
+            ]
+        )
+    )
 
 
-async def _find_or_fetch_block_traces(
-    w3,
-    block_number: int,
-    trace_db_session: Optional[orm.Session],
-) -> List[Trace]:
-    if trace_db_session is not None:
-        existing_block_traces = _find_block_traces(trace_db_session, block_number)
-        if existing_block_traces is not None:
-            return existing_block_traces
+def is_block_range_cached(
+    block_cache: Optional[BlockCache],
+    after_block_number: int,
+    before_block_number: int,
+) -> bool:
+    return block_cache is not None and all(
+        block_number in block_cache
+        for block_number in range(after_block_number, before_block_number)
+    )
 
-    return await _fetch_block_traces(w3, block_number)
+
+def find_block_range(
+    trace_db_session: orm.Session,
+    after_block_number: int,
+    before_block_number: int,
+) -> TraceDBBlocks:
+    """Loads [after_block_number, before_block_number) with one query per table"""
+    return TraceDBBlocks(
+        block_timestamps=_find_block_timestamps(
+            trace_db_session, after_block_number, before_block_number
+        ),
+        block_receipts=_find_block_receipts(
+            trace_db_session, after_block_number, before_block_number
+        ),
+        block_traces=_find_block_traces(
+            trace_db_session, after_block_number, before_block_number
+        ),
+        base_fees_per_gas=_find_base_fees_per_gas(
+            trace_db_session, after_block_number, before_block_number
+        ),
+    )
 
 
-async def _find_or_fetch_base_fee_per_gas(
-    w3,
+async def _find_or_fetch(
+    found_values: Dict[int, T],
     block_number: int,
-    trace_db_session: Optional[orm.Session],
-) -> int:
-    if trace_db_session is not None:
-        existing_base_fee_per_gas = _find_base_fee_per_gas(
-            trace_db_session, block_number
-        )
-        if existing_base_fee_per_gas is not None:
-            return existing_base_fee_per_gas
+    fetch: Callable[[Web3, int], Awaitable[T]],
+    w3: Web3,
+) -> T:
+    found_value = found_values.get(block_number)
+    if found_value is not None:
+        return found_value
 
-    return await fetch_base_fee_per_gas(w3, block_number)
+    return await fetch(w3, block_number)
 
 
 async def _fetch_block_timestamp(w3, block_number: int) -> int:
@@ -116,68 +198,90 @@ async def _fetch_block_traces(w3, block_number: int) -> List[Trace]:
     return [Trace(**trace_json) for trace_json in traces_json]
 
 
-def _find_block_timestamp(
+def _find_block_timestamps(
     trace_db_session: orm.Session,
-    block_number: int,
-) -> Optional[int]:
-    result = trace_db_session.execute(
-        "SELECT block_timestamp FROM block_timestamps WHERE block_number = :block_number",
-        params={"block_number": block_number},
-    ).one_or_none()
-
-    if result is None:
-        return None
-    else:
-        (block_timestamp,) = result
-        return block_timestamp
+    after_block_number: int,
+    before_block_number: int,
+) -> Dict[int, int]:
+    return {
+        block_number: block_timestamp
+        for block_number, block_timestamp in _stream_block_range(
+            trace_db_session,
+            "SELECT block_number, block_timestamp FROM block_timestamps",
+            after_block_number,
+            before_block_number,
+        )
+    }
 
 
 def _find_block_traces(
     trace_db_session: orm.Session,
-    block_number: int,
-) -> Optional[List[Trace]]:
-    result = trace_db_session.execute(
-        "SELECT raw_traces FROM block_traces WHERE block_number = :block_number",
-        params={"block_number": block_number},
-    ).one_or_none()
-
-    if result is None:
-        return None
-    else:
-        (traces_json,) = result
-        return [Trace(**trace_json) for trace_json in traces_json]
+    after_block_number: int,
+    before_block_number: int,
+) -> Dict[int, List[Trace]]:
+    return {
+        block_number: [Trace(**trace_json) for trace_json in traces_json]
+        for block_number, traces_json in _stream_block_range(
+            trace_db_session,
+            "SELECT block_number, raw_traces FROM block_traces",
+            after_block_number,
+            before_block_number,
+        )
+    }
 
 
 def _find_block_receipts(
     trace_db_session: orm.Session,
-    block_number: int,
-) -> Optional[List[Receipt]]:
-    result = trace_db_session.execute(
-        "SELECT raw_receipts FROM block_receipts WHERE block_number = :block_number",
-        params={"block_number": block_number},
-    ).one_or_none()
+    after_block_number: int,
+    before_block_number: int,
+) -> Dict[int, List[Receipt]]:
+    return {
+        block_number: [Receipt(**receipt) for receipt in receipts_json]
+        for block_number, receipts_json in _stream_block_range(
+            trace_db_session,
+            "SELECT block_number, raw_receipts FROM block_receipts",
+            after_block_number,
+            before_block_number,
+        )
+    }
 
-    if result is None:
-        return None
-    else:
-        (receipts_json,) = result
-        return [Receipt(**receipt) for receipt in receipts_json]
+
+def _find_base_fees_per_gas(
+    trace_db_session: orm.Session,
+    after_block_number: int,
+    before_block_number: int,
+) -> Dict[int, int]:
+    return {
+        block_number: base_fee
+        for block_number, base_fee in _stream_block_range(
+            trace_db_session,
+            "SELECT block_number, base_fee_in_wei FROM base_fee",
+            after_block_number,
+            before_block_number,
+        )
+    }
 
 
-def _find_base_fee_per_gas(
+def _stream_block_range(
     trace_db_session: orm.Session,
-    block_number: int,
-) -> Optional[int]:
-    result = trace_db_session.execute(
-        "SELECT base_fee_in_wei FROM base_fee WHERE block_number = :block_number",
-        params={"block_number": block_number},
-    ).one_or_none()
-
-    if result is None:
-        return None
-    else:
-        (base_fee,) = result
-        return base_fee
+    select_query: str,
+    after_block_number: int,
+    before_block_number: int,
+):
+    # stream_results uses a server side cursor, so rows are parsed as they arrive
+    return trace_db_session.execute(
+        f"""
+        {select_query}
+        WHERE
+            block_number >= :after_block_number AND
+            block_number < :before_block_number
+        """,
+        params={
+            "after_block_number": after_block_number,
+            "before_block_number": before_block_number,
+        },
+        execution_options={"stream_results": True},
+    )
 
 
 def _get_miner_address_from_traces(traces: List[Trace]) -> Optional[str]:
@@ -0,0 +1,215 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from mev_inspect.schemas.blocks import Block
+
+BLOCK_CACHE_DIR_ENV = "BLOCK_CACHE_DIR"
+
+DEFAULT_BLOCK_CACHE_MAX_SIZE_BYTES = 50 * 1024**3
+DEFAULT_SEGMENT_SIZE_BYTES = 256 * 1024**2
+
+INDEX_FILENAME = "index.sqlite"
+
+logger = logging.getLogger(__name__)
+
+
+class BlockCache:
+    """
+    On-disk cache of raw blocks: traces, receipts, timestamp and base fee
+
+    Blocks are stored as zlib compressed JSON appended to segment files. The
+    index maps each block number to where its payload lives and the payload's
+    sha256 digest, which every read is checked against.
+
+    Segments are rotated at segment_size_bytes. Once the cache is over
+    max_size_bytes, the least recently read segments are deleted along with
+    the blocks in them. The segment being written to is never evicted.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_size_bytes: int = DEFAULT_BLOCK_CACHE_MAX_SIZE_BYTES,
+        segment_size_bytes: int = DEFAULT_SEGMENT_SIZE_BYTES,
+    ):
+        self.directory = Path(directory)
+        self.max_size_bytes = max_size_bytes
+        self.segment_size_bytes = segment_size_bytes
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._index = sqlite3.connect(
+            str(self.directory / INDEX_FILENAME),
+            check_same_thread=False,
+        )
+        self._create_index_tables()
+
+    def __contains__(self, block_number: int) -> bool:
+        with self._lock:
+            return self._find_location(block_number) is not None
+
+    def get(self, block_number: int) -> Optional[Block]:
+        with self._lock:
+            location = self._find_location(block_number)
+            if location is None:
+                return None
+
+            digest, segment_id, offset, length = location
+
+            try:
+                with self._get_segment_path(segment_id).open("rb") as segment_file:
+                    segment_file.seek(offset)
+                    payload = segment_file.read(length)
+            except OSError:
+                payload = b""
+
+            if hashlib.sha256(payload).hexdigest() != digest:
+                logger.warning(f"Dropping corrupt cached block {block_number}")
+                self._delete_block(block_number)
+                return None
+
+            with self._index:
+                self._index.execute(
+                    "UPDATE segments SET last_used_at = ? WHERE id = ?",
+                    (time.time(), segment_id),
+                )
+
+        return Block.parse_raw(zlib.decompress(payload))
+
+    def put(self, block: Block) -> None:
+        payload = zlib.compress(block.json().encode())
+        digest = hashlib.sha256(payload).hexdigest()
+
+        with self._lock:
+            location = self._find_location(block.block_number)
+            if location is not None and location[0] == digest:
+                return
+
+            segment_id, offset = self._append(payload)
+
+            with self._index:
+                self._index.execute(
+                    "INSERT OR REPLACE INTO blocks "
+                    "(block_number, digest, segment_id, offset, length) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (block.block_number, digest, segment_id, offset, len(payload)),
+                )
+                self._index.execute(
+                    "UPDATE segments SET size = ?, last_used_at = ? WHERE id = ?",
+                    (offset + len(payload), time.time(), segment_id),
+                )
+
+            self._evict()
+
+    def get_size_bytes(self) -> int:
+        with self._lock:
+            (size,) = self._index.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM segments"
+            ).fetchone()
+            return size
+
+    def close(self) -> None:
+        with self._lock:
+            self._index.close()
+
+    def _create_index_tables(self) -> None:
+        with self._index:
+            self._index.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                "id INTEGER PRIMARY KEY, size INTEGER NOT NULL, "
+                "last_used_at REAL NOT NULL)"
+            )
+            self._index.execute(
+                "CREATE TABLE IF NOT EXISTS blocks ("
+                "block_number INTEGER PRIMARY KEY, digest TEXT NOT NULL, "
+                "segment_id INTEGER NOT NULL, offset INTEGER NOT NULL, "
+                "length INTEGER NOT NULL)"
+            )
+            self._index.execute(
+                "CREATE INDEX IF NOT EXISTS blocks_segment_id_idx "
+                "ON blocks (segment_id)"
+            )
+
+    def _find_location(self, block_number: int) -> Optional[Tuple[str, int, int, int]]:
+        return self._index.execute(
+            "SELECT digest, segment_id, offset, length "
+            "FROM blocks WHERE block_number = ?",
+            (block_number,),
+        ).fetchone()
+
+    def _delete_block(self, block_number: int) -> None:
+        with self._index:
+            self._index.execute(
+                "DELETE FROM blocks WHERE block_number = ?", (block_number,)
+            )
+
+    def _append(self, payload: bytes) -> Tuple[int, int]:
+        segment_id = self._get_active_segment_id()
+
+        with self._get_segment_path(segment_id).open("ab") as segment_file:
+            offset = segment_file.tell()
+            segment_file.write(payload)
+
+        return segment_id, offset
+
+    def _get_active_segment_id(self) -> int:
+        latest_segment = self._index.execute(
+            "SELECT id, size FROM segments ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+
+        if latest_segment is not None:
+            segment_id, size = latest_segment
+            if size < self.segment_size_bytes:
+                return segment_id
+
+        segment_id = 1 if latest_segment is None else latest_segment[0] + 1
+
+        with self._index:
+            self._index.execute(
+                "INSERT INTO segments (id, size, last_used_at) VALUES (?, 0, ?)",
+                (segment_id, time.time()),
+            )
+
+        return segment_id
+
+    def _evict(self) -> None:
+        (total_size,) = self._index.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM segments"
+        ).fetchone()
+
+        if total_size <= self.max_size_bytes:
+            return
+
+        (active_segment_id,) = self._index.execute(
+            "SELECT MAX(id) FROM segments"
+        ).fetchone()
+
+        evictable_segments = self._index.execute(
+            "SELECT id, size FROM segments WHERE id != ? ORDER BY last_used_at, id",
+            (active_segment_id,),
+        ).fetchall()
+
+        for segment_id, size in evictable_segments:
+            if total_size <= self.max_size_bytes:
+                break
+
+            with self._index:
+                self._index.execute(
+                    "DELETE FROM blocks WHERE segment_id = ?", (segment_id,)
+                )
+                self._index.execute("DELETE FROM segments WHERE id = ?", (segment_id,))
+
+            self._get_segment_path(segment_id).unlink(missing_ok=True)
+            total_size -= size
+
+            logger.info(f"Evicted block cache segment {segment_id}")
+
+    def _get_segment_path(self, segment_id: int) -> Path:
+        return self.directory / f"segment-{segment_id:06d}.bin"
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import tarfile
+import threading
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Union
+
+from mev_inspect.schemas.blocks import Block
+
+BLOCK_FILE_SUFFIX = ".json"
+
+
+class BlockFileSource:
+    """
+    Reads blocks from <block_number>.json dumps, as printed by fetch-block
+
+    path can be a directory, searched recursively, a zip archive or an
+    uncompressed tar archive. Files are indexed by block number up front
+    and only read when their block is requested. Compressed tar archives
+    are rejected, since each read would decompress from the start.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+        self._zip_file = None
+        self._tar_file = None
+        self._names_by_block_number: Dict[int, str] = {}
+
+        if self.path.is_dir():
+            names = [
+                str(file_path)
+                for file_path in self.path.rglob(f"*{BLOCK_FILE_SUFFIX}")
+                if file_path.is_file()
+            ]
+        elif zipfile.is_zipfile(self.path):
+            self._zip_file = zipfile.ZipFile(self.path)
+            names = self._zip_file.namelist()
+        elif tarfile.is_tarfile(self.path):
+            try:
+                self._tar_file = tarfile.open(self.path, mode="r:")
+            except tarfile.ReadError as e:
+                raise ValueError(
+                    f"{self.path} is a compressed tar archive, "
+                    "decompress it or use a zip archive instead"
+                ) from e
+            names = [member.name for member in self._tar_file if member.isfile()]
+        else:
+            raise ValueError(f"{self.path} is not a directory, zip or tar archive")
+
+        for name in names:
+            block_number = _get_block_number(name)
+            if block_number is not None:
+                self._names_by_block_number[block_number] = name
+
+    def __contains__(self, block_number: int) -> bool:
+        return block_number in self._names_by_block_number
+
+    def get_block_numbers(self) -> List[int]:
+        return sorted(self._names_by_block_number.keys())
+
+    def load_block(self, block_number: int) -> Block:
+        name = self._names_by_block_number.get(block_number)
+        if name is None:
+            raise ValueError(f"No file for block {block_number} in {self.path}")
+
+        with self._lock:
+            block_json = json.loads(self._read(name))
+
+        if "block_timestamp" not in block_json:
+            raise ValueError(f"{name} has no block_timestamp")
+
+        return Block(**block_json)
+
+    async def get_block(self, block_number: int) -> Block:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.load_block, block_number)
+
+    def close(self) -> None:
+        if self._zip_file is not None:
+            self._zip_file.close()
+
+        if self._tar_file is not None:
+            self._tar_file.close()
+
+    def _read(self, name: str) -> bytes:
+        if self._zip_file is not None:
+            return self._zip_file.read(name)
+
+        if self._tar_file is not None:
+            block_file = self._tar_file.extractfile(name)
+            if block_file is None:
+                raise ValueError(f"Could not read {name} from {self.path}")
+            return block_file.read()
+
+        return Path(name).read_bytes()
+
+
+def _get_block_number(name: str) -> Optional[int]:
+    file_path = PurePosixPath(name)
+
+    if file_path.suffix != BLOCK_FILE_SUFFIX or not file_path.stem.isdigit():
+        return None
+
+    return int(file_path.stem)
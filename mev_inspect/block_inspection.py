@@ -0,0 +1,100 @@
+import logging
+from dataclasses import dataclass
+from typing import List
+
+from mev_inspect.arbitrages import get_arbitrages
+from mev_inspect.classifiers.trace import TraceClassifier
+from mev_inspect.liquidations import get_liquidations
+from mev_inspect.miner_payments import get_miner_payments
+from mev_inspect.nft_trades import get_nft_trades
+from mev_inspect.punks import get_punk_bid_acceptances, get_punk_bids, get_punk_snipes
+from mev_inspect.sandwiches import get_sandwiches
+from mev_inspect.schemas.arbitrages import Arbitrage
+from mev_inspect.schemas.blocks import Block
+from mev_inspect.schemas.liquidations import Liquidation
+from mev_inspect.schemas.miner_payments import MinerPayment
+from mev_inspect.schemas.nft_trades import NftTrade
+from mev_inspect.schemas.punk_accept_bid import PunkBidAcceptance
+from mev_inspect.schemas.punk_bid import PunkBid
+from mev_inspect.schemas.punk_snipe import PunkSnipe
+from mev_inspect.schemas.sandwiches import Sandwich
+from mev_inspect.schemas.swaps import Swap
+from mev_inspect.schemas.traces import ClassifiedTrace
+from mev_inspect.schemas.transfers import Transfer
+from mev_inspect.swaps import get_swaps
+from mev_inspect.traces import TraceTree
+from mev_inspect.transfers import get_transfers
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BlockInspection:
+    """Everything found in a single block, ready to be written"""
+
+    classified_traces: List[ClassifiedTrace]
+    transfers: List[Transfer]
+    swaps: List[Swap]
+    arbitrages: List[Arbitrage]
+    liquidations: List[Liquidation]
+    sandwiches: List[Sandwich]
+    punk_bids: List[PunkBid]
+    punk_bid_acceptances: List[PunkBidAcceptance]
+    punk_snipes: List[PunkSnipe]
+    nft_trades: List[NftTrade]
+    miner_payments: List[MinerPayment]
+
+
+def inspect_block_data(
+    trace_classifier: TraceClassifier,
+    block: Block,
+) -> BlockInspection:
+    block_number = block.block_number
+
+    classified_traces = trace_classifier.classify(block.traces)
+    logger.info(
+        f"Block: {block_number} -- Returned {len(classified_traces)} classified traces"
+    )
+
+    trace_tree = TraceTree(classified_traces)
+
+    transfers = get_transfers(classified_traces)
+    logger.info(f"Block: {block_number} -- Found {len(transfers)} transfers")
+
+    swaps = get_swaps(classified_traces, trace_tree)
+    logger.info(f"Block: {block_number} -- Found {len(swaps)} swaps")
+
+    arbitrages = get_arbitrages(swaps)
+    logger.info(f"Block: {block_number} -- Found {len(arbitrages)} arbitrages")
+
+    liquidations = get_liquidations(classified_traces, trace_tree)
+    logger.info(f"Block: {block_number} -- Found {len(liquidations)} liquidations")
+
+    sandwiches = get_sandwiches(swaps)
+    logger.info(f"Block: {block_number} -- Found {len(sandwiches)} sandwiches")
+
+    punk_bids = get_punk_bids(classified_traces)
+    punk_bid_acceptances = get_punk_bid_acceptances(classified_traces)
+    punk_snipes = get_punk_snipes(punk_bids, punk_bid_acceptances)
+    logger.info(f"Block: {block_number} -- Found {len(punk_snipes)} punk snipes")
+
+    nft_trades = get_nft_trades(classified_traces, trace_tree)
+    logger.info(f"Block: {block_number} -- Found {len(nft_trades)} nft trades")
+
+    miner_payments = get_miner_payments(
+        block.miner, block.base_fee_per_gas, classified_traces, block.receipts
+    )
+
+    return BlockInspection(
+        classified_traces=classified_traces,
+        transfers=transfers,
+        swaps=swaps,
+        arbitrages=arbitrages,
+        liquidations=liquidations,
+        sandwiches=sandwiches,
+        punk_bids=punk_bids,
+        punk_bid_acceptances=punk_bid_acceptances,
+        punk_snipes=punk_snipes,
+        nft_trades=nft_trades,
+        miner_payments=miner_payments,
+    )
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from mev_inspect.block_inspection import BlockInspection, inspect_block_data
+from mev_inspect.classifiers.trace import DEFAULT_DECODE_CACHE_SIZE, TraceClassifier
+from mev_inspect.schemas.blocks import Block
+
+# how long warm_up waits for every worker to start
+WARM_UP_TIMEOUT_SECONDS = 120
+
+logger = logging.getLogger(__name__)
+
+# set in each worker process by _init_worker
+_worker_trace_classifier: Optional[TraceClassifier] = None
+
+
+class ClassifierPool:
+    """
+    Runs classification and detection for blocks in a pool of worker processes
+
+    Each worker builds its own TraceClassifier once when it starts, so blocks
+    only pay for pickling the block in and the results out. Close the pool,
+    or use it as a context manager, to stop the workers.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        decode_cache_size: int = DEFAULT_DECODE_CACHE_SIZE,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(decode_cache_size,),
+        )
+
+    def __enter__(self) -> "ClassifierPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def warm_up(self) -> None:
+        """Starts every worker and waits for its TraceClassifier to be ready"""
+        # workers are started on demand, so each call holds its worker until
+        # every worker has one, which takes max_workers of them
+        with multiprocessing.Manager() as manager:
+            barrier = manager.Barrier(self.max_workers)  # type: ignore
+            futures = [
+                self._executor.submit(_wait_for_workers, barrier)
+                for _ in range(self.max_workers)
+            ]
+
+            worker_pids = {future.result() for future in futures}
+
+        logger.info(f"Started {len(worker_pids)} classifier workers")
+
+    async def inspect_block(self, block: Block) -> BlockInspection:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _inspect_block, block)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def _init_worker(decode_cache_size: int) -> None:
+    global _worker_trace_classifier  # pylint: disable=global-statement
+    _worker_trace_classifier = TraceClassifier(decode_cache_size=decode_cache_size)
+
+
+def _wait_for_workers(barrier) -> int:
+    if _worker_trace_classifier is None:
+        raise RuntimeError("Classifier worker was not initialized")
+
+    barrier.wait(timeout=WARM_UP_TIMEOUT_SECONDS)
+    return os.getpid()
+
+
+def _inspect_block(block: Block) -> BlockInspection:
+    if _worker_trace_classifier is None:
+        raise RuntimeError("Classifier worker was not initialized")
+
+    return inspect_block_data(_worker_trace_classifier, block)
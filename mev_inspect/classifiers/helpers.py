@@ -5,6 +5,7 @@ from mev_inspect.schemas.prices import ETH_TOKEN_ADDRESS
 from mev_inspect.schemas.swaps import Swap
 from mev_inspect.schemas.traces import ClassifiedTrace, DecodedCallTrace
 from mev_inspect.schemas.transfers import Transfer
+from mev_inspect.schemas.utils import construct_trusted
 
 
 def create_nft_trade_from_transfers(
@@ -45,12 +46,13 @@ def create_nft_trade_from_transfers(
         # Assumes that exchange fees are paid with the same token as the sale
         payment_amount -= fee.amount
 
-    return NftTrade(
+    return construct_trusted(
+        NftTrade,
         abi_name=trace.abi_name,
         transaction_hash=trace.transaction_hash,
         transaction_position=trace.transaction_position,
         block_number=trace.block_number,
-        trace_address=trace.trace_address,
+        trace_address=list(trace.trace_address),
         protocol=trace.protocol,
         error=trace.error,
         seller_address=seller_address,
@@ -94,12 +96,13 @@ def create_swap_from_pool_transfers(
     transfer_in = transfers_to_pool[-1]
     transfer_out = transfers_from_pool_to_recipient[0]
 
-    return Swap(
+    return construct_trusted(
+        Swap,
         abi_name=trace.abi_name,
         transaction_hash=trace.transaction_hash,
         transaction_position=trace.transaction_position,
         block_number=trace.block_number,
-        trace_address=trace.trace_address,
+        trace_address=list(trace.trace_address),
         contract_address=pool_address,
         protocol=trace.protocol,
         from_address=transfer_in.from_address,
@@ -132,12 +135,13 @@ def create_swap_from_recipient_transfers(
     transfer_in = transfers_from_recipient[0]
     transfer_out = transfers_to_recipient[0]
 
-    return Swap(
+    return construct_trusted(
+        Swap,
         abi_name=trace.abi_name,
         transaction_hash=trace.transaction_hash,
         transaction_position=trace.transaction_position,
         block_number=trace.block_number,
-        trace_address=trace.trace_address,
+        trace_address=list(trace.trace_address),
         contract_address=pool_address,
         protocol=trace.protocol,
         from_address=transfer_in.from_address,
@@ -151,10 +155,11 @@ def create_swap_from_recipient_transfers(
 
 
 def _build_eth_transfer(trace: ClassifiedTrace) -> Transfer:
-    return Transfer(
+    return construct_trusted(
+        Transfer,
         block_number=trace.block_number,
         transaction_hash=trace.transaction_hash,
-        trace_address=trace.trace_address,
+        trace_address=list(trace.trace_address),
         amount=trace.value,
         to_address=trace.to_address,
         from_address=trace.from_address,
@@ -1,8 +1,8 @@
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from mev_inspect.abi import get_abi
-from mev_inspect.decode import ABIDecoder
-from mev_inspect.schemas.blocks import CallAction, CallResult
+from mev_inspect.abi import get_compiled_abi
+from mev_inspect.decode import SELECTOR_LENGTH, ABIDecoder, DecodeCacheStats
+from mev_inspect.schemas.classifiers import ClassifierSpec
 from mev_inspect.schemas.traces import (
     CallTrace,
     Classification,
@@ -11,61 +11,141 @@ from mev_inspect.schemas.traces import (
     Trace,
     TraceType,
 )
+from mev_inspect.schemas.utils import construct_trusted
+from mev_inspect.trace_store import BlockTraceStore
 
 from .specs import ALL_CLASSIFIER_SPECS
 
+# per decoder, so ERC20 transfers and router calls stay hot within a batch
+DEFAULT_DECODE_CACHE_SIZE = 1024
+
+# (spec position in ALL_CLASSIFIER_SPECS, spec, decoder)
+_SpecCandidate = Tuple[int, ClassifierSpec, ABIDecoder]
+
 
 class TraceClassifier:
-    def __init__(self) -> None:
+    def __init__(self, decode_cache_size: int = DEFAULT_DECODE_CACHE_SIZE) -> None:
         self._classifier_specs = ALL_CLASSIFIER_SPECS
         self._decoders_by_abi_name: Dict[str, ABIDecoder] = {}
 
         for spec in self._classifier_specs:
-            abi = get_abi(spec.abi_name, spec.protocol)
+            compiled_abi = get_compiled_abi(spec.abi_name, spec.protocol)
 
-            if abi is None:
+            if compiled_abi is None:
                 raise ValueError(f"No ABI found for {spec.abi_name}")
 
-            decoder = ABIDecoder(abi)
+            decoder = ABIDecoder.from_compiled_abi(
+                compiled_abi, cache_size=decode_cache_size
+            )
             self._decoders_by_abi_name[spec.abi_name] = decoder
 
+        (
+            self._candidates_by_address_and_selector,
+            self._candidates_by_selector,
+        ) = self._build_dispatch_tables()
+
+    def _build_dispatch_tables(
+        self,
+    ) -> Tuple[
+        Dict[Tuple[str, str], List[_SpecCandidate]],
+        Dict[str, List[_SpecCandidate]],
+    ]:
+        """
+        Index specs by the 4-byte selectors their ABI can decode so each call
+        only tries the specs that could possibly match it
+
+        Specs without valid_contract_addresses apply to every address and are
+        keyed by selector alone. Specs restricted to addresses are keyed by
+        (address, selector), and their lists also include the unrestricted
+        candidates for that selector so a single lookup is enough. Every list
+        keeps the order of ALL_CLASSIFIER_SPECS, which decides which spec wins
+        when more than one can decode a call.
+        """
+
+        restricted_candidates: Dict[Tuple[str, str], List[_SpecCandidate]] = {}
+        candidates_by_selector: Dict[str, List[_SpecCandidate]] = {}
+
+        for index, spec in enumerate(self._classifier_specs):
+            decoder = self._decoders_by_abi_name[spec.abi_name]
+            candidate = (index, spec, decoder)
+
+            for selector in decoder.get_selectors():
+                if spec.valid_contract_addresses is None:
+                    candidates_by_selector.setdefault(selector, []).append(candidate)
+                else:
+                    for address in {
+                        address.lower() for address in spec.valid_contract_addresses
+                    }:
+                        restricted_candidates.setdefault(
+                            (address, selector), []
+                        ).append(candidate)
+
+        candidates_by_address_and_selector = {
+            (address, selector): sorted(
+                candidates + candidates_by_selector.get(selector, []),
+                key=lambda candidate: candidate[0],
+            )
+            for (address, selector), candidates in restricted_candidates.items()
+        }
+
+        return candidates_by_address_and_selector, candidates_by_selector
+
+    def _get_candidates(self, to_address: str, call_input: str) -> List[_SpecCandidate]:
+        selector = call_input[:SELECTOR_LENGTH]
+
+        candidates = self._candidates_by_address_and_selector.get(
+            (to_address, selector)
+        )
+        if candidates is not None:
+            return candidates
+
+        return self._candidates_by_selector.get(selector, [])
+
+    def get_decode_cache_stats(self) -> DecodeCacheStats:
+        return sum(
+            (
+                decoder.get_cache_stats()
+                for decoder in self._decoders_by_abi_name.values()
+            ),
+            DecodeCacheStats(),
+        )
+
     def classify(
         self,
         traces: List[Trace],
     ) -> List[ClassifiedTrace]:
+        return self.classify_store(BlockTraceStore(traces))
+
+    def classify_store(self, store: BlockTraceStore) -> List[ClassifiedTrace]:
         return [
-            self._classify_trace(trace)
-            for trace in traces
-            if trace.type != TraceType.reward
+            self._classify_trace(store, index)
+            for index in range(len(store))
+            if store.types[index] != TraceType.reward
         ]
 
-    def _classify_trace(self, trace: Trace) -> ClassifiedTrace:
-        if trace.type == TraceType.call:
-            classified_trace = self._classify_call(trace)
+    def _classify_trace(self, store: BlockTraceStore, index: int) -> ClassifiedTrace:
+        if store.types[index] == TraceType.call:
+            classified_trace = self._classify_call(store, index)
             if classified_trace is not None:
                 return classified_trace
 
-        return ClassifiedTrace(
-            **trace.dict(),
-            trace_type=trace.type,
+        return construct_trusted(
+            ClassifiedTrace,
+            **_get_trace_fields(store, index),
             classification=Classification.unknown,
         )
 
-    def _classify_call(self, trace) -> Optional[ClassifiedTrace]:
-        action = CallAction(**trace.action)
-        result = CallResult(**trace.result) if trace.result is not None else None
+    def _classify_call(
+        self, store: BlockTraceStore, index: int
+    ) -> Optional[ClassifiedTrace]:
+        to_address = store.to_addresses[index]
+        call_input = store.inputs[index]
 
-        for spec in self._classifier_specs:
-            if spec.valid_contract_addresses is not None:
-                lower_valid_addresses = {
-                    address.lower() for address in spec.valid_contract_addresses
-                }
+        if to_address is None:
+            return None
 
-                if action.to not in lower_valid_addresses:
-                    continue
-
-            decoder = self._decoders_by_abi_name[spec.abi_name]
-            call_data = decoder.decode(action.input)
+        for _, spec, decoder in self._get_candidates(to_address, call_input):
+            call_data = decoder.decode(call_input)
 
             if call_data is not None:
                 signature = call_data.function_signature
@@ -76,29 +156,37 @@ class TraceClassifier:
                     else classifier.get_classification()
                 )
 
-                return DecodedCallTrace(
-                    **trace.dict(),
-                    trace_type=trace.type,
+                return construct_trusted(
+                    DecodedCallTrace,
+                    **_get_trace_fields(store, index),
                     classification=classification,
                     protocol=spec.protocol,
                     abi_name=spec.abi_name,
                     function_name=call_data.function_name,
                     function_signature=signature,
-                    inputs=call_data.inputs,
-                    to_address=action.to,
-                    from_address=action.from_,
-                    value=action.value,
-                    gas=action.gas,
-                    gas_used=result.gas_used if result is not None else None,
+                    # decoded call data is shared through the decode cache
+                    inputs=dict(call_data.inputs),
+                    to_address=to_address,
+                    from_address=store.from_addresses[index],
+                    value=store.values[index],
+                    gas=store.gas[index],
+                    gas_used=store.gas_used[index],
                 )
 
-        return CallTrace(
-            **trace.dict(),
-            trace_type=trace.type,
+        return construct_trusted(
+            CallTrace,
+            **_get_trace_fields(store, index),
             classification=Classification.unknown,
-            to_address=action.to,
-            from_address=action.from_,
-            value=action.value,
-            gas=action.gas,
-            gas_used=result.gas_used if result is not None else None,
+            to_address=to_address,
+            from_address=store.from_addresses[index],
+            value=store.values[index],
+            gas=store.gas[index],
+            gas_used=store.gas_used[index],
         )
+
+
+def _get_trace_fields(store: BlockTraceStore, index: int) -> Dict[str, Any]:
+    trace = store.traces[index]
+    trace_fields = {name: getattr(trace, name) for name in Trace.__fields__}
+    trace_fields["trace_address"] = store.trace_addresses[index]
+    return trace_fields
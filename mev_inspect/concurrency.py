@@ -2,6 +2,8 @@ import asyncio
 import signal
 from functools import wraps
 
+from mev_inspect.http_session import get_shared_http_session
+
 
 def coro(f):
     @wraps(f)
@@ -17,6 +19,7 @@ def coro(f):
         try:
             loop.run_until_complete(f(*args, **kwargs))
         finally:
+            loop.run_until_complete(get_shared_http_session().close())
             loop.run_until_complete(loop.shutdown_asyncgens())
 
     return wrapper
@@ -1,10 +1,35 @@
-from typing import List
+from typing import List, Set
 from uuid import uuid4
 
+from mev_inspect.db import to_postgres_list, write_as_csv
 from mev_inspect.models.arbitrages import ArbitrageModel
 from mev_inspect.schemas.arbitrages import Arbitrage
 
-from .shared import delete_by_block_range
+from .shared import (
+    TransactionKey,
+    delete_by_block_range,
+    delete_transactions,
+    get_changed_transaction_keys,
+)
+
+ARBITRAGE_COLUMNS = (
+    "id",
+    "block_number",
+    "transaction_hash",
+    "account_address",
+    "profit_token_address",
+    "start_amount",
+    "end_amount",
+    "profit_amount",
+    "error",
+    "protocols",
+)
+
+ARBITRAGE_SWAP_COLUMNS = (
+    "arbitrage_id",
+    "swap_transaction_hash",
+    "swap_trace_address",
+)
 
 
 def delete_arbitrages_for_blocks(
@@ -18,52 +43,128 @@ def delete_arbitrages_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
+
+
+def replace_arbitrages_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    arbitrages: List[Arbitrage],
+) -> Set[TransactionKey]:
+    """
+    Rewrites the arbitrages of transactions where they changed, and
+    returns those transactions
+    """
+    result = db_session.execute(
+        """
+        SELECT
+            a.block_number,
+            a.transaction_hash,
+            a.account_address,
+            a.profit_token_address,
+            a.start_amount,
+            a.end_amount,
+            a.profit_amount,
+            a.error,
+            a.protocols,
+            ARRAY(
+                SELECT s.swap_trace_address::text
+                FROM arbitrage_swaps s
+                WHERE s.arbitrage_id = a.id
+            )
+        FROM arbitrages a
+        WHERE
+            a.block_number >= :after_block_number AND
+            a.block_number < :before_block_number
+        """,
+        params={
+            "after_block_number": after_block_number,
+            "before_block_number": before_block_number,
+        },
+    )
+    existing_rows = [
+        (*row[:8], tuple(sorted(row[8] or [])), tuple(sorted(row[9])))
+        for row in result.fetchall()
+    ]
+    new_rows = [
+        (
+            arbitrage.block_number,
+            arbitrage.transaction_hash,
+            arbitrage.account_address,
+            arbitrage.profit_token_address,
+            arbitrage.start_amount,
+            arbitrage.end_amount,
+            arbitrage.profit_amount,
+            arbitrage.error,
+            tuple(_get_protocols(arbitrage)),
+            tuple(
+                sorted(to_postgres_list(swap.trace_address) for swap in arbitrage.swaps)
+            ),
+        )
+        for arbitrage in arbitrages
+    ]
+
+    changed_transaction_keys = get_changed_transaction_keys(existing_rows, new_rows)
+
+    # arbitrage swaps are deleted with their arbitrage
+    delete_transactions(db_session, "arbitrages", changed_transaction_keys)
+    write_arbitrages(
+        db_session,
+        [
+            arbitrage
+            for arbitrage in arbitrages
+            if (arbitrage.block_number, arbitrage.transaction_hash)
+            in changed_transaction_keys
+        ],
+    )
+
+    return changed_transaction_keys
 
 
 def write_arbitrages(
     db_session,
     arbitrages: List[Arbitrage],
 ) -> None:
-    arbitrage_models = []
-    swap_arbitrage_ids = []
+    arbitrage_items = []
+    arbitrage_swap_items = []
 
     for arbitrage in arbitrages:
         arbitrage_id = str(uuid4())
-        arbitrage_models.append(
-            ArbitrageModel(
-                id=arbitrage_id,
-                block_number=arbitrage.block_number,
-                transaction_hash=arbitrage.transaction_hash,
-                account_address=arbitrage.account_address,
-                profit_token_address=arbitrage.profit_token_address,
-                start_amount=arbitrage.start_amount,
-                end_amount=arbitrage.end_amount,
-                profit_amount=arbitrage.profit_amount,
-                error=arbitrage.error,
-                protocols={swap.protocol.value for swap in arbitrage.swaps},
+        arbitrage_items.append(
+            (
+                arbitrage_id,
+                arbitrage.block_number,
+                arbitrage.transaction_hash,
+                arbitrage.account_address,
+                arbitrage.profit_token_address,
+                arbitrage.start_amount,
+                arbitrage.end_amount,
+                arbitrage.profit_amount,
+                arbitrage.error,
+                to_postgres_list(_get_protocols(arbitrage)),
             )
         )
 
         for swap in arbitrage.swaps:
-            swap_arbitrage_ids.append(
-                {
-                    "arbitrage_id": arbitrage_id,
-                    "swap_transaction_hash": swap.transaction_hash,
-                    "swap_trace_address": swap.trace_address,
-                }
+            arbitrage_swap_items.append(
+                (
+                    arbitrage_id,
+                    swap.transaction_hash,
+                    to_postgres_list(swap.trace_address),
+                )
             )
 
-    if len(arbitrage_models) > 0:
-        db_session.bulk_save_objects(arbitrage_models)
-        db_session.execute(
-            """
-            INSERT INTO arbitrage_swaps
-            (arbitrage_id, swap_transaction_hash, swap_trace_address)
-            VALUES
-            (:arbitrage_id, :swap_transaction_hash, :swap_trace_address)
-            """,
-            params=swap_arbitrage_ids,
+    if len(arbitrage_items) > 0:
+        write_as_csv(
+            db_session, "arbitrages", arbitrage_items, columns=ARBITRAGE_COLUMNS
         )
+        write_as_csv(
+            db_session,
+            "arbitrage_swaps",
+            arbitrage_swap_items,
+            columns=ARBITRAGE_SWAP_COLUMNS,
+        )
+
 
-        db_session.commit()
+def _get_protocols(arbitrage: Arbitrage) -> List[str]:
+    return sorted({swap.protocol.value for swap in arbitrage.swaps})
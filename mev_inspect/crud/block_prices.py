@@ -0,0 +1,78 @@
+from datetime import datetime
+
+# block_prices holds each token's latest price as of each block, so
+# summaries join one row instead of searching prices for every row
+
+UPSERT_BLOCK_PRICES_FOR_BLOCK_RANGE_QUERY = """
+INSERT INTO block_prices (block_number, token_address, usd_price)
+SELECT b.block_number, t.token_address, p.usd_price
+FROM blocks b
+CROSS JOIN (SELECT DISTINCT token_address FROM prices) t
+CROSS JOIN LATERAL (
+    SELECT usd_price
+    FROM prices
+    WHERE
+        token_address = t.token_address
+        AND timestamp <= b.block_timestamp
+    ORDER BY timestamp DESC
+    LIMIT 1
+) p
+WHERE
+    b.block_number >= :after_block_number
+    AND b.block_number < :before_block_number
+ON CONFLICT (block_number, token_address) DO UPDATE
+    SET usd_price = EXCLUDED.usd_price
+    WHERE block_prices.usd_price IS DISTINCT FROM EXCLUDED.usd_price
+"""
+
+UPSERT_BLOCK_PRICES_FOR_TOKEN_QUERY = """
+INSERT INTO block_prices (block_number, token_address, usd_price)
+SELECT b.block_number, :token_address, p.usd_price
+FROM blocks b
+CROSS JOIN LATERAL (
+    SELECT usd_price
+    FROM prices
+    WHERE
+        token_address = :token_address
+        AND timestamp <= b.block_timestamp
+    ORDER BY timestamp DESC
+    LIMIT 1
+) p
+WHERE b.block_timestamp >= :after_timestamp
+ON CONFLICT (block_number, token_address) DO UPDATE
+    SET usd_price = EXCLUDED.usd_price
+    WHERE block_prices.usd_price IS DISTINCT FROM EXCLUDED.usd_price
+"""
+
+
+def update_block_prices_for_block_range(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+) -> None:
+    """Prices the range's blocks, which must already be written"""
+    db_session.execute(
+        UPSERT_BLOCK_PRICES_FOR_BLOCK_RANGE_QUERY,
+        params={
+            "after_block_number": after_block_number,
+            "before_block_number": before_block_number,
+        },
+    )
+
+
+def update_block_prices_for_token(
+    db_session,
+    token_address: str,
+    after_timestamp: datetime,
+) -> None:
+    """
+    Re-prices token_address for blocks from after_timestamp on, after
+    prices at or after after_timestamp were added
+    """
+    db_session.execute(
+        UPSERT_BLOCK_PRICES_FOR_TOKEN_QUERY,
+        params={
+            "token_address": token_address,
+            "after_timestamp": after_timestamp,
+        },
+    )
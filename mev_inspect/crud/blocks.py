@@ -22,7 +22,6 @@ def delete_blocks(
             "before_block_number": before_block_number,
         },
     )
-    db_session.commit()
 
 
 def write_blocks(
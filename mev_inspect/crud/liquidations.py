@@ -1,10 +1,30 @@
-import json
-from typing import List
+from typing import List, Set
 
+from mev_inspect.db import to_postgres_list, write_as_csv
 from mev_inspect.models.liquidations import LiquidationModel
 from mev_inspect.schemas.liquidations import Liquidation
 
-from .shared import delete_by_block_range
+from .shared import (
+    TransactionKey,
+    delete_by_block_range,
+    delete_transactions,
+    get_changed_transaction_keys,
+    get_protocol_value,
+)
+
+LIQUIDATION_COLUMNS = (
+    "liquidated_user",
+    "liquidator_user",
+    "debt_token_address",
+    "debt_purchase_amount",
+    "received_amount",
+    "received_token_address",
+    "protocol",
+    "transaction_hash",
+    "trace_address",
+    "block_number",
+    "error",
+)
 
 
 def delete_liquidations_for_blocks(
@@ -18,17 +38,94 @@ def delete_liquidations_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
+
+
+def replace_liquidations_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    liquidations: List[Liquidation],
+) -> Set[TransactionKey]:
+    """
+    Rewrites the liquidations of transactions where they changed, and
+    returns those transactions
+    """
+    result = db_session.execute(
+        """
+        SELECT
+            block_number,
+            transaction_hash,
+            trace_address::text,
+            liquidated_user,
+            liquidator_user,
+            debt_token_address,
+            debt_purchase_amount,
+            received_amount,
+            received_token_address,
+            protocol,
+            error
+        FROM liquidations
+        WHERE
+            block_number >= :after_block_number AND
+            block_number < :before_block_number
+        """,
+        params={
+            "after_block_number": after_block_number,
+            "before_block_number": before_block_number,
+        },
+    )
+    new_rows = [
+        (
+            int(liquidation.block_number),
+            liquidation.transaction_hash,
+            to_postgres_list(liquidation.trace_address),
+            liquidation.liquidated_user,
+            liquidation.liquidator_user,
+            liquidation.debt_token_address,
+            liquidation.debt_purchase_amount,
+            liquidation.received_amount,
+            liquidation.received_token_address,
+            get_protocol_value(liquidation.protocol),
+            liquidation.error,
+        )
+        for liquidation in liquidations
+    ]
+
+    changed_transaction_keys = get_changed_transaction_keys(result.fetchall(), new_rows)
+
+    delete_transactions(db_session, "liquidations", changed_transaction_keys)
+    write_liquidations(
+        db_session,
+        [
+            liquidation
+            for liquidation in liquidations
+            if (int(liquidation.block_number), liquidation.transaction_hash)
+            in changed_transaction_keys
+        ],
+    )
+
+    return changed_transaction_keys
 
 
 def write_liquidations(
     db_session,
     liquidations: List[Liquidation],
 ) -> None:
-    models = [
-        LiquidationModel(**json.loads(liquidation.json()))
+    items = (
+        (
+            liquidation.liquidated_user,
+            liquidation.liquidator_user,
+            liquidation.debt_token_address,
+            liquidation.debt_purchase_amount,
+            liquidation.received_amount,
+            liquidation.received_token_address,
+            get_protocol_value(liquidation.protocol),
+            liquidation.transaction_hash,
+            to_postgres_list(liquidation.trace_address),
+            liquidation.block_number,
+            liquidation.error,
+        )
         for liquidation in liquidations
-    ]
+    )
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+    write_as_csv(db_session, "liquidations", items, columns=LIQUIDATION_COLUMNS)
@@ -1,10 +1,27 @@
-import json
-from typing import List
+from typing import Any, Iterator, List, Sequence, Set
 
+from mev_inspect.db import write_as_binary
 from mev_inspect.models.miner_payments import MinerPaymentModel
+from mev_inspect.pg_binary import encode_numeric, encode_text
 from mev_inspect.schemas.miner_payments import MinerPayment
 
-from .shared import delete_by_block_range
+from .shared import TransactionKey, delete_by_block_range, replace_by_block_range
+
+MINER_PAYMENT_KEY_COLUMNS = ("block_number", "transaction_hash")
+
+MINER_PAYMENT_COLUMNS = (
+    ("block_number", encode_numeric),
+    ("transaction_hash", encode_text),
+    ("transaction_index", encode_numeric),
+    ("miner_address", encode_text),
+    ("coinbase_transfer", encode_numeric),
+    ("base_fee_per_gas", encode_numeric),
+    ("gas_price", encode_numeric),
+    ("gas_price_with_coinbase_transfer", encode_numeric),
+    ("gas_used", encode_numeric),
+    ("transaction_from_address", encode_text),
+    ("transaction_to_address", encode_text),
+)
 
 
 def delete_miner_payments_for_blocks(
@@ -18,17 +35,53 @@ def delete_miner_payments_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
 
 
 def write_miner_payments(
     db_session,
     miner_payments: List[MinerPayment],
 ) -> None:
-    models = [
-        MinerPaymentModel(**json.loads(miner_payment.json()))
-        for miner_payment in miner_payments
-    ]
+    write_as_binary(
+        db_session,
+        "miner_payments",
+        MINER_PAYMENT_COLUMNS,
+        _get_miner_payment_items(miner_payments),
+    )
+
+
+def replace_miner_payments_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    miner_payments: List[MinerPayment],
+) -> Set[TransactionKey]:
+    return replace_by_block_range(
+        db_session,
+        MinerPaymentModel,
+        MINER_PAYMENT_KEY_COLUMNS,
+        MINER_PAYMENT_COLUMNS,
+        after_block_number,
+        before_block_number,
+        _get_miner_payment_items(miner_payments),
+    )
+
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+def _get_miner_payment_items(
+    miner_payments: List[MinerPayment],
+) -> Iterator[Sequence[Any]]:
+    return (
+        (
+            miner_payment.block_number,
+            miner_payment.transaction_hash,
+            miner_payment.transaction_index,
+            miner_payment.miner_address,
+            miner_payment.coinbase_transfer,
+            miner_payment.base_fee_per_gas,
+            miner_payment.gas_price,
+            miner_payment.gas_price_with_coinbase_transfer,
+            miner_payment.gas_used,
+            miner_payment.transaction_from_address,
+            miner_payment.transaction_to_address,
+        )
+        for miner_payment in miner_payments
+    )
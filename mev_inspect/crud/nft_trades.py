@@ -1,10 +1,26 @@
-import json
 from typing import List
 
-from mev_inspect.crud.shared import delete_by_block_range
+from mev_inspect.crud.shared import delete_by_block_range, get_protocol_value
+from mev_inspect.db import to_postgres_list, write_as_csv
 from mev_inspect.models.nft_trades import NftTradeModel
 from mev_inspect.schemas.nft_trades import NftTrade
 
+NFT_TRADE_COLUMNS = (
+    "abi_name",
+    "transaction_hash",
+    "transaction_position",
+    "block_number",
+    "trace_address",
+    "protocol",
+    "error",
+    "seller_address",
+    "buyer_address",
+    "payment_token_address",
+    "payment_amount",
+    "collection_address",
+    "token_id",
+)
+
 
 def delete_nft_trades_for_blocks(
     db_session,
@@ -17,14 +33,29 @@ def delete_nft_trades_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
 
 
 def write_nft_trades(
     db_session,
     nft_trades: List[NftTrade],
 ) -> None:
-    models = [NftTradeModel(**json.loads(nft_trade.json())) for nft_trade in nft_trades]
+    items = (
+        (
+            nft_trade.abi_name,
+            nft_trade.transaction_hash,
+            nft_trade.transaction_position,
+            nft_trade.block_number,
+            to_postgres_list(nft_trade.trace_address),
+            get_protocol_value(nft_trade.protocol),
+            nft_trade.error,
+            nft_trade.seller_address,
+            nft_trade.buyer_address,
+            nft_trade.payment_token_address,
+            nft_trade.payment_amount,
+            nft_trade.collection_address,
+            nft_trade.token_id,
+        )
+        for nft_trade in nft_trades
+    )
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+    write_as_csv(db_session, "nft_trades", items, columns=NFT_TRADE_COLUMNS)
@@ -1,17 +1,96 @@
-from typing import List
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, Iterable, List, Tuple
 
 from sqlalchemy.dialects.postgresql import insert
 
 from mev_inspect.models.prices import PriceModel
 from mev_inspect.schemas.prices import Price
 
+from .block_prices import update_block_prices_for_token
 
-def write_prices(db_session, prices: List[Price]) -> None:
+# keeps each insert statement and transaction small
+DEFAULT_PRICE_CHUNK_SIZE = 10_000
+
+
+def write_prices(
+    db_session,
+    prices: Iterable[Price],
+    chunk_size: int = DEFAULT_PRICE_CHUNK_SIZE,
+) -> None:
+    """
+    Inserts prices chunk_size at a time, committing each chunk along with
+    the block prices it changes
+    """
+    price_iterator = iter(prices)
+
+    while True:
+        chunk = list(islice(price_iterator, chunk_size))
+        if len(chunk) == 0:
+            return
+
+        _write_price_chunk(db_session, chunk)
+
+
+def find_prices_for_time_range(
+    db_session,
+    after_timestamp: datetime,
+    before_timestamp: datetime,
+) -> List[Tuple[str, datetime, Decimal]]:
+    """
+    Finds each token's prices up to before_timestamp, starting from its
+    latest price at or before after_timestamp
+    """
+    result = db_session.execute(
+        """
+        (
+            SELECT DISTINCT ON (token_address) token_address, timestamp, usd_price
+            FROM prices
+            WHERE timestamp <= :after_timestamp
+            ORDER BY token_address, timestamp DESC
+        )
+        UNION ALL
+        (
+            SELECT token_address, timestamp, usd_price
+            FROM prices
+            WHERE
+                timestamp > :after_timestamp
+                AND timestamp <= :before_timestamp
+        )
+        """,
+        params={
+            "after_timestamp": after_timestamp,
+            "before_timestamp": before_timestamp,
+        },
+    )
+
+    return [
+        (token_address, timestamp, usd_price)
+        for token_address, timestamp, usd_price in result.fetchall()
+    ]
+
+
+def _write_price_chunk(db_session, prices: List[Price]) -> None:
     insert_statement = (
         insert(PriceModel.__table__)
         .values([price.dict() for price in prices])
         .on_conflict_do_nothing()
+        .returning(PriceModel.token_address, PriceModel.timestamp)
     )
 
-    db_session.execute(insert_statement)
+    inserted_prices = db_session.execute(insert_statement).fetchall()
+
+    # only blocks after a token's earliest new price can change
+    earliest_timestamp_by_token: Dict[str, datetime] = {}
+    for token_address, timestamp in inserted_prices:
+        if (
+            token_address not in earliest_timestamp_by_token
+            or timestamp < earliest_timestamp_by_token[token_address]
+        ):
+            earliest_timestamp_by_token[token_address] = timestamp
+
+    for token_address, timestamp in earliest_timestamp_by_token.items():
+        update_block_prices_for_token(db_session, token_address, timestamp)
+
     db_session.commit()
@@ -1,10 +1,30 @@
-from typing import List
+from typing import Any, Iterable, List, Set, Tuple
 from uuid import uuid4
 
+from mev_inspect.db import to_postgres_list, write_as_csv
 from mev_inspect.models.sandwiches import SandwichModel
 from mev_inspect.schemas.sandwiches import Sandwich
 
-from .shared import delete_by_block_range
+from .shared import TransactionKey, delete_by_block_range, get_changed_transaction_keys
+
+SANDWICH_COLUMNS = (
+    "id",
+    "block_number",
+    "sandwicher_address",
+    "frontrun_swap_transaction_hash",
+    "frontrun_swap_trace_address",
+    "backrun_swap_transaction_hash",
+    "backrun_swap_trace_address",
+    "profit_token_address",
+    "profit_amount",
+)
+
+SANDWICHED_SWAP_COLUMNS = (
+    "sandwich_id",
+    "block_number",
+    "transaction_hash",
+    "trace_address",
+)
 
 
 def delete_sandwiches_for_blocks(
@@ -18,52 +38,108 @@ def delete_sandwiches_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
+
+
+def replace_sandwiches_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    sandwiches: List[Sandwich],
+) -> Set[TransactionKey]:
+    """
+    Rewrites the range's sandwiches, and returns the frontrun and backrun
+    transactions that joined or left a sandwich, as the summary leaves
+    those transactions' arbitrages out
+    """
+    result = db_session.execute(
+        """
+        SELECT
+            block_number,
+            frontrun_swap_transaction_hash,
+            backrun_swap_transaction_hash
+        FROM sandwiches
+        WHERE
+            block_number >= :after_block_number AND
+            block_number < :before_block_number
+        """,
+        params={
+            "after_block_number": after_block_number,
+            "before_block_number": before_block_number,
+        },
+    )
+
+    changed_transaction_keys = get_changed_transaction_keys(
+        _get_sandwich_transaction_rows(result.fetchall()),
+        _get_sandwich_transaction_rows(
+            (
+                sandwich.block_number,
+                sandwich.frontrun_swap.transaction_hash,
+                sandwich.backrun_swap.transaction_hash,
+            )
+            for sandwich in sandwiches
+        ),
+    )
+
+    delete_sandwiches_for_blocks(db_session, after_block_number, before_block_number)
+    write_sandwiches(db_session, sandwiches)
+
+    return changed_transaction_keys
 
 
 def write_sandwiches(
     db_session,
     sandwiches: List[Sandwich],
 ) -> None:
-    sandwich_models = []
-    sandwiched_swaps = []
+    sandwich_items = []
+    sandwiched_swap_items = []
 
     for sandwich in sandwiches:
         sandwich_id = str(uuid4())
-        sandwich_models.append(
-            SandwichModel(
-                id=sandwich_id,
-                block_number=sandwich.block_number,
-                sandwicher_address=sandwich.sandwicher_address,
-                frontrun_swap_transaction_hash=sandwich.frontrun_swap.transaction_hash,
-                frontrun_swap_trace_address=sandwich.frontrun_swap.trace_address,
-                backrun_swap_transaction_hash=sandwich.backrun_swap.transaction_hash,
-                backrun_swap_trace_address=sandwich.backrun_swap.trace_address,
-                profit_token_address=sandwich.profit_token_address,
-                profit_amount=sandwich.profit_amount,
+        sandwich_items.append(
+            (
+                sandwich_id,
+                sandwich.block_number,
+                sandwich.sandwicher_address,
+                sandwich.frontrun_swap.transaction_hash,
+                to_postgres_list(sandwich.frontrun_swap.trace_address),
+                sandwich.backrun_swap.transaction_hash,
+                to_postgres_list(sandwich.backrun_swap.trace_address),
+                sandwich.profit_token_address,
+                sandwich.profit_amount,
             )
         )
 
         for swap in sandwich.sandwiched_swaps:
-            sandwiched_swaps.append(
-                {
-                    "sandwich_id": sandwich_id,
-                    "block_number": swap.block_number,
-                    "transaction_hash": swap.transaction_hash,
-                    "trace_address": swap.trace_address,
-                }
+            sandwiched_swap_items.append(
+                (
+                    sandwich_id,
+                    swap.block_number,
+                    swap.transaction_hash,
+                    to_postgres_list(swap.trace_address),
+                )
             )
 
-    if len(sandwich_models) > 0:
-        db_session.bulk_save_objects(sandwich_models)
-        db_session.execute(
-            """
-            INSERT INTO sandwiched_swaps
-            (sandwich_id, block_number, transaction_hash, trace_address)
-            VALUES
-            (:sandwich_id, :block_number, :transaction_hash, :trace_address)
-            """,
-            params=sandwiched_swaps,
+    if len(sandwich_items) > 0:
+        write_as_csv(db_session, "sandwiches", sandwich_items, columns=SANDWICH_COLUMNS)
+        write_as_csv(
+            db_session,
+            "sandwiched_swaps",
+            sandwiched_swap_items,
+            columns=SANDWICHED_SWAP_COLUMNS,
         )
 
-        db_session.commit()
+
+def _get_sandwich_transaction_rows(
+    sandwich_rows: Iterable[Tuple[Any, str, str]],
+) -> List[Tuple[Any, str, str]]:
+    transaction_rows = []
+
+    for (
+        block_number,
+        frontrun_transaction_hash,
+        backrun_transaction_hash,
+    ) in sandwich_rows:
+        transaction_rows.append((block_number, frontrun_transaction_hash, "frontrun"))
+        transaction_rows.append((block_number, backrun_transaction_hash, "backrun"))
+
+    return transaction_rows
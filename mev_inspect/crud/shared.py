@@ -1,6 +1,35 @@
-from typing import Type
+import re
+from collections import Counter, defaultdict
+from typing import (
+    Any,
+    DefaultDict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+)
 
+from sqlalchemy import JSON
+
+from mev_inspect.db import write_as_binary
 from mev_inspect.models.base import Base
+from mev_inspect.pg_binary import Encoder
+from mev_inspect.schemas.traces import Protocol
+
+# blocks per partition of the tables partitioned by block number
+# must match the partition size in the migration that partitioned them
+BLOCK_PARTITION_SIZE = 100_000
+
+PARTITION_BOUND_PATTERN = re.compile(r"FOR VALUES FROM \((.+)\) TO \((.+)\)")
+
+# partition bounds, None for MINVALUE and MAXVALUE
+PartitionRange = Tuple[Optional[int], Optional[int]]
+
+# identifies the rows of one transaction, (block_number, transaction_hash)
+TransactionKey = Tuple[int, str]
 
 
 def delete_by_block_range(
@@ -14,7 +43,301 @@ def delete_by_block_range(
         db_session.query(model_class)
         .filter(model_class.block_number >= after_block_number)
         .filter(model_class.block_number < before_block_number)
-        .delete()
+        .delete(synchronize_session=False)
+    )
+
+
+def replace_by_block_range(
+    db_session,
+    model_class: Type[Base],
+    key_columns: Sequence[str],
+    columns: Sequence[Tuple[str, Encoder]],
+    after_block_number: int,
+    before_block_number: int,
+    items: Iterable[Sequence[Any]],
+    unchanged_columns: Sequence[str] = (),
+) -> Set[TransactionKey]:
+    """
+    Makes the table's rows for the block range match items
+
+    Items are copied into a temporary staging table, then upserted on
+    key_columns. Existing rows are only updated if a value changed, and
+    only rows whose key is gone are deleted, so re-inspecting blocks
+    doesn't rewrite rows that stay the same.
+
+    unchanged_columns, like a creation time, are written for new rows
+    but neither compared nor updated for existing ones.
+
+    Returns the transactions with rows that were inserted, updated or deleted.
+    """
+    table_name = model_class.__tablename__
+    staging_table_name = f"{table_name}_staging"
+    column_names = [name for name, _ in columns]
+    updated_column_names = [
+        name
+        for name in column_names
+        if name not in key_columns and name not in unchanged_columns
+    ]
+
+    ensure_block_partitions(
+        db_session, table_name, after_block_number, before_block_number
+    )
+
+    db_session.execute(
+        f"""
+        CREATE TEMPORARY TABLE IF NOT EXISTS {staging_table_name}
+            (LIKE {table_name} INCLUDING DEFAULTS)
+            ON COMMIT DELETE ROWS
+        """
+    )
+    write_as_binary(db_session, staging_table_name, columns, items)
+
+    changed_conditions = " OR ".join(
+        f"{_comparable(model_class, table_name, name)} "
+        f"IS DISTINCT FROM {_comparable(model_class, 'EXCLUDED', name)}"
+        for name in updated_column_names
+    )
+    upserted = db_session.execute(
+        f"""
+        INSERT INTO {table_name} ({", ".join(column_names)})
+        SELECT {", ".join(column_names)} FROM {staging_table_name}
+        ON CONFLICT ({", ".join(key_columns)}) DO UPDATE SET
+            {", ".join(f"{name} = EXCLUDED.{name}" for name in updated_column_names)}
+        WHERE {changed_conditions}
+        RETURNING block_number, transaction_hash
+        """
+    )
+    changed_transaction_keys = _get_transaction_keys(upserted.fetchall())
+
+    key_matches = " AND ".join(
+        f"staged.{name} = existing.{name}" for name in key_columns
+    )
+    deleted = db_session.execute(
+        f"""
+        DELETE FROM {table_name} AS existing
+        WHERE
+            existing.block_number >= :after_block_number AND
+            existing.block_number < :before_block_number AND
+            NOT EXISTS (
+                SELECT 1 FROM {staging_table_name} AS staged
+                WHERE {key_matches}
+            )
+        RETURNING existing.block_number, existing.transaction_hash
+        """,
+        params={
+            "after_block_number": after_block_number,
+            "before_block_number": before_block_number,
+        },
+    )
+    changed_transaction_keys |= _get_transaction_keys(deleted.fetchall())
+
+    return changed_transaction_keys
+
+
+def get_changed_transaction_keys(
+    existing_rows: Iterable[Sequence[Any]],
+    new_rows: Iterable[Sequence[Any]],
+) -> Set[TransactionKey]:
+    """
+    Compares rows that start with block_number and transaction_hash, and
+    finds the transactions whose rows differ in any way
+    """
+    existing_rows_by_key = _count_rows_by_transaction_key(existing_rows)
+    new_rows_by_key = _count_rows_by_transaction_key(new_rows)
+
+    return {
+        transaction_key
+        for transaction_key in existing_rows_by_key.keys() | new_rows_by_key.keys()
+        if existing_rows_by_key.get(transaction_key)
+        != new_rows_by_key.get(transaction_key)
+    }
+
+
+def delete_transactions(
+    db_session,
+    table_name: str,
+    transaction_keys: Set[TransactionKey],
+) -> None:
+    if len(transaction_keys) == 0:
+        return
+
+    block_numbers = [block_number for block_number, _ in transaction_keys]
+
+    db_session.execute(
+        f"""
+        DELETE FROM {table_name}
+        WHERE
+            block_number >= :after_block_number AND
+            block_number <= :last_block_number AND
+            (block_number, transaction_hash) IN (
+                SELECT * FROM UNNEST(
+                    CAST(:block_numbers AS NUMERIC[]),
+                    CAST(:transaction_hashes AS VARCHAR[])
+                )
+            )
+        """,
+        params={
+            "after_block_number": min(block_numbers),
+            "last_block_number": max(block_numbers),
+            "block_numbers": block_numbers,
+            "transaction_hashes": [
+                transaction_hash for _, transaction_hash in transaction_keys
+            ],
+        },
+    )
+
+
+def ensure_block_partitions(
+    db_session,
+    table_name: str,
+    after_block_number: int,
+    before_block_number: int,
+) -> None:
+    """
+    Creates the partitions a block range needs, if the table is partitioned
+
+    Partitions are created under an advisory lock so concurrent writers
+    don't race to create the same one. This only happens once every
+    BLOCK_PARTITION_SIZE blocks.
+    """
+    is_partitioned = db_session.execute(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table_name)",
+        params={"table_name": table_name},
+    ).scalar()
+
+    if not is_partitioned:
+        return
+
+    missing_partition_starts = get_missing_partition_starts(
+        _get_partition_ranges(db_session, table_name),
+        after_block_number,
+        before_block_number,
+    )
+
+    if len(missing_partition_starts) == 0:
+        return
+
+    db_session.execute(
+        "SELECT pg_advisory_xact_lock(hashtext(:table_name))",
+        params={"table_name": table_name},
+    )
+
+    # another writer may have created them while we waited
+    missing_partition_starts = get_missing_partition_starts(
+        _get_partition_ranges(db_session, table_name),
+        after_block_number,
+        before_block_number,
+    )
+
+    for partition_start in missing_partition_starts:
+        db_session.execute(
+            f"""
+            CREATE TABLE {table_name}_{partition_start}
+                PARTITION OF {table_name}
+                FOR VALUES FROM ({partition_start})
+                TO ({partition_start + BLOCK_PARTITION_SIZE})
+            """
+        )
+
+
+def get_missing_partition_starts(
+    partition_ranges: Sequence[PartitionRange],
+    after_block_number: int,
+    before_block_number: int,
+) -> List[int]:
+    first_partition_start = (
+        after_block_number // BLOCK_PARTITION_SIZE
+    ) * BLOCK_PARTITION_SIZE
+
+    return [
+        partition_start
+        for partition_start in range(
+            first_partition_start, before_block_number, BLOCK_PARTITION_SIZE
+        )
+        if not any(
+            _overlaps(
+                partition_range,
+                (partition_start, partition_start + BLOCK_PARTITION_SIZE),
+            )
+            for partition_range in partition_ranges
+        )
+    ]
+
+
+def parse_partition_bound(partition_bound: str) -> PartitionRange:
+    match = PARTITION_BOUND_PATTERN.fullmatch(partition_bound)
+    if match is None:
+        raise ValueError(f"Unexpected partition bound {partition_bound}")
+
+    return _parse_bound_value(match.group(1)), _parse_bound_value(match.group(2))
+
+
+def get_protocol_value(protocol: Optional[Protocol]) -> Optional[str]:
+    if protocol is None:
+        return None
+
+    return protocol.value
+
+
+def _get_transaction_keys(rows: Iterable[Sequence[Any]]) -> Set[TransactionKey]:
+    return {
+        (int(block_number), transaction_hash) for block_number, transaction_hash in rows
+    }
+
+
+def _count_rows_by_transaction_key(
+    rows: Iterable[Sequence[Any]],
+) -> DefaultDict[TransactionKey, Counter]:
+    rows_by_key: DefaultDict[TransactionKey, Counter] = defaultdict(Counter)
+
+    for row in rows:
+        block_number, transaction_hash = row[0], row[1]
+        rows_by_key[(int(block_number), transaction_hash)][tuple(row[2:])] += 1
+
+    return rows_by_key
+
+
+def _get_partition_ranges(db_session, table_name: str) -> List[PartitionRange]:
+    result = db_session.execute(
+        """
+        SELECT pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+        WHERE
+            pg_inherits.inhparent = to_regclass(:table_name) AND
+            child.relpartbound IS NOT NULL
+        """,
+        params={"table_name": table_name},
     )
 
-    db_session.commit()
+    return [
+        parse_partition_bound(partition_bound)
+        for (partition_bound,) in result.fetchall()
+        if partition_bound != "DEFAULT"
+    ]
+
+
+def _parse_bound_value(bound_value: str) -> Optional[int]:
+    if bound_value in ("MINVALUE", "MAXVALUE"):
+        return None
+
+    return int(bound_value.strip("'"))
+
+
+def _overlaps(partition_range: PartitionRange, block_range: Tuple[int, int]) -> bool:
+    partition_start, partition_end = partition_range
+    block_start, block_end = block_range
+
+    return (partition_start is None or partition_start < block_end) and (
+        partition_end is None or block_start < partition_end
+    )
+
+
+def _comparable(model_class: Type[Base], table_name: str, column_name: str) -> str:
+    column = model_class.__table__.columns.get(column_name)
+
+    # json has no equality operator, compare its text instead
+    if column is not None and isinstance(column.type, JSON):
+        return f"{table_name}.{column_name}::text"
+
+    return f"{table_name}.{column_name}"
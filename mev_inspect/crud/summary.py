@@ -1,3 +1,29 @@
+from typing import List, Set
+
+from mev_inspect.db import to_postgres_list, write_as_csv
+from mev_inspect.schemas.mev_summary import MevSummary
+
+from .block_prices import update_block_prices_for_block_range
+from .shared import TransactionKey, delete_transactions
+
+MEV_SUMMARY_COLUMNS = (
+    "block_number",
+    "block_timestamp",
+    "protocol",
+    "transaction_hash",
+    "type",
+    "gross_profit_usd",
+    "miner_payment_usd",
+    "gas_used",
+    "gas_price",
+    "coinbase_transfer",
+    "gas_price_with_coinbase_transfer",
+    "miner_address",
+    "base_fee_per_gas",
+    "error",
+    "protocols",
+)
+
 INSERT_ARBITRAGE_SUMMARY_QUERY = """
 INSERT INTO mev_summary (
     SELECT
@@ -8,30 +34,15 @@ INSERT INTO mev_summary (
         a.transaction_hash,
         'arbitrage' AS type,
         (
-            (
-                SELECT usd_price
-                FROM prices
-                WHERE
-                    token_address = a.profit_token_address
-                    AND timestamp <= b.block_timestamp
-                ORDER BY timestamp DESC
-                LIMIT 1
-            ) * a.profit_amount / POWER(10, profit_token.decimals)
+            profit_price.usd_price * a.profit_amount /
+            POWER(10, profit_token.decimals)
         ) AS gross_profit_usd,
         (
             (
                 ((mp.gas_used * mp.gas_price) + mp.coinbase_transfer) /
                 POWER(10, 18)
             ) * 
-            (
-                SELECT usd_price
-                FROM prices p
-                WHERE
-                    p.timestamp <= b.block_timestamp
-                    AND p.token_address = '0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee'
-                ORDER BY p.timestamp DESC
-                LIMIT 1
-            )
+            eth_price.usd_price
         ) AS miner_payment_usd,
         mp.gas_used,
         mp.gas_price,
@@ -44,6 +55,12 @@ INSERT INTO mev_summary (
     FROM arbitrages a
     JOIN blocks b ON b.block_number = a.block_number
     JOIN tokens profit_token ON profit_token.token_address = a.profit_token_address
+    LEFT JOIN block_prices profit_price ON
+        profit_price.block_number = a.block_number AND
+        profit_price.token_address = a.profit_token_address
+    LEFT JOIN block_prices eth_price ON
+        eth_price.block_number = a.block_number AND
+        eth_price.token_address = '0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee'
     JOIN classified_traces ct ON
         ct.block_number = a.block_number AND
         ct.transaction_hash = a.transaction_hash
@@ -81,42 +98,20 @@ INSERT INTO mev_summary (
         l.transaction_hash,
         'liquidation' as type,
         l.received_amount*
-        (
-            SELECT usd_price
-            FROM prices
-            WHERE token_address = l.received_token_address
-            AND timestamp <= b.block_timestamp
-            ORDER BY timestamp DESC
-            LIMIT 1
-        )
+        received_price.usd_price
         /POWER(10, received_token.decimals) 
         
         - 
 
         l.debt_purchase_amount*
-        (
-            SELECT usd_price
-            FROM prices
-            WHERE token_address = l.debt_token_address
-            AND timestamp <= b.block_timestamp
-            ORDER BY timestamp DESC
-            LIMIT 1
-        )
+        debt_price.usd_price
         /POWER(10, debt_token.decimals) as gross_profit_usd,
         (
             (
                 ((mp.gas_used * mp.gas_price) + mp.coinbase_transfer) /
                 POWER(10, 18)
             ) * 
-            (
-                SELECT usd_price
-                FROM prices p
-                WHERE
-                    p.timestamp <= b.block_timestamp
-                    AND p.token_address = '0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee'
-                ORDER BY p.timestamp DESC
-                LIMIT 1
-            )
+            eth_price.usd_price
         ) AS miner_payment_usd,
         mp.gas_used,
         mp.gas_price,
@@ -130,6 +125,15 @@ INSERT INTO mev_summary (
     JOIN blocks b ON b.block_number = l.block_number
     JOIN tokens received_token ON received_token.token_address = l.received_token_address
     JOIN tokens debt_token ON debt_token.token_address = l.debt_token_address
+    LEFT JOIN block_prices received_price ON
+        received_price.block_number = l.block_number AND
+        received_price.token_address = l.received_token_address
+    LEFT JOIN block_prices debt_price ON
+        debt_price.block_number = l.block_number AND
+        debt_price.token_address = l.debt_token_address
+    LEFT JOIN block_prices eth_price ON
+        eth_price.block_number = l.block_number AND
+        eth_price.token_address = '0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee'
     JOIN miner_payments mp ON
         mp.block_number = l.block_number AND
         mp.transaction_hash = l.transaction_hash
@@ -152,12 +156,71 @@ def update_summary_for_block_range(
     after_block_number: int,
     before_block_number: int,
 ) -> None:
+    """
+    Rebuilds the summary from the rows already written for the range,
+    for example once prices for its blocks have been backfilled
+
+    Inspection values the summary in process, so the range's block prices
+    are only brought up to date here, right before the inserts join them.
+    """
+    update_block_prices_for_block_range(
+        db_session, after_block_number, before_block_number
+    )
     _delete_summary_for_block_range(db_session, after_block_number, before_block_number)
     _insert_into_summary_for_block_range(
         db_session, after_block_number, before_block_number
     )
 
 
+def replace_summary_for_transactions(
+    db_session,
+    transaction_keys: Set[TransactionKey],
+    mev_summaries: List[MevSummary],
+) -> None:
+    """
+    Rewrites the summary of only the given transactions, from summaries
+    that can cover more than them
+    """
+    delete_transactions(db_session, "mev_summary", transaction_keys)
+    write_summaries(
+        db_session,
+        [
+            mev_summary
+            for mev_summary in mev_summaries
+            if (mev_summary.block_number, mev_summary.transaction_hash)
+            in transaction_keys
+        ],
+    )
+
+
+def write_summaries(
+    db_session,
+    mev_summaries: List[MevSummary],
+) -> None:
+    items = (
+        (
+            mev_summary.block_number,
+            mev_summary.block_timestamp,
+            mev_summary.protocol,
+            mev_summary.transaction_hash,
+            mev_summary.type.value,
+            mev_summary.gross_profit_usd,
+            mev_summary.miner_payment_usd,
+            mev_summary.gas_used,
+            mev_summary.gas_price,
+            mev_summary.coinbase_transfer,
+            mev_summary.gas_price_with_coinbase_transfer,
+            mev_summary.miner_address,
+            mev_summary.base_fee_per_gas,
+            mev_summary.error,
+            to_postgres_list(mev_summary.protocols),
+        )
+        for mev_summary in mev_summaries
+    )
+
+    write_as_csv(db_session, "mev_summary", items, columns=MEV_SUMMARY_COLUMNS)
+
+
 def _delete_summary_for_block_range(
     db_session,
     after_block_number: int,
@@ -176,8 +239,6 @@ def _delete_summary_for_block_range(
         },
     )
 
-    db_session.commit()
-
 
 def _insert_into_summary_for_block_range(
     db_session,
@@ -199,5 +260,3 @@ def _insert_into_summary_for_block_range(
             "before_block_number": before_block_number,
         },
     )
-
-    db_session.commit()
@@ -1,10 +1,35 @@
-import json
-from typing import List
+from typing import Any, Iterator, List, Sequence, Set
 
+from mev_inspect.db import write_as_binary
 from mev_inspect.models.swaps import SwapModel
+from mev_inspect.pg_binary import encode_int_array, encode_numeric, encode_text
 from mev_inspect.schemas.swaps import Swap
 
-from .shared import delete_by_block_range
+from .shared import (
+    TransactionKey,
+    delete_by_block_range,
+    get_protocol_value,
+    replace_by_block_range,
+)
+
+SWAP_KEY_COLUMNS = ("block_number", "transaction_hash", "trace_address")
+
+SWAP_COLUMNS = (
+    ("abi_name", encode_text),
+    ("transaction_hash", encode_text),
+    ("transaction_position", encode_numeric),
+    ("block_number", encode_numeric),
+    ("trace_address", encode_int_array),
+    ("protocol", encode_text),
+    ("contract_address", encode_text),
+    ("from_address", encode_text),
+    ("to_address", encode_text),
+    ("token_in_address", encode_text),
+    ("token_in_amount", encode_numeric),
+    ("token_out_address", encode_text),
+    ("token_out_amount", encode_numeric),
+    ("error", encode_text),
+)
 
 
 def delete_swaps_for_blocks(
@@ -18,14 +43,49 @@ def delete_swaps_for_blocks(
         after_block_number,
         before_block_number,
     )
-    db_session.commit()
 
 
 def write_swaps(
     db_session,
     swaps: List[Swap],
 ) -> None:
-    models = [SwapModel(**json.loads(swap.json())) for swap in swaps]
+    write_as_binary(db_session, "swaps", SWAP_COLUMNS, _get_swap_items(swaps))
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+
+def replace_swaps_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    swaps: List[Swap],
+) -> Set[TransactionKey]:
+    return replace_by_block_range(
+        db_session,
+        SwapModel,
+        SWAP_KEY_COLUMNS,
+        SWAP_COLUMNS,
+        after_block_number,
+        before_block_number,
+        _get_swap_items(swaps),
+    )
+
+
+def _get_swap_items(swaps: List[Swap]) -> Iterator[Sequence[Any]]:
+    return (
+        (
+            swap.abi_name,
+            swap.transaction_hash,
+            swap.transaction_position,
+            swap.block_number,
+            swap.trace_address,
+            get_protocol_value(swap.protocol),
+            swap.contract_address,
+            swap.from_address,
+            swap.to_address,
+            swap.token_in_address,
+            swap.token_in_amount,
+            swap.token_out_address,
+            swap.token_out_amount,
+            swap.error,
+        )
+        for swap in swaps
+    )
@@ -0,0 +1,9 @@
+from typing import Dict
+
+
+def find_token_decimals(db_session) -> Dict[str, int]:
+    result = db_session.execute("SELECT token_address, decimals FROM tokens")
+
+    return {
+        token_address: int(decimals) for token_address, decimals in result.fetchall()
+    }
@@ -1,12 +1,49 @@
-import json
 from datetime import datetime, timezone
-from typing import List
+from functools import partial
+from typing import Any, Iterator, List, Sequence, Set
 
-from mev_inspect.db import to_postgres_list, write_as_csv
+from pydantic.json import custom_pydantic_encoder
+
+from mev_inspect.db import write_as_binary
 from mev_inspect.models.traces import ClassifiedTraceModel
+from mev_inspect.pg_binary import (
+    encode_int_array,
+    encode_json,
+    encode_numeric,
+    encode_text,
+    encode_timestamp,
+)
 from mev_inspect.schemas.traces import ClassifiedTrace
 
-from .shared import delete_by_block_range
+from .shared import TransactionKey, delete_by_block_range, replace_by_block_range
+
+# same encoding as ClassifiedTrace.json(), so bytes inputs are stored as hex
+_encode_inputs_value = partial(
+    custom_pydantic_encoder, ClassifiedTrace.__config__.json_encoders
+)
+
+CLASSIFIED_TRACE_KEY_COLUMNS = ("block_number", "transaction_hash", "trace_address")
+
+CLASSIFIED_TRACE_COLUMNS = (
+    ("classified_at", encode_timestamp),
+    ("transaction_hash", encode_text),
+    ("block_number", encode_numeric),
+    ("classification", encode_text),
+    ("trace_type", encode_text),
+    ("protocol", encode_text),
+    ("abi_name", encode_text),
+    ("function_name", encode_text),
+    ("function_signature", encode_text),
+    ("inputs", partial(encode_json, default=_encode_inputs_value)),
+    ("from_address", encode_text),
+    ("to_address", encode_text),
+    ("gas", encode_numeric),
+    ("value", encode_numeric),
+    ("gas_used", encode_numeric),
+    ("error", encode_text),
+    ("trace_address", encode_int_array),
+    ("transaction_position", encode_numeric),
+)
 
 
 def delete_classified_traces_for_blocks(
@@ -21,15 +58,42 @@ def delete_classified_traces_for_blocks(
         before_block_number,
     )
 
-    db_session.commit()
-
 
 def write_classified_traces(
     db_session,
     classified_traces: List[ClassifiedTrace],
 ) -> None:
+    write_as_binary(
+        db_session,
+        "classified_traces",
+        CLASSIFIED_TRACE_COLUMNS,
+        _get_classified_trace_items(classified_traces),
+    )
+
+
+def replace_classified_traces_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    classified_traces: List[ClassifiedTrace],
+) -> Set[TransactionKey]:
+    return replace_by_block_range(
+        db_session,
+        ClassifiedTraceModel,
+        CLASSIFIED_TRACE_KEY_COLUMNS,
+        CLASSIFIED_TRACE_COLUMNS,
+        after_block_number,
+        before_block_number,
+        _get_classified_trace_items(classified_traces),
+        unchanged_columns=("classified_at",),
+    )
+
+
+def _get_classified_trace_items(
+    classified_traces: List[ClassifiedTrace],
+) -> Iterator[Sequence[Any]]:
     classified_at = datetime.now(timezone.utc)
-    items = (
+    return (
         (
             classified_at,
             trace.transaction_hash,
@@ -40,23 +104,16 @@ def write_classified_traces(
             trace.abi_name,
             trace.function_name,
             trace.function_signature,
-            _inputs_as_json(trace),
+            # stored wrapped in a list
+            [trace.inputs],
             trace.from_address,
             trace.to_address,
             trace.gas,
             trace.value,
             trace.gas_used,
             trace.error,
-            to_postgres_list(trace.trace_address),
+            trace.trace_address,
             trace.transaction_position,
         )
         for trace in classified_traces
     )
-
-    write_as_csv(db_session, "classified_traces", items)
-
-
-def _inputs_as_json(trace) -> str:
-    inputs = json.dumps(json.loads(trace.json(include={"inputs"}))["inputs"])
-    inputs_with_array = f"[{inputs}]"
-    return inputs_with_array
@@ -1,10 +1,23 @@
-import json
-from typing import List
+from typing import Any, Iterator, List, Sequence, Set
 
+from mev_inspect.db import write_as_binary
 from mev_inspect.models.transfers import TransferModel
+from mev_inspect.pg_binary import encode_int_array, encode_numeric, encode_text
 from mev_inspect.schemas.transfers import Transfer
 
-from .shared import delete_by_block_range
+from .shared import TransactionKey, delete_by_block_range, replace_by_block_range
+
+TRANSFER_KEY_COLUMNS = ("block_number", "transaction_hash", "trace_address")
+
+TRANSFER_COLUMNS = (
+    ("block_number", encode_numeric),
+    ("transaction_hash", encode_text),
+    ("trace_address", encode_int_array),
+    ("from_address", encode_text),
+    ("to_address", encode_text),
+    ("token_address", encode_text),
+    ("amount", encode_numeric),
+)
 
 
 def delete_transfers_for_blocks(
@@ -19,14 +32,43 @@ def delete_transfers_for_blocks(
         before_block_number,
     )
 
-    db_session.commit()
-
 
 def write_transfers(
     db_session,
     transfers: List[Transfer],
 ) -> None:
-    models = [TransferModel(**json.loads(transfer.json())) for transfer in transfers]
+    write_as_binary(
+        db_session, "transfers", TRANSFER_COLUMNS, _get_transfer_items(transfers)
+    )
+
 
-    db_session.bulk_save_objects(models)
-    db_session.commit()
+def replace_transfers_for_blocks(
+    db_session,
+    after_block_number: int,
+    before_block_number: int,
+    transfers: List[Transfer],
+) -> Set[TransactionKey]:
+    return replace_by_block_range(
+        db_session,
+        TransferModel,
+        TRANSFER_KEY_COLUMNS,
+        TRANSFER_COLUMNS,
+        after_block_number,
+        before_block_number,
+        _get_transfer_items(transfers),
+    )
+
+
+def _get_transfer_items(transfers: List[Transfer]) -> Iterator[Sequence[Any]]:
+    return (
+        (
+            transfer.block_number,
+            transfer.transaction_hash,
+            transfer.trace_address,
+            transfer.from_address,
+            transfer.to_address,
+            transfer.token_address,
+            transfer.amount,
+        )
+        for transfer in transfers
+    )
@@ -1,10 +1,11 @@
 import os
-from typing import Any, Iterable, List, Optional
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
 
 from sqlalchemy import create_engine, orm
 from sqlalchemy.orm import sessionmaker
 
-from mev_inspect.text_io import StringIteratorIO
+from mev_inspect.pg_binary import Encoder, iter_copy_data
+from mev_inspect.text_io import BytesIteratorIO, StringIteratorIO
 
 
 def get_trace_database_uri() -> Optional[str]:
@@ -71,19 +72,57 @@ def write_as_csv(
     db_session,
     table_name: str,
     items: Iterable[Iterable[Any]],
+    columns: Optional[Sequence[str]] = None,
 ) -> None:
+    """
+    Writes items to table_name with COPY, in the session's transaction
+
+    Without columns, items must have a value for every column of the
+    table, in order.
+    """
     csv_iterator = StringIteratorIO(
         ("|".join(map(_clean_csv_value, item)) + "\n" for item in items)
     )
 
     with db_session.connection().connection.cursor() as cursor:
-        cursor.copy_from(csv_iterator, table_name, sep="|")
+        cursor.copy_from(csv_iterator, table_name, sep="|", columns=columns)
+
+
+def write_as_binary(
+    db_session,
+    table_name: str,
+    columns: Sequence[Tuple[str, Encoder]],
+    items: Iterable[Sequence[Any]],
+) -> None:
+    """
+    Writes items to table_name with a binary COPY, in the session's transaction
+
+    columns are (name, encoder) pairs. Values are encoded straight to
+    Postgres' binary representation of the column's type, so no text is
+    formatted or parsed on either side.
+    """
+    column_names = ", ".join(name for name, _ in columns)
+    copy_data = BytesIteratorIO(
+        iter_copy_data([encoder for _, encoder in columns], items)
+    )
+
+    with db_session.connection().connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table_name} ({column_names}) FROM STDIN WITH (FORMAT binary)",
+            copy_data,
+        )
 
 
 def _clean_csv_value(value: Optional[Any]) -> str:
     if value is None:
         return r"\N"
-    return str(value).replace("\n", "\\n")
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("|", "\\|")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
 
 
 def to_postgres_list(values: List[Any]) -> str:
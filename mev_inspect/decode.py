@@ -1,48 +1,128 @@
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional
 
-import eth_utils.abi
-from eth_abi import decode_abi
+from eth_abi.decoding import ContextFramesBytesIO, TupleDecoder
 from eth_abi.exceptions import InsufficientDataBytes, NonEmptyPaddingBytes
+from eth_abi.registry import registry
 from hexbytes._utils import hexstr_to_bytes
+from pydantic import BaseModel
 
-from mev_inspect.schemas.abi import ABI, ABIFunctionDescription
+from mev_inspect.abi import compile_abi
+from mev_inspect.schemas.abi import ABI, CompiledABI, CompiledABIFunction
 from mev_inspect.schemas.call_data import CallData
 
 # 0x + 8 characters
 SELECTOR_LENGTH = 10
 
 
+class DecodeCacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    size: int = 0
+    max_size: int = 0
+
+    def __add__(self, other: "DecodeCacheStats") -> "DecodeCacheStats":
+        return DecodeCacheStats(
+            hits=self.hits + other.hits,
+            misses=self.misses + other.misses,
+            size=self.size + other.size,
+            max_size=self.max_size + other.max_size,
+        )
+
+
 class ABIDecoder:
-    def __init__(self, abi: ABI):
-        self._functions_by_selector: Dict[str, ABIFunctionDescription] = {
-            description.get_selector(): description
-            for description in abi
-            if isinstance(description, ABIFunctionDescription)
+    """
+    Decodes call data for the functions of an ABI
+
+    The eth_abi decoder for each function's inputs is built the first time the
+    function is seen and reused after that.
+
+    If cache_size is positive, the most recently decoded call data is kept in
+    a bounded LRU cache keyed on the raw call data. Cached results are shared
+    between calls, so callers must not mutate them.
+    """
+
+    def __init__(self, abi: ABI, cache_size: int = 0):
+        self._init(compile_abi(abi), cache_size)
+
+    @classmethod
+    def from_compiled_abi(
+        cls, compiled_abi: CompiledABI, cache_size: int = 0
+    ) -> "ABIDecoder":
+        decoder = cls.__new__(cls)
+        decoder._init(compiled_abi, cache_size)
+        return decoder
+
+    def _init(self, compiled_abi: CompiledABI, cache_size: int) -> None:
+        self._functions_by_selector: Dict[str, CompiledABIFunction] = {
+            function.selector: function for function in compiled_abi
         }
+        self._input_decoders_by_selector: Dict[str, TupleDecoder] = {}
 
-    def decode(self, data: str) -> Optional[CallData]:
-        selector, params = data[:SELECTOR_LENGTH], data[SELECTOR_LENGTH:]
+        self._cache: "OrderedDict[str, Optional[CallData]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def get_selectors(self) -> List[str]:
+        return list(self._functions_by_selector.keys())
 
+    def get_cache_stats(self) -> DecodeCacheStats:
+        return DecodeCacheStats(
+            hits=self._cache_hits,
+            misses=self._cache_misses,
+            size=len(self._cache),
+            max_size=self._cache_size,
+        )
+
+    def decode(self, data: str) -> Optional[CallData]:
+        selector = data[:SELECTOR_LENGTH]
         func = self._functions_by_selector.get(selector)
 
         if func is None:
             return None
 
-        names = [input.name for input in func.inputs]
-        types = [
-            input.type
-            if input.type != "tuple"
-            else eth_utils.abi.collapse_if_tuple(input.dict())
-            for input in func.inputs
-        ]
+        if self._cache_size <= 0:
+            return self._decode_function(func, data)
+
+        if data in self._cache:
+            self._cache_hits += 1
+            self._cache.move_to_end(data)
+            return self._cache[data]
+
+        self._cache_misses += 1
+        call_data = self._decode_function(func, data)
+
+        self._cache[data] = call_data
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+        return call_data
+
+    def _decode_function(
+        self, func: CompiledABIFunction, data: str
+    ) -> Optional[CallData]:
+        input_decoder = self._get_input_decoder(func)
+        params = hexstr_to_bytes(data[SELECTOR_LENGTH:])
 
         try:
-            decoded = decode_abi(types, hexstr_to_bytes(params))
+            decoded = input_decoder(ContextFramesBytesIO(params))
         except (InsufficientDataBytes, NonEmptyPaddingBytes, OverflowError):
             return None
 
         return CallData(
             function_name=func.name,
-            function_signature=func.get_signature(),
-            inputs={name: value for name, value in zip(names, decoded)},
+            function_signature=func.signature,
+            inputs={name: value for name, value in zip(func.input_names, decoded)},
         )
+
+    def _get_input_decoder(self, func: CompiledABIFunction) -> TupleDecoder:
+        input_decoder = self._input_decoders_by_selector.get(func.selector)
+
+        if input_decoder is None:
+            input_decoder = TupleDecoder(
+                decoders=[registry.get_decoder(type) for type in func.input_types]
+            )
+            self._input_decoders_by_selector[func.selector] = input_decoder
+
+        return input_decoder
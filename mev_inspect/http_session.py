@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, replace
+from typing import Dict
+
+from aiohttp import ClientSession, TCPConnector, TraceConfig
+
+DEFAULT_CONNECTION_LIMIT = 100
+DEFAULT_CONNECTION_LIMIT_PER_HOST = 10
+DEFAULT_KEEPALIVE_TIMEOUT_SECONDS = 60
+DEFAULT_DNS_CACHE_TTL_SECONDS = 300
+
+# responses are decompressed by aiohttp
+ACCEPT_ENCODING = "gzip, deflate"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConnectionStats:
+    requests: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+    dns_cache_hits: int = 0
+    dns_cache_misses: int = 0
+
+    @property
+    def reuse_ratio(self) -> float:
+        connections = self.connections_created + self.connections_reused
+        if connections == 0:
+            return 0.0
+
+        return self.connections_reused / connections
+
+
+class SharedHTTPSession:
+    """
+    Process wide aiohttp session for RPC and other outgoing HTTP traffic
+
+    Connections are kept alive and reused across requests, DNS lookups are
+    cached and responses are requested compressed, so requests to the same
+    node pay for a TCP and TLS handshake only when a new connection is needed.
+
+    aiohttp sessions belong to the event loop they are created in, so one
+    session is created per running loop. Callers close it before their loop
+    ends, sessions of loops closed without that are dropped with a warning.
+    """
+
+    def __init__(
+        self,
+        connection_limit_per_host: int = DEFAULT_CONNECTION_LIMIT_PER_HOST,
+        keepalive_timeout_seconds: float = DEFAULT_KEEPALIVE_TIMEOUT_SECONDS,
+        dns_cache_ttl_seconds: int = DEFAULT_DNS_CACHE_TTL_SECONDS,
+    ):
+        self.connection_limit_per_host = connection_limit_per_host
+        self.keepalive_timeout_seconds = keepalive_timeout_seconds
+        self.dns_cache_ttl_seconds = dns_cache_ttl_seconds
+
+        self._lock = threading.Lock()
+        self._sessions: Dict[asyncio.AbstractEventLoop, ClientSession] = {}
+        self._stats = ConnectionStats()
+
+    def reserve_connections_per_host(self, connection_limit_per_host: int) -> None:
+        """
+        Raises the per host connection limit of sessions created from now on
+
+        The limit is never lowered, so several users of the session in one
+        process each get at least the connections they asked for.
+        """
+        with self._lock:
+            self.connection_limit_per_host = max(
+                self.connection_limit_per_host, connection_limit_per_host
+            )
+
+    def get_session(self) -> ClientSession:
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            for session_loop in list(self._sessions):
+                if session_loop.is_closed():
+                    # its connections can't be closed without its loop
+                    logger.warning("Dropping HTTP session left open by a closed loop")
+                    del self._sessions[session_loop]
+
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                session = self._create_session()
+                self._sessions[loop] = session
+
+            return session
+
+    def get_stats(self) -> ConnectionStats:
+        with self._lock:
+            return replace(self._stats)
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            session = self._sessions.pop(loop, None)
+
+        if session is not None:
+            await session.close()
+
+    def _create_session(self) -> ClientSession:
+        connector = TCPConnector(
+            limit=max(DEFAULT_CONNECTION_LIMIT, self.connection_limit_per_host),
+            limit_per_host=self.connection_limit_per_host,
+            keepalive_timeout=self.keepalive_timeout_seconds,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl_seconds,
+        )
+
+        trace_config = TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(self._on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(self._on_dns_cache_miss)
+
+        logger.info(
+            "Creating HTTP session with "
+            f"{self.connection_limit_per_host} connections per host"
+        )
+        return ClientSession(
+            connector=connector,
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+            auto_decompress=True,
+            trace_configs=[trace_config],
+        )
+
+    def _increment(self, stat: str) -> None:
+        with self._lock:
+            setattr(self._stats, stat, getattr(self._stats, stat) + 1)
+
+    async def _on_request_start(self, _session, _context, _params) -> None:
+        self._increment("requests")
+
+    async def _on_connection_create_end(self, _session, _context, _params) -> None:
+        self._increment("connections_created")
+
+    async def _on_connection_reuseconn(self, _session, _context, _params) -> None:
+        self._increment("connections_reused")
+
+    async def _on_dns_cache_hit(self, _session, _context, _params) -> None:
+        self._increment("dns_cache_hits")
+
+    async def _on_dns_cache_miss(self, _session, _context, _params) -> None:
+        self._increment("dns_cache_misses")
+
+
+_shared_http_session = SharedHTTPSession()
+
+
+def get_shared_http_session() -> SharedHTTPSession:
+    return _shared_http_session
+
+
+def log_connection_stats() -> None:
+    stats = _shared_http_session.get_stats()
+    logger.info(
+        f"HTTP requests: {stats.requests}, "
+        f"connections created: {stats.connections_created}, "
+        f"reused: {stats.connections_reused} ({stats.reuse_ratio:.0%}), "
+        f"DNS cache hits: {stats.dns_cache_hits}, misses: {stats.dns_cache_misses}"
+    )
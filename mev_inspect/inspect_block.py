@@ -1,22 +1,25 @@
+import asyncio
 import logging
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Set
 
 from sqlalchemy import orm
 from web3 import Web3
 
-from mev_inspect.arbitrages import get_arbitrages
-from mev_inspect.block import create_from_block_number
+from mev_inspect.block import (
+    TraceDBBlocks,
+    create_from_block_number,
+    find_block_range,
+    is_block_range_cached,
+)
+from mev_inspect.block_cache import BlockCache
+from mev_inspect.block_inspection import BlockInspection, inspect_block_data
+from mev_inspect.classifier_pool import ClassifierPool
 from mev_inspect.classifiers.trace import TraceClassifier
-from mev_inspect.crud.arbitrages import delete_arbitrages_for_blocks, write_arbitrages
+from mev_inspect.crud.arbitrages import replace_arbitrages_for_blocks
 from mev_inspect.crud.blocks import delete_blocks, write_blocks
-from mev_inspect.crud.liquidations import (
-    delete_liquidations_for_blocks,
-    write_liquidations,
-)
-from mev_inspect.crud.miner_payments import (
-    delete_miner_payments_for_blocks,
-    write_miner_payments,
-)
+from mev_inspect.crud.liquidations import replace_liquidations_for_blocks
+from mev_inspect.crud.miner_payments import replace_miner_payments_for_blocks
 from mev_inspect.crud.nft_trades import delete_nft_trades_for_blocks, write_nft_trades
 from mev_inspect.crud.punks import (
     delete_punk_bid_acceptances_for_blocks,
@@ -26,22 +29,18 @@ from mev_inspect.crud.punks import (
     write_punk_bids,
     write_punk_snipes,
 )
-from mev_inspect.crud.sandwiches import delete_sandwiches_for_blocks, write_sandwiches
-from mev_inspect.crud.summary import update_summary_for_block_range
-from mev_inspect.crud.swaps import delete_swaps_for_blocks, write_swaps
-from mev_inspect.crud.traces import (
-    delete_classified_traces_for_blocks,
-    write_classified_traces,
-)
-from mev_inspect.crud.transfers import delete_transfers_for_blocks, write_transfers
-from mev_inspect.liquidations import get_liquidations
-from mev_inspect.miner_payments import get_miner_payments
-from mev_inspect.nft_trades import get_nft_trades
-from mev_inspect.punks import get_punk_bid_acceptances, get_punk_bids, get_punk_snipes
-from mev_inspect.sandwiches import get_sandwiches
+from mev_inspect.crud.sandwiches import replace_sandwiches_for_blocks
+from mev_inspect.crud.shared import TransactionKey
+from mev_inspect.crud.summary import replace_summary_for_transactions
+from mev_inspect.crud.swaps import replace_swaps_for_blocks
+from mev_inspect.crud.traces import replace_classified_traces_for_blocks
+from mev_inspect.crud.transfers import replace_transfers_for_blocks
+from mev_inspect.mev_summary import get_mev_summaries
+from mev_inspect.price_oracle import load_price_oracle
 from mev_inspect.schemas.arbitrages import Arbitrage
 from mev_inspect.schemas.blocks import Block
 from mev_inspect.schemas.liquidations import Liquidation
+from mev_inspect.schemas.mev_summary import MevSummary
 from mev_inspect.schemas.miner_payments import MinerPayment
 from mev_inspect.schemas.nft_trades import NftTrade
 from mev_inspect.schemas.punk_accept_bid import PunkBidAcceptance
@@ -51,8 +50,6 @@ from mev_inspect.schemas.sandwiches import Sandwich
 from mev_inspect.schemas.swaps import Swap
 from mev_inspect.schemas.traces import ClassifiedTrace
 from mev_inspect.schemas.transfers import Transfer
-from mev_inspect.swaps import get_swaps
-from mev_inspect.transfers import get_transfers
 
 logger = logging.getLogger(__name__)
 
@@ -64,6 +61,8 @@ async def inspect_block(
     block_number: int,
     trace_db_session: Optional[orm.Session],
     should_write_classified_traces: bool = True,
+    classifier_pool: Optional[ClassifierPool] = None,
+    block_cache: Optional[BlockCache] = None,
 ):
     await inspect_many_blocks(
         inspect_db_session,
@@ -73,6 +72,8 @@ async def inspect_block(
         block_number + 1,
         trace_db_session,
         should_write_classified_traces,
+        classifier_pool,
+        block_cache,
     )
 
 
@@ -84,153 +85,221 @@ async def inspect_many_blocks(
     before_block_number: int,
     trace_db_session: Optional[orm.Session],
     should_write_classified_traces: bool = True,
+    classifier_pool: Optional[ClassifierPool] = None,
+    block_cache: Optional[BlockCache] = None,
 ):
     all_blocks: List[Block] = []
-    all_classified_traces: List[ClassifiedTrace] = []
-    all_transfers: List[Transfer] = []
-    all_swaps: List[Swap] = []
-    all_arbitrages: List[Arbitrage] = []
-    all_liquidations: List[Liquidation] = []
-    all_sandwiches: List[Sandwich] = []
-
-    all_punk_bids: List[PunkBid] = []
-    all_punk_bid_acceptances: List[PunkBidAcceptance] = []
-    all_punk_snipes: List[PunkSnipe] = []
-
-    all_miner_payments: List[MinerPayment] = []
-
-    all_nft_trades: List[NftTrade] = []
+    block_inspections: List[BlockInspection] = []
+    pending_block_inspections = []
+
+    trace_db_blocks = (
+        find_block_range(trace_db_session, after_block_number, before_block_number)
+        if trace_db_session is not None
+        and not is_block_range_cached(
+            block_cache, after_block_number, before_block_number
+        )
+        else TraceDBBlocks()
+    )
 
     for block_number in range(after_block_number, before_block_number):
         block = await create_from_block_number(
             w3,
             block_number,
             trace_db_session,
+            trace_db_blocks=trace_db_blocks,
+            block_cache=block_cache,
         )
 
-        logger.info(f"Block: {block_number} -- Total traces: {len(block.traces)}")
+        log_block_totals(block)
+
+        all_blocks.append(block)
 
-        total_transactions = len(
-            set(
-                t.transaction_hash
-                for t in block.traces
-                if t.transaction_hash is not None
+        if classifier_pool is None:
+            block_inspections.append(inspect_block_data(trace_classifier, block))
+        else:
+            # keep fetching while the pool classifies
+            pending_block_inspections.append(
+                asyncio.ensure_future(classifier_pool.inspect_block(block))
             )
-        )
-        logger.info(
-            f"Block: {block_number} -- Total transactions: {total_transactions}"
-        )
 
-        classified_traces = trace_classifier.classify(block.traces)
+    block_inspections += await asyncio.gather(*pending_block_inspections)
+
+    if classifier_pool is None:
         logger.info(
-            f"Block: {block_number} -- Returned {len(classified_traces)} classified traces"
+            f"Decode cache stats: {trace_classifier.get_decode_cache_stats().dict()}"
         )
 
-        transfers = get_transfers(classified_traces)
-        logger.info(f"Block: {block_number} -- Found {len(transfers)} transfers")
+    write_block_inspections(
+        inspect_db_session,
+        after_block_number,
+        before_block_number,
+        all_blocks,
+        block_inspections,
+        should_write_classified_traces,
+    )
 
-        swaps = get_swaps(classified_traces)
-        logger.info(f"Block: {block_number} -- Found {len(swaps)} swaps")
 
-        arbitrages = get_arbitrages(swaps)
-        logger.info(f"Block: {block_number} -- Found {len(arbitrages)} arbitrages")
+def log_block_totals(block: Block) -> None:
+    logger.info(f"Block: {block.block_number} -- Total traces: {len(block.traces)}")
 
-        liquidations = get_liquidations(classified_traces)
-        logger.info(f"Block: {block_number} -- Found {len(liquidations)} liquidations")
+    total_transactions = len(
+        set(t.transaction_hash for t in block.traces if t.transaction_hash is not None)
+    )
+    logger.info(
+        f"Block: {block.block_number} -- Total transactions: {total_transactions}"
+    )
 
-        sandwiches = get_sandwiches(swaps)
-        logger.info(f"Block: {block_number} -- Found {len(sandwiches)} sandwiches")
 
-        punk_bids = get_punk_bids(classified_traces)
-        punk_bid_acceptances = get_punk_bid_acceptances(classified_traces)
-        punk_snipes = get_punk_snipes(punk_bids, punk_bid_acceptances)
-        logger.info(f"Block: {block_number} -- Found {len(punk_snipes)} punk snipes")
+def write_block_inspections(
+    inspect_db_session: orm.Session,
+    after_block_number: int,
+    before_block_number: int,
+    blocks: List[Block],
+    block_inspections: List[BlockInspection],
+    should_write_classified_traces: bool = True,
+) -> None:
+    """
+    Replaces everything stored for the batch's blocks in one transaction
+
+    The crud deletes and writes don't commit, and rows are written with
+    COPY, so a batch is a single commit and a failed write leaves none of
+    it behind. The largest tables are upserted instead of deleted and
+    rewritten, so rows that didn't change are left alone.
+
+    The MEV summary is valued from the inspections in memory, rather than
+    by joining the written rows back in the database, and only rewritten
+    for transactions whose traces, swaps, miner payments, arbitrages,
+    liquidations or sandwiches changed.
+    """
+    all_classified_traces: List[ClassifiedTrace] = []
+    all_transfers: List[Transfer] = []
+    all_swaps: List[Swap] = []
+    all_arbitrages: List[Arbitrage] = []
+    all_liquidations: List[Liquidation] = []
+    all_sandwiches: List[Sandwich] = []
 
-        nft_trades = get_nft_trades(classified_traces)
-        logger.info(f"Block: {block_number} -- Found {len(nft_trades)} nft trades")
+    all_punk_bids: List[PunkBid] = []
+    all_punk_bid_acceptances: List[PunkBidAcceptance] = []
+    all_punk_snipes: List[PunkSnipe] = []
 
-        miner_payments = get_miner_payments(
-            block.miner, block.base_fee_per_gas, classified_traces, block.receipts
-        )
+    all_miner_payments: List[MinerPayment] = []
 
-        all_blocks.append(block)
-        all_classified_traces.extend(classified_traces)
-        all_transfers.extend(transfers)
-        all_swaps.extend(swaps)
-        all_arbitrages.extend(arbitrages)
-        all_liquidations.extend(liquidations)
-        all_sandwiches.extend(sandwiches)
+    all_nft_trades: List[NftTrade] = []
+
+    for block_inspection in block_inspections:
+        all_classified_traces.extend(block_inspection.classified_traces)
+        all_transfers.extend(block_inspection.transfers)
+        all_swaps.extend(block_inspection.swaps)
+        all_arbitrages.extend(block_inspection.arbitrages)
+        all_liquidations.extend(block_inspection.liquidations)
+        all_sandwiches.extend(block_inspection.sandwiches)
+
+        all_punk_bids.extend(block_inspection.punk_bids)
+        all_punk_bid_acceptances.extend(block_inspection.punk_bid_acceptances)
+        all_punk_snipes.extend(block_inspection.punk_snipes)
 
-        all_punk_bids.extend(punk_bids)
-        all_punk_bid_acceptances.extend(punk_bid_acceptances)
-        all_punk_snipes.extend(punk_snipes)
+        all_nft_trades.extend(block_inspection.nft_trades)
 
-        all_nft_trades.extend(nft_trades)
+        all_miner_payments.extend(block_inspection.miner_payments)
 
-        all_miner_payments.extend(miner_payments)
+    changed_transaction_keys: Set[TransactionKey] = set()
 
     logger.info("Writing data")
-    delete_blocks(inspect_db_session, after_block_number, before_block_number)
-    write_blocks(inspect_db_session, all_blocks)
+    try:
+        delete_blocks(inspect_db_session, after_block_number, before_block_number)
+        write_blocks(inspect_db_session, blocks)
+
+        if should_write_classified_traces:
+            changed_transaction_keys |= replace_classified_traces_for_blocks(
+                inspect_db_session,
+                after_block_number,
+                before_block_number,
+                all_classified_traces,
+            )
 
-    if should_write_classified_traces:
-        delete_classified_traces_for_blocks(
-            inspect_db_session, after_block_number, before_block_number
+        replace_transfers_for_blocks(
+            inspect_db_session, after_block_number, before_block_number, all_transfers
         )
-        write_classified_traces(inspect_db_session, all_classified_traces)
 
-    delete_transfers_for_blocks(
-        inspect_db_session, after_block_number, before_block_number
-    )
-    write_transfers(inspect_db_session, all_transfers)
+        changed_transaction_keys |= replace_swaps_for_blocks(
+            inspect_db_session, after_block_number, before_block_number, all_swaps
+        )
 
-    delete_swaps_for_blocks(inspect_db_session, after_block_number, before_block_number)
-    write_swaps(inspect_db_session, all_swaps)
+        changed_transaction_keys |= replace_arbitrages_for_blocks(
+            inspect_db_session,
+            after_block_number,
+            before_block_number,
+            all_arbitrages,
+        )
 
-    delete_arbitrages_for_blocks(
-        inspect_db_session, after_block_number, before_block_number
-    )
-    write_arbitrages(inspect_db_session, all_arbitrages)
+        changed_transaction_keys |= replace_liquidations_for_blocks(
+            inspect_db_session,
+            after_block_number,
+            before_block_number,
+            all_liquidations,
+        )
 
-    delete_liquidations_for_blocks(
-        inspect_db_session, after_block_number, before_block_number
-    )
-    write_liquidations(inspect_db_session, all_liquidations)
+        changed_transaction_keys |= replace_sandwiches_for_blocks(
+            inspect_db_session,
+            after_block_number,
+            before_block_number,
+            all_sandwiches,
+        )
 
-    delete_sandwiches_for_blocks(
-        inspect_db_session, after_block_number, before_block_number
-    )
-    write_sandwiches(inspect_db_session, all_sandwiches)
+        delete_punk_bids_for_blocks(
+            inspect_db_session, after_block_number, before_block_number
+        )
+        write_punk_bids(inspect_db_session, all_punk_bids)
 
-    delete_punk_bids_for_blocks(
-        inspect_db_session, after_block_number, before_block_number
-    )
-    write_punk_bids(inspect_db_session, all_punk_bids)
+        delete_punk_bid_acceptances_for_blocks(
+            inspect_db_session, after_block_number, before_block_number
+        )
+        write_punk_bid_acceptances(inspect_db_session, all_punk_bid_acceptances)
 
-    delete_punk_bid_acceptances_for_blocks(
-        inspect_db_session, after_block_number, before_block_number
-    )
-    write_punk_bid_acceptances(inspect_db_session, all_punk_bid_acceptances)
+        delete_punk_snipes_for_blocks(
+            inspect_db_session, after_block_number, before_block_number
+        )
+        write_punk_snipes(inspect_db_session, all_punk_snipes)
 
-    delete_punk_snipes_for_blocks(
-        inspect_db_session, after_block_number, before_block_number
-    )
-    write_punk_snipes(inspect_db_session, all_punk_snipes)
+        delete_nft_trades_for_blocks(
+            inspect_db_session, after_block_number, before_block_number
+        )
+        write_nft_trades(inspect_db_session, all_nft_trades)
 
-    delete_nft_trades_for_blocks(
-        inspect_db_session, after_block_number, before_block_number
-    )
-    write_nft_trades(inspect_db_session, all_nft_trades)
+        changed_transaction_keys |= replace_miner_payments_for_blocks(
+            inspect_db_session,
+            after_block_number,
+            before_block_number,
+            all_miner_payments,
+        )
 
-    delete_miner_payments_for_blocks(
-        inspect_db_session, after_block_number, before_block_number
-    )
-    write_miner_payments(inspect_db_session, all_miner_payments)
+        if len(changed_transaction_keys) > 0:
+            replace_summary_for_transactions(
+                inspect_db_session,
+                changed_transaction_keys,
+                _get_mev_summaries(inspect_db_session, blocks, block_inspections),
+            )
+        inspect_db_session.commit()
+    except BaseException:
+        inspect_db_session.rollback()
+        raise
 
-    update_summary_for_block_range(
-        inspect_db_session,
-        after_block_number,
-        before_block_number,
+    logger.info("Done writing")
+
+
+def _get_mev_summaries(
+    inspect_db_session: orm.Session,
+    blocks: List[Block],
+    block_inspections: List[BlockInspection],
+) -> List[MevSummary]:
+    if len(blocks) == 0:
+        return []
+
+    block_timestamps = [
+        datetime.fromtimestamp(block.block_timestamp) for block in blocks
+    ]
+    price_oracle = load_price_oracle(
+        inspect_db_session, min(block_timestamps), max(block_timestamps)
     )
 
-    logger.info("Done writing")
+    return get_mev_summaries(price_oracle, blocks, block_inspections)
@@ -2,20 +2,35 @@ import asyncio
 import logging
 import traceback
 from asyncio import CancelledError
-from typing import Optional
+from typing import Optional, Tuple
 
 from sqlalchemy import orm
 from web3 import Web3
 from web3.eth import AsyncEth
 
-from mev_inspect.block import create_from_block_number
-from mev_inspect.classifiers.trace import TraceClassifier
-from mev_inspect.inspect_block import inspect_block, inspect_many_blocks
+from mev_inspect.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from mev_inspect.block import create_from_block_number, create_from_block_range
+from mev_inspect.block_cache import DEFAULT_BLOCK_CACHE_MAX_SIZE_BYTES, BlockCache
+from mev_inspect.block_files import BlockFileSource
+from mev_inspect.classifier_pool import ClassifierPool
+from mev_inspect.classifiers.trace import DEFAULT_DECODE_CACHE_SIZE, TraceClassifier
+from mev_inspect.http_session import log_connection_stats
+from mev_inspect.inspect_block import inspect_block
+from mev_inspect.load_balancer import LoadBalancingAsyncProvider
 from mev_inspect.methods import get_block_receipts, trace_block
-from mev_inspect.provider import get_base_provider
+from mev_inspect.pipeline import DEFAULT_QUEUE_SIZE, inspect_many_blocks_pipelined
+from mev_inspect.provider import (
+    DEFAULT_RPC_BATCH_SIZE,
+    RPC_REQUESTS_PER_BLOCK,
+    get_base_provider,
+)
 
 logger = logging.getLogger(__name__)
 
+# blocks fetched at a time, see MEVInspector
+DEFAULT_MAX_CONCURRENCY = 20
+DEFAULT_INITIAL_CONCURRENCY = 5
+
 
 # add missing parity methods
 # this is a bit gross
@@ -29,12 +44,68 @@ class MEVInspector:
         rpc: str,
         max_concurrency: int = 1,
         request_timeout: int = 300,
+        decode_cache_size: int = DEFAULT_DECODE_CACHE_SIZE,
+        classifier_workers: int = 0,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        rpc_batch_size: int = DEFAULT_RPC_BATCH_SIZE,
+        block_cache_dir: Optional[str] = None,
+        block_cache_max_size_bytes: int = DEFAULT_BLOCK_CACHE_MAX_SIZE_BYTES,
+        rpc_hedge_after_seconds: Optional[float] = None,
+        initial_concurrency: Optional[int] = None,
+        adaptive_concurrency: bool = True,
     ):
-        base_provider = get_base_provider(rpc, request_timeout=request_timeout)
+        """
+        max_concurrency is the number of blocks fetched at a time. With
+        adaptive_concurrency, RPC requests are also limited, starting from
+        initial_concurrency blocks' worth of requests and adapting to how
+        the node copes, up to max_concurrency blocks' worth.
+        """
+        if initial_concurrency is None or initial_concurrency > max_concurrency:
+            initial_concurrency = max_concurrency
+
+        self.concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None
+        if adaptive_concurrency:
+            self.concurrency_limiter = AdaptiveConcurrencyLimiter(
+                initial_limit=initial_concurrency * RPC_REQUESTS_PER_BLOCK,
+                max_limit=max_concurrency * RPC_REQUESTS_PER_BLOCK,
+            )
+
+        base_provider = get_base_provider(
+            rpc,
+            request_timeout=request_timeout,
+            batch_size=rpc_batch_size,
+            max_concurrency=max_concurrency,
+            hedge_after_seconds=rpc_hedge_after_seconds,
+            concurrency_limiter=self.concurrency_limiter,
+        )
         self.w3 = Web3(base_provider, modules={"eth": (AsyncEth,)}, middlewares=[])
 
-        self.trace_classifier = TraceClassifier()
-        self.max_concurrency = asyncio.Semaphore(max_concurrency)
+        self.trace_classifier = TraceClassifier(decode_cache_size=decode_cache_size)
+        self.fetch_concurrency = max_concurrency
+        self.classify_concurrency = max(classifier_workers, 1)
+        self.queue_size = queue_size
+
+        self.block_cache: Optional[BlockCache] = None
+        if block_cache_dir:
+            self.block_cache = BlockCache(
+                block_cache_dir, max_size_bytes=block_cache_max_size_bytes
+            )
+
+        self.classifier_pool: Optional[ClassifierPool] = None
+        if classifier_workers > 0:
+            self.classifier_pool = ClassifierPool(
+                max_workers=classifier_workers,
+                decode_cache_size=decode_cache_size,
+            )
+            self.classifier_pool.warm_up()
+
+    def close(self) -> None:
+        """Stops the classifier workers and closes the block cache"""
+        if self.classifier_pool is not None:
+            self.classifier_pool.close()
+
+        if self.block_cache is not None:
+            self.block_cache.close()
 
     async def create_from_block(
         self,
@@ -45,8 +116,56 @@ class MEVInspector:
             w3=self.w3,
             block_number=block_number,
             trace_db_session=trace_db_session,
+            block_cache=self.block_cache,
         )
 
+    async def prewarm_block_cache(
+        self,
+        trace_db_session: Optional[orm.Session],
+        after_block: int,
+        before_block: int,
+        block_batch_size: int = 10,
+    ) -> None:
+        """
+        Fetches blocks into the block cache, in batches of block_batch_size
+        blocks with up to max_concurrency blocks in flight at a time
+        """
+        if self.block_cache is None:
+            raise ValueError("No block cache configured")
+
+        # each worker fetches a whole batch at once
+        block_batch_size = min(block_batch_size, self.fetch_concurrency)
+        worker_count = self.fetch_concurrency // block_batch_size
+
+        batch_ranges: "asyncio.Queue[Tuple[int, int]]" = asyncio.Queue()
+        for batch_after_block in range(after_block, before_block, block_batch_size):
+            batch_ranges.put_nowait(
+                (
+                    batch_after_block,
+                    min(batch_after_block + block_batch_size, before_block),
+                )
+            )
+
+        async def prewarm_worker() -> None:
+            while True:
+                try:
+                    batch_after_block, batch_before_block = batch_ranges.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                await create_from_block_range(
+                    self.w3,
+                    batch_after_block,
+                    batch_before_block,
+                    trace_db_session,
+                    block_cache=self.block_cache,
+                )
+                logger.info(
+                    f"Cached blocks {batch_after_block} to {batch_before_block}"
+                )
+
+        await asyncio.gather(*[prewarm_worker() for _ in range(worker_count)])
+
     async def inspect_single_block(
         self,
         inspect_db_session: orm.Session,
@@ -59,6 +178,8 @@ class MEVInspector:
             self.trace_classifier,
             block,
             trace_db_session=trace_db_session,
+            classifier_pool=self.classifier_pool,
+            block_cache=self.block_cache,
         )
 
     async def inspect_many_blocks(
@@ -68,45 +189,33 @@ class MEVInspector:
         after_block: int,
         before_block: int,
         block_batch_size: int = 10,
+        block_source: Optional[BlockFileSource] = None,
     ):
-        tasks = []
-        for block_number in range(after_block, before_block, block_batch_size):
-            batch_after_block = block_number
-            batch_before_block = min(block_number + block_batch_size, before_block)
-
-            tasks.append(
-                asyncio.ensure_future(
-                    self.safe_inspect_many_blocks(
-                        inspect_db_session,
-                        trace_db_session,
-                        after_block_number=batch_after_block,
-                        before_block_number=batch_before_block,
-                    )
-                )
-            )
         logger.info(f"Gathered {before_block-after_block} blocks to inspect")
         try:
-            await asyncio.gather(*tasks)
+            await inspect_many_blocks_pipelined(
+                inspect_db_session,
+                self.w3,
+                self.trace_classifier,
+                after_block,
+                before_block,
+                trace_db_session=trace_db_session,
+                block_batch_size=block_batch_size,
+                fetch_concurrency=self.fetch_concurrency,
+                classify_concurrency=self.classify_concurrency,
+                queue_size=self.queue_size,
+                classifier_pool=self.classifier_pool,
+                block_cache=self.block_cache,
+                block_source=block_source,
+            )
+            log_connection_stats()
+            if isinstance(self.w3.provider, LoadBalancingAsyncProvider):
+                self.w3.provider.log_endpoint_healths()
+            if self.concurrency_limiter is not None:
+                self.concurrency_limiter.log_stats()
         except CancelledError:
             logger.info("Requested to exit, cleaning up...")
         except Exception as e:
             logger.error(f"Exited due to {type(e)}")
             traceback.print_exc()
             raise
-
-    async def safe_inspect_many_blocks(
-        self,
-        inspect_db_session: orm.Session,
-        trace_db_session: Optional[orm.Session],
-        after_block_number: int,
-        before_block_number: int,
-    ):
-        async with self.max_concurrency:
-            return await inspect_many_blocks(
-                inspect_db_session,
-                self.w3,
-                self.trace_classifier,
-                after_block_number,
-                before_block_number,
-                trace_db_session=trace_db_session,
-            )
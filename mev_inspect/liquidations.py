@@ -1,12 +1,12 @@
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
 
 from mev_inspect.classifiers.specs import get_classifier
 from mev_inspect.schemas.classifiers import LiquidationClassifier
 from mev_inspect.schemas.liquidations import Liquidation
 from mev_inspect.schemas.traces import Classification, ClassifiedTrace, DecodedCallTrace
 from mev_inspect.schemas.transfers import Transfer
-from mev_inspect.traces import get_child_traces, is_child_trace_address
-from mev_inspect.transfers import get_child_transfers
+from mev_inspect.traces import TraceTree
+from mev_inspect.transfers import get_transfers
 
 
 def has_liquidations(classified_traces: List[ClassifiedTrace]) -> bool:
@@ -17,10 +17,15 @@ def has_liquidations(classified_traces: List[ClassifiedTrace]) -> bool:
     return liquidations_exist
 
 
-def get_liquidations(classified_traces: List[ClassifiedTrace]) -> List[Liquidation]:
+def get_liquidations(
+    classified_traces: List[ClassifiedTrace],
+    trace_tree: Optional[TraceTree] = None,
+) -> List[Liquidation]:
+    if trace_tree is None:
+        trace_tree = TraceTree(classified_traces)
 
     liquidations: List[Liquidation] = []
-    parent_liquidations: List[DecodedCallTrace] = []
+    parent_liquidations: Set[Tuple[str, Tuple[int, ...]]] = set()
 
     for trace in classified_traces:
 
@@ -32,13 +37,13 @@ def get_liquidations(classified_traces: List[ClassifiedTrace]) -> List[Liquidati
 
         if trace.classification == Classification.liquidate:
 
-            parent_liquidations.append(trace)
-            child_traces = get_child_traces(
-                trace.transaction_hash, trace.trace_address, classified_traces
+            parent_liquidations.add(
+                (trace.transaction_hash, tuple(trace.trace_address))
             )
-            child_transfers = get_child_transfers(
-                trace.transaction_hash, trace.trace_address, child_traces
+            child_traces = trace_tree.get_descendants(
+                trace.transaction_hash, trace.trace_address
             )
+            child_transfers = get_transfers(child_traces)
             liquidation = _parse_liquidation(trace, child_traces, child_transfers)
 
             if liquidation is not None:
@@ -61,14 +66,16 @@ def _parse_liquidation(
 
 
 def _is_child_liquidation(
-    trace: DecodedCallTrace, parent_liquidations: List[DecodedCallTrace]
+    trace: DecodedCallTrace,
+    parent_liquidations: Set[Tuple[str, Tuple[int, ...]]],
 ) -> bool:
+    trace_address = tuple(trace.trace_address)
 
-    for parent in parent_liquidations:
+    for parent_length in range(len(trace_address)):
         if (
-            trace.transaction_hash == parent.transaction_hash
-            and is_child_trace_address(trace.trace_address, parent.trace_address)
-        ):
+            trace.transaction_hash,
+            trace_address[:parent_length],
+        ) in parent_liquidations:
             return True
 
     return False
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence
+
+from web3.providers.async_base import AsyncBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+from mev_inspect.retry import check_if_retry_on_failure
+
+# weight of the latest request in an endpoint's average latency
+LATENCY_SMOOTHING = 0.2
+
+# assumed latency while no endpoint has answered yet
+DEFAULT_INITIAL_LATENCY_SECONDS = 0.1
+
+DEFAULT_MAX_CONSECUTIVE_FAILURES = 3
+DEFAULT_EJECTION_SECONDS = 30.0
+
+# keeps weights finite for endpoints that answer instantly
+MIN_LATENCY_SECONDS = 1e-6
+
+# separates endpoints in a single rpc setting
+RPC_ENDPOINT_SEPARATOR = ","
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EndpointHealth:
+    endpoint_uri: str
+    latency_seconds: Optional[float] = None
+    requests: int = 0
+    failures: int = 0
+    hedged_requests: int = 0
+    consecutive_failures: int = 0
+    ejections: int = 0
+    ejected_until: float = 0.0
+
+    def is_ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+
+class LoadBalancingAsyncProvider(AsyncBaseProvider):
+    """
+    Spreads requests across several RPC endpoints
+
+    Each request goes to an endpoint picked at random, weighted by the
+    inverse of its average latency, so faster nodes take more of the load.
+
+    An endpoint that fails max_consecutive_failures requests in a row is
+    ejected for ejection_seconds. Failures are still raised, so a retry
+    middleware on this provider retries them on another endpoint.
+
+    With hedge_after_seconds, requests that are safe to retry and are still
+    waiting after that long are also sent to a second endpoint, and the
+    first response wins.
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[Any],
+        hedge_after_seconds: Optional[float] = None,
+        max_consecutive_failures: int = DEFAULT_MAX_CONSECUTIVE_FAILURES,
+        ejection_seconds: float = DEFAULT_EJECTION_SECONDS,
+        random_generator: Optional[random.Random] = None,
+    ) -> None:
+        if len(providers) == 0:
+            raise ValueError("At least one RPC endpoint is required")
+
+        super().__init__()
+        self.providers = list(providers)
+        self.hedge_after_seconds = hedge_after_seconds
+        self.max_consecutive_failures = max_consecutive_failures
+        self.ejection_seconds = ejection_seconds
+
+        self._random = (
+            random_generator if random_generator is not None else random.Random()
+        )
+        self._healths = [
+            EndpointHealth(endpoint_uri=str(provider.endpoint_uri))
+            for provider in self.providers
+        ]
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        first_index = self._pick_endpoint()
+
+        if self.hedge_after_seconds is None or not check_if_retry_on_failure(method):
+            return await self._make_endpoint_request(first_index, method, params)
+
+        first_request = asyncio.ensure_future(
+            self._make_endpoint_request(first_index, method, params)
+        )
+        try:
+            done, _ = await asyncio.wait(
+                [first_request], timeout=self.hedge_after_seconds
+            )
+        except asyncio.CancelledError:
+            first_request.cancel()
+            raise
+
+        if len(done) > 0:
+            return first_request.result()
+
+        second_index = self._pick_endpoint(exclude_index=first_index)
+        if second_index == first_index:
+            return await first_request
+
+        self._healths[second_index].hedged_requests += 1
+        second_request = asyncio.ensure_future(
+            self._make_endpoint_request(second_index, method, params)
+        )
+
+        return await _first_successful([first_request, second_request])
+
+    async def isConnected(self) -> bool:  # pylint: disable=invalid-name
+        for provider in self.providers:
+            if await provider.isConnected():
+                return True
+
+        return False
+
+    def get_endpoint_healths(self) -> List[EndpointHealth]:
+        return list(self._healths)
+
+    def log_endpoint_healths(self) -> None:
+        now = time.monotonic()
+
+        for health in self._healths:
+            logger.info(
+                f"RPC endpoint {health.endpoint_uri}: "
+                f"{health.requests} requests, {health.failures} failed, "
+                f"{health.hedged_requests} hedged, "
+                f"latency {health.latency_seconds or 0:.3f}s, "
+                f"ejected {health.ejections} times"
+                + (", currently ejected" if health.is_ejected(now) else "")
+            )
+
+    async def _make_endpoint_request(
+        self, index: int, method: RPCEndpoint, params: Any
+    ) -> RPCResponse:
+        health = self._healths[index]
+        health.requests += 1
+        started_at = time.monotonic()
+
+        try:
+            response = await self.providers[index].make_request(method, params)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._record_failure(health)
+            raise
+
+        latency_seconds = time.monotonic() - started_at
+        if health.latency_seconds is None:
+            health.latency_seconds = latency_seconds
+        else:
+            health.latency_seconds += LATENCY_SMOOTHING * (
+                latency_seconds - health.latency_seconds
+            )
+        health.consecutive_failures = 0
+
+        return response
+
+    def _record_failure(self, health: EndpointHealth) -> None:
+        health.failures += 1
+        health.consecutive_failures += 1
+
+        if health.consecutive_failures >= self.max_consecutive_failures:
+            health.consecutive_failures = 0
+            health.ejections += 1
+            health.ejected_until = time.monotonic() + self.ejection_seconds
+            logger.warning(
+                f"Ejecting RPC endpoint {health.endpoint_uri} "
+                f"for {self.ejection_seconds}s"
+            )
+
+    def _pick_endpoint(self, exclude_index: Optional[int] = None) -> int:
+        now = time.monotonic()
+
+        candidate_indexes = [
+            index
+            for index, health in enumerate(self._healths)
+            if index != exclude_index and not health.is_ejected(now)
+        ]
+
+        if len(candidate_indexes) == 0:
+            if exclude_index is not None:
+                return exclude_index
+
+            # every endpoint is ejected, use the one closest to coming back
+            return min(
+                range(len(self._healths)),
+                key=lambda index: self._healths[index].ejected_until,
+            )
+
+        # endpoints without a latency yet are assumed to be as fast as the
+        # fastest one, so they get tried
+        known_latencies = [
+            health.latency_seconds
+            for health in self._healths
+            if health.latency_seconds is not None
+        ]
+        default_latency_seconds = (
+            min(known_latencies)
+            if len(known_latencies) > 0
+            else DEFAULT_INITIAL_LATENCY_SECONDS
+        )
+
+        weights = []
+        for index in candidate_indexes:
+            latency_seconds = self._healths[index].latency_seconds
+            if latency_seconds is None:
+                latency_seconds = default_latency_seconds
+
+            weights.append(1 / max(latency_seconds, MIN_LATENCY_SECONDS))
+
+        return self._random.choices(candidate_indexes, weights=weights)[0]
+
+
+async def _first_successful(
+    requests: List["asyncio.Future[RPCResponse]"],
+) -> RPCResponse:
+    pending = set(requests)
+    error: Optional[BaseException] = None
+
+    try:
+        while len(pending) > 0:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+
+            for request in done:
+                if request.exception() is None:
+                    return request.result()
+
+                error = request.exception()
+    finally:
+        for request in pending:
+            request.cancel()
+
+    assert error is not None
+    raise error
+
+
+def get_rpc_endpoints(rpc: str) -> List[str]:
+    return [
+        endpoint.strip()
+        for endpoint in rpc.split(RPC_ENDPOINT_SEPARATOR)
+        if endpoint.strip() != ""
+    ]
@@ -0,0 +1,212 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from mev_inspect.block_inspection import BlockInspection
+from mev_inspect.price_oracle import PriceOracle
+from mev_inspect.schemas.arbitrages import Arbitrage
+from mev_inspect.schemas.blocks import Block
+from mev_inspect.schemas.liquidations import Liquidation
+from mev_inspect.schemas.mev_summary import MevSummary, MevType
+from mev_inspect.schemas.miner_payments import MinerPayment
+from mev_inspect.schemas.prices import ETH_TOKEN_ADDRESS
+
+ETH_DECIMALS = 18
+
+# amounts this large are overflows in the liquidated protocol
+MAX_LIQUIDATION_DEBT_PURCHASE_AMOUNT = 2**256 - 1
+
+
+def get_mev_summaries(
+    price_oracle: PriceOracle,
+    blocks: List[Block],
+    block_inspections: List[BlockInspection],
+) -> List[MevSummary]:
+    """
+    Values the arbitrages and liquidations of each block in USD
+
+    Follows the summary queries in crud.summary: only transactions with a
+    miner payment and a top level trace, whose tokens are known, are
+    summarized, and arbitrages that are part of a sandwich are left out.
+    A missing price leaves the USD value empty.
+    """
+    mev_summaries = []
+
+    for block, block_inspection in zip(blocks, block_inspections):
+        mev_summaries += _get_block_mev_summaries(price_oracle, block, block_inspection)
+
+    return mev_summaries
+
+
+def _get_block_mev_summaries(
+    price_oracle: PriceOracle,
+    block: Block,
+    block_inspection: BlockInspection,
+) -> List[MevSummary]:
+    block_timestamp = datetime.fromtimestamp(block.block_timestamp)
+
+    miner_payments_by_transaction_hash = {
+        miner_payment.transaction_hash: miner_payment
+        for miner_payment in block_inspection.miner_payments
+    }
+    errors_by_transaction_hash: Dict[str, Optional[str]] = {
+        trace.transaction_hash: trace.error
+        for trace in block_inspection.classified_traces
+        if trace.transaction_hash is not None and trace.trace_address == []
+    }
+    sandwich_transaction_hashes = {
+        transaction_hash
+        for sandwich in block_inspection.sandwiches
+        for transaction_hash in (
+            sandwich.frontrun_swap.transaction_hash,
+            sandwich.backrun_swap.transaction_hash,
+        )
+    }
+
+    mev_summaries = []
+
+    for arbitrage in block_inspection.arbitrages:
+        miner_payment = miner_payments_by_transaction_hash.get(
+            arbitrage.transaction_hash
+        )
+
+        if (
+            miner_payment is None
+            or arbitrage.transaction_hash not in errors_by_transaction_hash
+            or arbitrage.transaction_hash in sandwich_transaction_hashes
+            or not price_oracle.has_token(arbitrage.profit_token_address)
+        ):
+            continue
+
+        mev_summaries.append(
+            _get_arbitrage_summary(
+                price_oracle,
+                block_timestamp,
+                arbitrage,
+                miner_payment,
+                errors_by_transaction_hash[arbitrage.transaction_hash],
+            )
+        )
+
+    for liquidation in block_inspection.liquidations:
+        miner_payment = miner_payments_by_transaction_hash.get(
+            liquidation.transaction_hash
+        )
+
+        if (
+            miner_payment is None
+            or liquidation.transaction_hash not in errors_by_transaction_hash
+            or liquidation.received_token_address is None
+            or not price_oracle.has_token(liquidation.received_token_address)
+            or not price_oracle.has_token(liquidation.debt_token_address)
+            or liquidation.debt_purchase_amount <= 0
+            or liquidation.received_amount <= 0
+            or liquidation.debt_purchase_amount >= MAX_LIQUIDATION_DEBT_PURCHASE_AMOUNT
+        ):
+            continue
+
+        mev_summaries.append(
+            _get_liquidation_summary(
+                price_oracle,
+                block_timestamp,
+                liquidation,
+                miner_payment,
+                errors_by_transaction_hash[liquidation.transaction_hash],
+            )
+        )
+
+    return mev_summaries
+
+
+def _get_arbitrage_summary(
+    price_oracle: PriceOracle,
+    block_timestamp: datetime,
+    arbitrage: Arbitrage,
+    miner_payment: MinerPayment,
+    error: Optional[str],
+) -> MevSummary:
+    return MevSummary(
+        block_number=arbitrage.block_number,
+        block_timestamp=block_timestamp,
+        protocol=None,
+        transaction_hash=arbitrage.transaction_hash,
+        type=MevType.arbitrage,
+        gross_profit_usd=price_oracle.get_usd_value(
+            arbitrage.profit_token_address,
+            arbitrage.profit_amount,
+            block_timestamp,
+        ),
+        miner_payment_usd=_get_miner_payment_usd(
+            price_oracle, block_timestamp, miner_payment
+        ),
+        error=error,
+        protocols=sorted({swap.protocol.value for swap in arbitrage.swaps}),
+        **_get_miner_payment_fields(miner_payment),
+    )
+
+
+def _get_liquidation_summary(
+    price_oracle: PriceOracle,
+    block_timestamp: datetime,
+    liquidation: Liquidation,
+    miner_payment: MinerPayment,
+    error: Optional[str],
+) -> MevSummary:
+    assert liquidation.received_token_address is not None
+
+    received_usd = price_oracle.get_usd_value(
+        liquidation.received_token_address,
+        liquidation.received_amount,
+        block_timestamp,
+    )
+    debt_purchase_usd = price_oracle.get_usd_value(
+        liquidation.debt_token_address,
+        liquidation.debt_purchase_amount,
+        block_timestamp,
+    )
+
+    return MevSummary(
+        block_number=int(liquidation.block_number),
+        block_timestamp=block_timestamp,
+        protocol=liquidation.protocol.value,
+        transaction_hash=liquidation.transaction_hash,
+        type=MevType.liquidation,
+        gross_profit_usd=(
+            received_usd - debt_purchase_usd
+            if received_usd is not None and debt_purchase_usd is not None
+            else None
+        ),
+        miner_payment_usd=_get_miner_payment_usd(
+            price_oracle, block_timestamp, miner_payment
+        ),
+        error=error,
+        protocols=[liquidation.protocol.value],
+        **_get_miner_payment_fields(miner_payment),
+    )
+
+
+def _get_miner_payment_usd(
+    price_oracle: PriceOracle,
+    block_timestamp: datetime,
+    miner_payment: MinerPayment,
+) -> Optional[Decimal]:
+    eth_usd_price = price_oracle.get_usd_price(ETH_TOKEN_ADDRESS, block_timestamp)
+    if eth_usd_price is None:
+        return None
+
+    total_payment = (
+        miner_payment.gas_used * miner_payment.gas_price
+        + miner_payment.coinbase_transfer
+    )
+    return total_payment / Decimal(10) ** ETH_DECIMALS * eth_usd_price
+
+
+def _get_miner_payment_fields(miner_payment: MinerPayment) -> dict:
+    return dict(
+        gas_used=miner_payment.gas_used,
+        gas_price=miner_payment.gas_price,
+        coinbase_transfer=miner_payment.coinbase_transfer,
+        gas_price_with_coinbase_transfer=miner_payment.gas_price_with_coinbase_transfer,
+        miner_address=miner_payment.miner_address,
+        base_fee_per_gas=miner_payment.base_fee_per_gas,
+    )
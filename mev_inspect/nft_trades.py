@@ -5,26 +5,33 @@ from mev_inspect.schemas.classifiers import NftTradeClassifier
 from mev_inspect.schemas.nft_trades import NftTrade
 from mev_inspect.schemas.traces import Classification, ClassifiedTrace, DecodedCallTrace
 from mev_inspect.schemas.transfers import Transfer
-from mev_inspect.traces import get_traces_by_transaction_hash
+from mev_inspect.traces import TraceTree
 from mev_inspect.transfers import (
     get_child_transfers,
     remove_child_transfers_of_transfers,
 )
 
 
-def get_nft_trades(traces: List[ClassifiedTrace]) -> List[NftTrade]:
+def get_nft_trades(
+    traces: List[ClassifiedTrace],
+    trace_tree: Optional[TraceTree] = None,
+) -> List[NftTrade]:
+    if trace_tree is None:
+        trace_tree = TraceTree(traces)
+
     nft_trades = []
 
-    for _, transaction_traces in get_traces_by_transaction_hash(traces).items():
-        nft_trades += _get_nft_trades_for_transaction(list(transaction_traces))
+    for transaction_hash in trace_tree.get_transaction_hashes():
+        nft_trades += _get_nft_trades_for_transaction(transaction_hash, trace_tree)
 
     return nft_trades
 
 
 def _get_nft_trades_for_transaction(
-    traces: List[ClassifiedTrace],
+    transaction_hash: str,
+    trace_tree: TraceTree,
 ) -> List[NftTrade]:
-    ordered_traces = list(sorted(traces, key=lambda t: t.trace_address))
+    ordered_traces = trace_tree.get_transaction_traces(transaction_hash)
 
     nft_trades: List[NftTrade] = []
 
@@ -36,7 +43,7 @@ def _get_nft_trades_for_transaction(
             child_transfers = get_child_transfers(
                 trace.transaction_hash,
                 trace.trace_address,
-                traces,
+                trace_tree,
             )
             nft_trade = _parse_trade(
                 trace,
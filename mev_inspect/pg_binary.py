@@ -0,0 +1,119 @@
+"""
+Encoders for Postgres' binary COPY format
+
+https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4
+"""
+
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+# signature, then no flags and no header extension
+COPY_HEADER = COPY_SIGNATURE + struct.pack("!ii", 0, 0)
+COPY_TRAILER = struct.pack("!h", -1)
+
+NULL_FIELD = struct.pack("!i", -1)
+
+INT4_OID = 23
+
+NUMERIC_POSITIVE = 0x0000
+NUMERIC_NEGATIVE = 0x4000
+
+# numerics are stored in base 10000, four decimal digits per digit
+NUMERIC_DIGIT_LENGTH = 4
+
+POSTGRES_EPOCH = datetime(2000, 1, 1)
+
+Encoder = Callable[[Any], bytes]
+
+
+def encode_text(value: Any) -> bytes:
+    return str(value).encode("utf-8")
+
+
+def encode_numeric(value: int) -> bytes:
+    if not isinstance(value, int):
+        raise TypeError(f"Only integer numerics are supported, got {value!r}")
+
+    sign = NUMERIC_NEGATIVE if value < 0 else NUMERIC_POSITIVE
+    decimal_digits = str(abs(value))
+
+    padding = -len(decimal_digits) % NUMERIC_DIGIT_LENGTH
+    decimal_digits = "0" * padding + decimal_digits
+
+    digits = [
+        int(decimal_digits[i : i + NUMERIC_DIGIT_LENGTH])
+        for i in range(0, len(decimal_digits), NUMERIC_DIGIT_LENGTH)
+    ]
+    weight = len(digits) - 1
+
+    # trailing zero digits are implied by the weight
+    while len(digits) > 0 and digits[-1] == 0:
+        digits.pop()
+
+    if len(digits) == 0:
+        return struct.pack("!hhHh", 0, 0, NUMERIC_POSITIVE, 0)
+
+    return struct.pack(
+        f"!hhHh{len(digits)}H",
+        len(digits),
+        weight,
+        sign,
+        0,
+        *digits,
+    )
+
+
+def encode_int_array(values: Sequence[int]) -> bytes:
+    if len(values) == 0:
+        return struct.pack("!iiI", 0, 0, INT4_OID)
+
+    header = struct.pack("!iiIii", 1, 0, INT4_OID, len(values), 1)
+    elements = struct.pack(
+        "!" + "ii" * len(values),
+        *(field for value in values for field in (4, value)),
+    )
+    return header + elements
+
+
+def encode_json(value: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    return json.dumps(value, default=default).encode("utf-8")
+
+
+def encode_timestamp(value: datetime) -> bytes:
+    """Encodes a timestamp without time zone, aware values are stored in UTC"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    microseconds = (value - POSTGRES_EPOCH) // timedelta(microseconds=1)
+    return struct.pack("!q", microseconds)
+
+
+def iter_copy_data(
+    encoders: Sequence[Encoder],
+    items: Iterable[Sequence[Any]],
+) -> Iterator[bytes]:
+    field_count = struct.pack("!h", len(encoders))
+
+    yield COPY_HEADER
+
+    for item in items:
+        if len(item) != len(encoders):
+            raise ValueError(f"Expected {len(encoders)} values, got {len(item)}")
+
+        fields = [field_count]
+
+        for encoder, value in zip(encoders, item):
+            if value is None:
+                fields.append(NULL_FIELD)
+            else:
+                encoded_value = encoder(value)
+                fields.append(struct.pack("!i", len(encoded_value)))
+                fields.append(encoded_value)
+
+        yield b"".join(fields)
+
+    yield COPY_TRAILER
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import orm
+from web3 import Web3
+
+from mev_inspect.block import (
+    TraceDBBlocks,
+    create_from_block_number,
+    find_block_range,
+    is_block_range_cached,
+)
+from mev_inspect.block_cache import BlockCache
+from mev_inspect.block_files import BlockFileSource
+from mev_inspect.block_inspection import BlockInspection, inspect_block_data
+from mev_inspect.classifier_pool import ClassifierPool
+from mev_inspect.classifiers.trace import TraceClassifier
+from mev_inspect.inspect_block import log_block_totals, write_block_inspections
+from mev_inspect.schemas.blocks import Block
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 10
+
+_InspectedBlock = Tuple[Block, BlockInspection]
+
+
+async def inspect_many_blocks_pipelined(
+    inspect_db_session: orm.Session,
+    w3: Web3,
+    trace_classifier: TraceClassifier,
+    after_block_number: int,
+    before_block_number: int,
+    trace_db_session: Optional[orm.Session],
+    block_batch_size: int = 10,
+    fetch_concurrency: int = 1,
+    classify_concurrency: int = 1,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    classifier_pool: Optional[ClassifierPool] = None,
+    should_write_classified_traces: bool = True,
+    block_cache: Optional[BlockCache] = None,
+    block_source: Optional[BlockFileSource] = None,
+) -> None:
+    """
+    Inspects blocks in three stages connected by bounded queues:
+
+    fetch -> classify and detect -> write
+
+    Each stage works on different blocks at the same time, so the next blocks
+    are fetched while the current ones are classified and the previous ones
+    are written. A full queue blocks the stage in front of it.
+
+    Blocks are written in batches of block_batch_size, once every block of a
+    batch has been inspected. Writes share inspect_db_session, so there is a
+    single writer, which runs in a thread to keep the event loop free.
+
+    Without a classifier_pool classification runs in the event loop, one
+    block at a time, regardless of classify_concurrency.
+
+    With a block_source, blocks are read from its files instead of being
+    fetched, so nothing is requested from the node or the trace DB.
+    """
+    block_numbers: "asyncio.Queue[int]" = asyncio.Queue()
+    for block_number in range(after_block_number, before_block_number):
+        block_numbers.put_nowait(block_number)
+
+    fetched_blocks: "asyncio.Queue[Optional[Block]]" = asyncio.Queue(maxsize=queue_size)
+    inspected_blocks: "asyncio.Queue[Optional[_InspectedBlock]]" = asyncio.Queue(
+        maxsize=queue_size
+    )
+
+    # trace DB rows are loaded one batch at a time and dropped once fetched
+    trace_db_blocks_by_batch: Dict[int, TraceDBBlocks] = {}
+    unfetched_counts_by_batch: Dict[int, int] = {}
+
+    def get_trace_db_blocks(batch_range: Tuple[int, int]) -> Optional[TraceDBBlocks]:
+        if trace_db_session is None:
+            return None
+
+        batch_after_block, batch_before_block = batch_range
+        if batch_after_block not in trace_db_blocks_by_batch:
+            trace_db_blocks_by_batch[batch_after_block] = (
+                TraceDBBlocks()
+                if is_block_range_cached(
+                    block_cache, batch_after_block, batch_before_block
+                )
+                else find_block_range(
+                    trace_db_session, batch_after_block, batch_before_block
+                )
+            )
+            unfetched_counts_by_batch[batch_after_block] = (
+                batch_before_block - batch_after_block
+            )
+
+        return trace_db_blocks_by_batch[batch_after_block]
+
+    def mark_fetched(batch_range: Tuple[int, int]) -> None:
+        batch_after_block, _ = batch_range
+        if batch_after_block not in unfetched_counts_by_batch:
+            return
+
+        unfetched_counts_by_batch[batch_after_block] -= 1
+        if unfetched_counts_by_batch[batch_after_block] == 0:
+            del unfetched_counts_by_batch[batch_after_block]
+            del trace_db_blocks_by_batch[batch_after_block]
+
+    async def fetch_worker() -> None:
+        while True:
+            try:
+                block_number = block_numbers.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            batch_range = _get_batch_range(
+                block_number,
+                after_block_number,
+                before_block_number,
+                block_batch_size,
+            )
+
+            if block_source is not None:
+                block = await block_source.get_block(block_number)
+            else:
+                block = await create_from_block_number(
+                    w3,
+                    block_number,
+                    trace_db_session,
+                    trace_db_blocks=get_trace_db_blocks(batch_range),
+                    block_cache=block_cache,
+                )
+                mark_fetched(batch_range)
+            log_block_totals(block)
+
+            await fetched_blocks.put(block)
+
+    async def classify_worker() -> None:
+        while True:
+            block = await fetched_blocks.get()
+            if block is None:
+                return
+
+            if classifier_pool is None:
+                block_inspection = inspect_block_data(trace_classifier, block)
+            else:
+                block_inspection = await classifier_pool.inspect_block(block)
+
+            await inspected_blocks.put((block, block_inspection))
+
+    async def fetch_stage() -> None:
+        await asyncio.gather(*[fetch_worker() for _ in range(fetch_concurrency)])
+
+        for _ in range(classify_concurrency):
+            await fetched_blocks.put(None)
+
+    async def classify_stage() -> None:
+        await asyncio.gather(*[classify_worker() for _ in range(classify_concurrency)])
+
+        await inspected_blocks.put(None)
+
+    async def write_stage() -> None:
+        loop = asyncio.get_running_loop()
+        pending_batches: Dict[int, List[_InspectedBlock]] = {}
+
+        while True:
+            inspected_block = await inspected_blocks.get()
+            if inspected_block is None:
+                break
+
+            block, _ = inspected_block
+            batch_after_block, batch_before_block = _get_batch_range(
+                block.block_number,
+                after_block_number,
+                before_block_number,
+                block_batch_size,
+            )
+
+            batch = pending_batches.setdefault(batch_after_block, [])
+            batch.append(inspected_block)
+
+            if len(batch) < batch_before_block - batch_after_block:
+                continue
+
+            del pending_batches[batch_after_block]
+            batch.sort(key=lambda inspected: inspected[0].block_number)
+
+            logger.info(f"Writing blocks {batch_after_block} to {batch_before_block}")
+            await loop.run_in_executor(
+                None,
+                write_block_inspections,
+                inspect_db_session,
+                batch_after_block,
+                batch_before_block,
+                [block for block, _ in batch],
+                [block_inspection for _, block_inspection in batch],
+                should_write_classified_traces,
+            )
+
+        if len(pending_batches) > 0:
+            raise RuntimeError(
+                f"Unwritten batches after inspection: {sorted(pending_batches)}"
+            )
+
+    stages = [
+        asyncio.ensure_future(fetch_stage()),
+        asyncio.ensure_future(classify_stage()),
+        asyncio.ensure_future(write_stage()),
+    ]
+
+    try:
+        await asyncio.gather(*stages)
+    except BaseException:
+        for stage in stages:
+            stage.cancel()
+        raise
+
+
+def _get_batch_range(
+    block_number: int,
+    after_block_number: int,
+    before_block_number: int,
+    block_batch_size: int,
+) -> Tuple[int, int]:
+    batch_index = (block_number - after_block_number) // block_batch_size
+    batch_after_block = after_block_number + batch_index * block_batch_size
+    batch_before_block = min(batch_after_block + block_batch_size, before_block_number)
+    return batch_after_block, batch_before_block
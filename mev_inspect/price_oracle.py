@@ -0,0 +1,86 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from mev_inspect.crud.prices import find_prices_for_time_range
+from mev_inspect.crud.tokens import find_token_decimals
+
+
+class PriceOracle:
+    """
+    Answers USD price lookups for tokens as of a given time
+
+    A token's price at a time is its latest price at or before it, as in
+    the summary queries. Prices are kept sorted by time for each token, so
+    a lookup is a binary search.
+    """
+
+    def __init__(
+        self,
+        prices: Iterable[Tuple[str, datetime, Decimal]],
+        decimals_by_token: Dict[str, int],
+    ):
+        prices_by_token: Dict[str, List[Tuple[datetime, Decimal]]] = defaultdict(list)
+        for token_address, timestamp, usd_price in prices:
+            prices_by_token[token_address].append((timestamp, usd_price))
+
+        self._timestamps_by_token: Dict[str, List[datetime]] = {}
+        self._usd_prices_by_token: Dict[str, List[Decimal]] = {}
+
+        for token_address, token_prices in prices_by_token.items():
+            token_prices.sort()
+            self._timestamps_by_token[token_address] = [
+                timestamp for timestamp, _ in token_prices
+            ]
+            self._usd_prices_by_token[token_address] = [
+                usd_price for _, usd_price in token_prices
+            ]
+
+        self._decimals_by_token = decimals_by_token
+
+    def has_token(self, token_address: str) -> bool:
+        return token_address in self._decimals_by_token
+
+    def get_usd_price(
+        self,
+        token_address: str,
+        timestamp: datetime,
+    ) -> Optional[Decimal]:
+        timestamps = self._timestamps_by_token.get(token_address)
+        if timestamps is None:
+            return None
+
+        index = bisect_right(timestamps, timestamp)
+        if index == 0:
+            return None
+
+        return self._usd_prices_by_token[token_address][index - 1]
+
+    def get_usd_value(
+        self,
+        token_address: str,
+        amount: int,
+        timestamp: datetime,
+    ) -> Optional[Decimal]:
+        """USD value of amount in the token's smallest unit"""
+        usd_price = self.get_usd_price(token_address, timestamp)
+        decimals = self._decimals_by_token.get(token_address)
+
+        if usd_price is None or decimals is None:
+            return None
+
+        return usd_price * amount / Decimal(10) ** decimals
+
+
+def load_price_oracle(
+    db_session,
+    after_timestamp: datetime,
+    before_timestamp: datetime,
+) -> PriceOracle:
+    """Loads every price needed for lookups from after_timestamp to before_timestamp"""
+    return PriceOracle(
+        find_prices_for_time_range(db_session, after_timestamp, before_timestamp),
+        find_token_decimals(db_session),
+    )
@@ -1,45 +1,276 @@
-from datetime import datetime
-from typing import List
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Protocol, Tuple, Union
 
 from pycoingecko import CoinGeckoAPI
 
 from mev_inspect.schemas.prices import COINGECKO_ID_BY_ADDRESS, TOKEN_ADDRESSES, Price
 
+PRICE_CACHE_DIR_ENV = "PRICE_CACHE_DIR"
 
-def fetch_prices() -> List[Price]:
-    coingecko_api = CoinGeckoAPI()
-    prices = []
+DEFAULT_PRICE_FETCH_CONCURRENCY = 4
 
-    for token_address in TOKEN_ADDRESSES:
-        coingecko_price_data = coingecko_api.get_coin_market_chart_by_id(
-            id=COINGECKO_ID_BY_ADDRESS[token_address],
-            vs_currency="usd",
-            days="max",
-            interval="daily",
-        )
-        prices += _build_token_prices(coingecko_price_data, token_address)
+# CoinGecko's public API allows 10 to 50 calls a minute
+DEFAULT_REQUESTS_PER_SECOND = 0.2
+DEFAULT_REQUEST_BURST = 3
 
-    return prices
+# (unix timestamp in milliseconds, usd price)
+TimeSeries = List[Tuple[int, float]]
 
+logger = logging.getLogger(__name__)
+
+
+class PriceSource(Protocol):
+    async def get_time_series(
+        self,
+        token_address: str,
+        after: Optional[datetime],
+        before: Optional[datetime],
+    ) -> TimeSeries:
+        """Gets prices between after and before, or every daily price if unset"""
+
+
+class CoinGeckoPriceSource:
+    """Runs the blocking CoinGecko client in the event loop's executor"""
+
+    def __init__(self) -> None:
+        self._coingecko_api = CoinGeckoAPI()
+
+    async def get_time_series(
+        self,
+        token_address: str,
+        after: Optional[datetime],
+        before: Optional[datetime],
+    ) -> TimeSeries:
+        coingecko_id = COINGECKO_ID_BY_ADDRESS[token_address]
+
+        if after is None or before is None:
+            get_price_data = partial(
+                self._coingecko_api.get_coin_market_chart_by_id,
+                id=coingecko_id,
+                vs_currency="usd",
+                days="max",
+                interval="daily",
+            )
+        else:
+            get_price_data = partial(
+                self._coingecko_api.get_coin_market_chart_range_by_id,
+                coingecko_id,
+                "usd",
+                int(after.timestamp()),
+                int(before.timestamp()),
+            )
+
+        loop = asyncio.get_running_loop()
+        coingecko_price_data = await loop.run_in_executor(None, get_price_data)
+
+        return [
+            (int(timestamp_ms), float(usd_price))
+            for timestamp_ms, usd_price in coingecko_price_data["prices"]
+        ]
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing bursts of up to capacity requests, refilled at
+    rate_per_second. Waiting requests are let through in order.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: int):
+        if rate_per_second <= 0 or capacity < 1:
+            raise ValueError("Rate and capacity must be positive")
+
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+
+        # created in the event loop the bucket is used in
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._tokens + (now - self._updated_at) * self.rate_per_second,
+                    float(self.capacity),
+                )
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
 
-def fetch_prices_range(after: datetime, before: datetime) -> List[Price]:
-    coingecko_api = CoinGeckoAPI()
-    prices = []
-    after_unix = int(after.timestamp())
-    before_unix = int(before.timestamp())
 
-    for token_address in TOKEN_ADDRESSES:
-        coingecko_price_data = coingecko_api.get_coin_market_chart_range_by_id(
-            COINGECKO_ID_BY_ADDRESS[token_address], "usd", after_unix, before_unix
+class PriceCache:
+    """
+    On-disk cache of fetched time series, one JSON file per request
+
+    Every daily price is cached per day, so a backfill interrupted partway
+    through picks up from the tokens it had not fetched yet.
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get(
+        self,
+        token_address: str,
+        after: Optional[datetime],
+        before: Optional[datetime],
+    ) -> Optional[TimeSeries]:
+        path = self._get_path(token_address, after, before)
+
+        try:
+            time_series = json.loads(path.read_text())
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning(f"Dropping corrupt cached prices {path.name}")
+            path.unlink()
+            return None
+
+        return [(timestamp_ms, usd_price) for timestamp_ms, usd_price in time_series]
+
+    def put(
+        self,
+        token_address: str,
+        after: Optional[datetime],
+        before: Optional[datetime],
+        time_series: TimeSeries,
+    ) -> None:
+        path = self._get_path(token_address, after, before)
+
+        # written to a temporary file first, so a cached file is always whole
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.directory, suffix=".tmp"
         )
+        with os.fdopen(file_descriptor, "w") as temporary_file:
+            json.dump(time_series, temporary_file)
 
-        prices += _build_token_prices(coingecko_price_data, token_address)
+        os.replace(temporary_path, path)
 
-    return prices
+    def _get_path(
+        self,
+        token_address: str,
+        after: Optional[datetime],
+        before: Optional[datetime],
+    ) -> Path:
+        if after is None or before is None:
+            fetched_on = datetime.now(timezone.utc).date().isoformat()
+            return self.directory / f"{token_address}_max_{fetched_on}.json"
+
+        return (
+            self.directory
+            / f"{token_address}_{int(after.timestamp())}_{int(before.timestamp())}.json"
+        )
+
+
+def fetch_prices(
+    price_source: Optional[PriceSource] = None,
+    price_cache: Optional[PriceCache] = None,
+    max_concurrency: int = DEFAULT_PRICE_FETCH_CONCURRENCY,
+    rate_limiter: Optional[TokenBucket] = None,
+) -> AsyncIterator[List[Price]]:
+    return _fetch_token_prices(
+        None,
+        None,
+        price_source,
+        price_cache,
+        max_concurrency,
+        rate_limiter,
+    )
+
+
+def fetch_prices_range(
+    after: datetime,
+    before: datetime,
+    price_source: Optional[PriceSource] = None,
+    price_cache: Optional[PriceCache] = None,
+    max_concurrency: int = DEFAULT_PRICE_FETCH_CONCURRENCY,
+    rate_limiter: Optional[TokenBucket] = None,
+) -> AsyncIterator[List[Price]]:
+    return _fetch_token_prices(
+        after,
+        before,
+        price_source,
+        price_cache,
+        max_concurrency,
+        rate_limiter,
+    )
+
+
+async def _fetch_token_prices(
+    after: Optional[datetime],
+    before: Optional[datetime],
+    price_source: Optional[PriceSource],
+    price_cache: Optional[PriceCache],
+    max_concurrency: int,
+    rate_limiter: Optional[TokenBucket],
+) -> AsyncIterator[List[Price]]:
+    """
+    Fetches every token's prices, at most max_concurrency at a time, and
+    yields each token's prices as soon as they are fetched
+    """
+    source: PriceSource = (
+        price_source if price_source is not None else CoinGeckoPriceSource()
+    )
+    limiter = (
+        rate_limiter
+        if rate_limiter is not None
+        else TokenBucket(DEFAULT_REQUESTS_PER_SECOND, DEFAULT_REQUEST_BURST)
+    )
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_token_prices(token_address: str) -> List[Price]:
+        async with semaphore:
+            time_series = (
+                price_cache.get(token_address, after, before)
+                if price_cache is not None
+                else None
+            )
+
+            if time_series is None:
+                await limiter.acquire()
+                time_series = await source.get_time_series(token_address, after, before)
+
+                if price_cache is not None:
+                    price_cache.put(token_address, after, before, time_series)
+            else:
+                logger.info(f"Using cached prices for {token_address}")
+
+        return _build_token_prices(time_series, token_address)
+
+    tasks = [
+        asyncio.ensure_future(fetch_token_prices(token_address))
+        for token_address in TOKEN_ADDRESSES
+    ]
+
+    try:
+        for next_fetched in asyncio.as_completed(tasks):
+            yield await next_fetched
+    finally:
+        for task in tasks:
+            task.cancel()
 
 
-def _build_token_prices(coingecko_price_data, token_address) -> List[Price]:
-    time_series = coingecko_price_data["prices"]
+def _build_token_prices(time_series: TimeSeries, token_address: str) -> List[Price]:
     prices = []
     for entry in time_series:
         timestamp = datetime.fromtimestamp(entry[0] / 1000)
@@ -1,9 +1,226 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from eth_utils import to_bytes, to_text
 from web3 import AsyncHTTPProvider, Web3
+from web3._utils.encoding import FriendlyJsonSerde
+from web3.types import RPCEndpoint, RPCResponse
 
+from mev_inspect.adaptive_concurrency import (
+    AdaptiveConcurrencyLimiter,
+    get_adaptive_concurrency_middleware,
+)
+from mev_inspect.http_session import SharedHTTPSession, get_shared_http_session
+from mev_inspect.load_balancer import LoadBalancingAsyncProvider, get_rpc_endpoints
 from mev_inspect.retry import http_retry_with_backoff_request_middleware
 
+# 1 sends every request on its own
+DEFAULT_RPC_BATCH_SIZE = 1
+
+# timestamp, receipts, traces and base fee are fetched together
+RPC_REQUESTS_PER_BLOCK = 4
+
+# how long a request waits for others to share its batch
+DEFAULT_RPC_BATCH_WAIT_SECONDS = 0.01
+
+logger = logging.getLogger(__name__)
+
+_PendingRequest = Tuple[Dict[str, Any], "asyncio.Future[RPCResponse]"]
+
+
+class PooledAsyncHTTPProvider(AsyncHTTPProvider):
+    """
+    AsyncHTTPProvider that sends requests through a SharedHTTPSession
+
+    web3's own session uses aiohttp defaults, without a per host limit or
+    long lived DNS cache, and is tied to the loop it was first used in.
+    """
+
+    def __init__(
+        self,
+        endpoint_uri: str,
+        request_kwargs: Optional[Any] = None,
+        http_session: Optional[SharedHTTPSession] = None,
+    ) -> None:
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs)
+        self.http_session = (
+            http_session if http_session is not None else get_shared_http_session()
+        )
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        raw_response = await self._post(self.encode_rpc_request(method, params))
+        return self.decode_rpc_response(raw_response)
+
+    async def _post(self, request_data: bytes) -> bytes:
+        session = self.http_session.get_session()
+
+        async with session.post(
+            str(self.endpoint_uri),
+            data=request_data,
+            raise_for_status=True,
+            **self.get_request_kwargs(),
+        ) as response:
+            return await response.read()
+
+
+class BatchingAsyncHTTPProvider(PooledAsyncHTTPProvider):
+    """
+    AsyncHTTPProvider that sends concurrent requests as JSON-RPC batches
+
+    Requests are held for up to batch_wait_seconds, or until batch_size of
+    them are waiting, then sent together in a single POST. Responses are
+    matched back to their requests by id, so each caller still gets its own
+    response and middlewares like retries keep working per request.
+    """
+
+    def __init__(
+        self,
+        endpoint_uri: str,
+        request_kwargs: Optional[Any] = None,
+        batch_size: int = DEFAULT_RPC_BATCH_SIZE,
+        batch_wait_seconds: float = DEFAULT_RPC_BATCH_WAIT_SECONDS,
+        http_session: Optional[SharedHTTPSession] = None,
+    ) -> None:
+        super().__init__(
+            endpoint_uri, request_kwargs=request_kwargs, http_session=http_session
+        )
+        self.batch_size = batch_size
+        self.batch_wait_seconds = batch_wait_seconds
+
+        self._pending_requests: List[_PendingRequest] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set["asyncio.Task[None]"] = set()
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        loop = asyncio.get_running_loop()
+        response_future: "asyncio.Future[RPCResponse]" = loop.create_future()
+
+        rpc_request = {
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params or [],
+            "id": next(self.request_counter),
+        }
+        self._pending_requests.append((rpc_request, response_future))
+
+        if len(self._pending_requests) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_wait_seconds, self._flush)
+
+        return await response_future
 
-def get_base_provider(rpc: str, request_timeout: int = 500) -> Web3.AsyncHTTPProvider:
-    base_provider = AsyncHTTPProvider(rpc, request_kwargs={"timeout": request_timeout})
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        pending_requests = self._pending_requests
+        self._pending_requests = []
+
+        if len(pending_requests) > 0:
+            batch_task = asyncio.ensure_future(self._send_batch(pending_requests))
+            self._batch_tasks.add(batch_task)
+            batch_task.add_done_callback(self._batch_tasks.discard)
+
+    async def _send_batch(self, pending_requests: List[_PendingRequest]) -> None:
+        rpc_requests = [rpc_request for rpc_request, _ in pending_requests]
+
+        try:
+            responses = await self._post_batch(rpc_requests)
+        except Exception as e:  # pylint: disable=broad-except
+            for _, response_future in pending_requests:
+                if not response_future.done():
+                    response_future.set_exception(e)
+            return
+
+        responses_by_id = {response.get("id"): response for response in responses}
+
+        # nodes reject a whole batch they can't serve with one error without an id
+        batch_error = responses_by_id.get(None, {}).get("error")
+
+        for rpc_request, response_future in pending_requests:
+            if response_future.done():
+                continue
+
+            response = responses_by_id.get(rpc_request["id"])
+
+            if response is None and batch_error is not None:
+                response_future.set_exception(ValueError(batch_error))
+            elif response is None:
+                response_future.set_exception(
+                    ValueError(
+                        f"No response for {rpc_request['method']} "
+                        f"with id {rpc_request['id']} in JSON-RPC batch"
+                    )
+                )
+            else:
+                response_future.set_result(response)
+
+    async def _post_batch(
+        self, rpc_requests: List[Dict[str, Any]]
+    ) -> List[RPCResponse]:
+        # a single request is sent on its own for nodes without batch support
+        request_body: Union[Dict[str, Any], List[Dict[str, Any]]] = (
+            rpc_requests[0] if len(rpc_requests) == 1 else rpc_requests
+        )
+
+        logger.debug(f"Sending JSON-RPC batch of {len(rpc_requests)} requests")
+        raw_response = await self._post(
+            to_bytes(text=FriendlyJsonSerde().json_encode(request_body))
+        )
+        response = FriendlyJsonSerde().json_decode(to_text(raw_response))
+
+        if isinstance(response, dict):
+            return [response]
+
+        if isinstance(response, list):
+            return response
+
+        raise ValueError(f"Unexpected JSON-RPC batch response: {response}")
+
+
+def get_base_provider(
+    rpc: str,
+    request_timeout: int = 500,
+    batch_size: int = DEFAULT_RPC_BATCH_SIZE,
+    max_concurrency: int = 1,
+    hedge_after_seconds: Optional[float] = None,
+    concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+) -> Web3.AsyncHTTPProvider:
+    """
+    rpc can list several endpoints separated by commas, in which case
+    requests are load balanced across them
+    """
+    request_kwargs = {"timeout": request_timeout}
+
+    # each concurrent block fetch can have all of its requests in flight
+    get_shared_http_session().reserve_connections_per_host(
+        max_concurrency * RPC_REQUESTS_PER_BLOCK
+    )
+
+    endpoint_providers = [
+        BatchingAsyncHTTPProvider(
+            endpoint, request_kwargs=request_kwargs, batch_size=batch_size
+        )
+        if batch_size > 1
+        else PooledAsyncHTTPProvider(endpoint, request_kwargs=request_kwargs)
+        for endpoint in get_rpc_endpoints(rpc) or [rpc]
+    ]
+
+    base_provider = (
+        endpoint_providers[0]
+        if len(endpoint_providers) == 1
+        else LoadBalancingAsyncProvider(
+            endpoint_providers, hedge_after_seconds=hedge_after_seconds
+        )
+    )
     base_provider.middlewares += (http_retry_with_backoff_request_middleware,)
+
+    if concurrency_limiter is not None:
+        base_provider.middlewares += (
+            get_adaptive_concurrency_middleware(concurrency_limiter),
+        )
+
     return base_provider
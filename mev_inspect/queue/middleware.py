@@ -5,7 +5,11 @@ from threading import local
 from dramatiq.middleware import Middleware
 
 from mev_inspect.db import get_inspect_sessionmaker, get_trace_sessionmaker
-from mev_inspect.inspector import MEVInspector
+from mev_inspect.inspector import (
+    DEFAULT_INITIAL_CONCURRENCY,
+    DEFAULT_MAX_CONCURRENCY,
+    MEVInspector,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +56,8 @@ class InspectorMiddleware(Middleware):
             logger.info("Building inspector")
             inspector = MEVInspector(
                 self._rpc_url,
-                max_concurrency=5,
+                max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                initial_concurrency=DEFAULT_INITIAL_CONCURRENCY,
                 request_timeout=300,
             )
 
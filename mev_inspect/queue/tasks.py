@@ -2,7 +2,8 @@ import asyncio
 import logging
 from contextlib import contextmanager
 
-from mev_inspect.s3_export import export_block
+from mev_inspect.http_session import get_shared_http_session
+from mev_inspect.s3_export import export_block, export_block_range
 
 from .middleware import DbMiddleware, InspectorMiddleware
 
@@ -23,11 +24,11 @@ def inspect_many_blocks_task(
     with _session_scope(DbMiddleware.get_inspect_sessionmaker()) as inspect_db_session:
         with _session_scope(DbMiddleware.get_trace_sessionmaker()) as trace_db_session:
             asyncio.run(
-                InspectorMiddleware.get_inspector().inspect_many_blocks(
-                    inspect_db_session=inspect_db_session,
-                    trace_db_session=trace_db_session,
-                    after_block=after_block,
-                    before_block=before_block,
+                _inspect_many_blocks(
+                    inspect_db_session,
+                    trace_db_session,
+                    after_block,
+                    before_block,
                 )
             )
 
@@ -42,6 +43,30 @@ def backfill_export_task(block_number: int):
         export_block(inspect_db_session, block_number)
 
 
+def backfill_export_range_task(after_block: int, before_block: int):
+    with _session_scope(DbMiddleware.get_inspect_sessionmaker()) as inspect_db_session:
+        export_block_range(inspect_db_session, after_block, before_block)
+
+
+async def _inspect_many_blocks(
+    inspect_db_session,
+    trace_db_session,
+    after_block: int,
+    before_block: int,
+) -> None:
+    # each message runs in its own event loop, so its HTTP session is
+    # closed before the loop is
+    try:
+        await InspectorMiddleware.get_inspector().inspect_many_blocks(
+            inspect_db_session=inspect_db_session,
+            trace_db_session=trace_db_session,
+            after_block=after_block,
+            before_block=before_block,
+        )
+    finally:
+        await get_shared_http_session().close()
+
+
 @contextmanager
 def _session_scope(Session=None):
     if Session is None:
@@ -2,11 +2,18 @@ import itertools
 import json
 import logging
 import os
-from typing import Iterator, Optional, Tuple, TypeVar
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from functools import lru_cache
+from typing import Any, Dict, Optional, Set
 
 import boto3
-
-from mev_inspect.text_io import BytesIteratorIO
+from botocore.config import Config
 
 AWS_ENDPOINT_URL_ENV = "AWS_ENDPOINT_URL"
 EXPORT_BUCKET_NAME_ENV = "EXPORT_BUCKET_NAME"
@@ -14,6 +21,12 @@ EXPORT_BUCKET_REGION_ENV = "EXPORT_BUCKET_REGION"
 EXPORT_AWS_ACCESS_KEY_ID_ENV = "EXPORT_AWS_ACCESS_KEY_ID"
 EXPORT_AWS_SECRET_ACCESS_KEY_ENV = "EXPORT_AWS_SECRET_ACCESS_KEY"
 
+# also the size of the client's connection pool
+DEFAULT_UPLOAD_CONCURRENCY = 10
+
+# most keys S3 deletes in one request
+MAX_DELETE_OBJECTS = 1000
+
 supported_tables = [
     "mev_summary",
     "arbitrages",
@@ -27,80 +40,197 @@ logger = logging.getLogger(__name__)
 
 
 def export_block(inspect_db_session, block_number: int) -> None:
-    for table in supported_tables:
-        _export_block_by_table(inspect_db_session, block_number, table)
-
+    export_block_range(inspect_db_session, block_number, block_number + 1)
+
+
+def export_block_range(
+    inspect_db_session,
+    after_block_number: int,
+    before_block_number: int,
+    client=None,
+    upload_concurrency: int = DEFAULT_UPLOAD_CONCURRENCY,
+) -> None:
+    """
+    Exports every block in [after_block_number, before_block_number) with
+    one streaming query per table, uploading the blocks' objects concurrently
+    """
+    if client is None:
+        client = get_s3_client()
 
-def _export_block_by_table(inspect_db_session, block_number: int, table: str) -> None:
-    client = get_s3_client()
     export_bucket_name = get_export_bucket_name()
-    export_statement = _get_export_statement(table)
 
-    object_key = f"{table}/flashbots_{block_number}.json"
-
-    mev_summary_json_results = inspect_db_session.execute(
-        statement=export_statement,
-        params={
-            "block_number": block_number,
-        },
-    )
-
-    first_value, mev_summary_json_results = _peek(mev_summary_json_results)
-    if first_value is None:
-        existing_object_size = _get_object_size(client, export_bucket_name, object_key)
-        if existing_object_size is None or existing_object_size == 0:
-            logger.info(f"Skipping {table} for block {block_number} - no data")
-            client.delete_object(
-                Bucket=export_bucket_name,
-                Key=object_key,
+    with ThreadPoolExecutor(max_workers=upload_concurrency) as executor:
+        uploads = _Uploads(executor, max_pending=2 * upload_concurrency)
+
+        for table in supported_tables:
+            _export_block_range_by_table(
+                inspect_db_session,
+                client,
+                uploads,
+                export_bucket_name,
+                after_block_number,
+                before_block_number,
+                table,
             )
-            return
 
-    mev_summary_json_fileobj = BytesIteratorIO(
-        (f"{json.dumps(row)}\n".encode("utf-8") for (row,) in mev_summary_json_results)
+        uploads.wait_all()
+
+
+class _Uploads:
+    """Keeps at most max_pending uploads queued or running at once"""
+
+    def __init__(self, executor: Executor, max_pending: int):
+        self.executor = executor
+        self.max_pending = max_pending
+        self._pending: Set["Future[Any]"] = set()
+
+    def submit(self, client, bucket: str, key: str, body: bytes) -> None:
+        if len(self._pending) >= self.max_pending:
+            done, self._pending = wait(self._pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+
+        self._pending.add(
+            self.executor.submit(client.put_object, Bucket=bucket, Key=key, Body=body)
+        )
+
+    def wait_all(self) -> None:
+        pending, self._pending = self._pending, set()
+        for future in pending:
+            future.result()
+
+
+def _export_block_range_by_table(
+    inspect_db_session,
+    client,
+    uploads: _Uploads,
+    export_bucket_name: str,
+    after_block_number: int,
+    before_block_number: int,
+    table: str,
+) -> None:
+    existing_object_sizes = _get_object_sizes(
+        client,
+        export_bucket_name,
+        table,
+        after_block_number,
+        before_block_number,
     )
 
-    client.delete_object(
-        Bucket=export_bucket_name,
-        Key=object_key,
+    json_results = inspect_db_session.execute(
+        statement=_get_export_statement(table),
+        params={
+            "after_block_number": after_block_number,
+            "before_block_number": before_block_number,
+        },
+        execution_options={"stream_results": True},
     )
 
-    client.upload_fileobj(
-        mev_summary_json_fileobj,
-        Bucket=export_bucket_name,
-        Key=object_key,
+    exported_block_numbers = set()
+
+    for block_number, block_json_results in itertools.groupby(
+        json_results, key=lambda result: int(result[0])
+    ):
+        uploads.submit(
+            client,
+            export_bucket_name,
+            _get_object_key(table, block_number),
+            b"".join(
+                f"{json.dumps(row)}\n".encode("utf-8") for _, row in block_json_results
+            ),
+        )
+        exported_block_numbers.add(block_number)
+
+    # blocks that no longer have data are emptied, and empty ones removed
+    empty_object_keys = []
+    for block_number, object_size in existing_object_sizes.items():
+        if block_number in exported_block_numbers:
+            continue
+
+        object_key = _get_object_key(table, block_number)
+        if object_size == 0:
+            empty_object_keys.append(object_key)
+        else:
+            uploads.submit(client, export_bucket_name, object_key, b"")
+
+    for i in range(0, len(empty_object_keys), MAX_DELETE_OBJECTS):
+        client.delete_objects(
+            Bucket=export_bucket_name,
+            Delete={
+                "Objects": [
+                    {"Key": object_key}
+                    for object_key in empty_object_keys[i : i + MAX_DELETE_OBJECTS]
+                ],
+                "Quiet": True,
+            },
+        )
+
+    logger.info(
+        f"Exported {len(exported_block_numbers)} blocks to {table} "
+        f"for blocks {after_block_number} to {before_block_number}"
     )
 
-    logger.info(f"Exported to {object_key}")
-
 
 def _get_export_statement(table: str) -> str:
     return f"""
-        SELECT to_json(json)
+        SELECT json.block_number, to_json(json)
         FROM (
             SELECT *, CURRENT_TIMESTAMP(0) as timestamp
             FROM {table}
 
         ) json
         WHERE
-        block_number = :block_number
+            block_number >= :after_block_number AND
+            block_number < :before_block_number
+        ORDER BY json.block_number
         """
 
 
-def _get_object_size(client, bucket: str, key: str) -> Optional[int]:
-    response = client.list_objects_v2(
-        Bucket=bucket,
-        Prefix=key,
-    )
+def _get_object_key(table: str, block_number: int) -> str:
+    return f"{table}/flashbots_{block_number}.json"
 
-    for obj in response.get("Contents", []):
-        if obj["Key"] == key:
-            return obj["Size"]
 
-    return None
+def _get_object_sizes(
+    client,
+    bucket: str,
+    table: str,
+    after_block_number: int,
+    before_block_number: int,
+) -> Dict[int, int]:
+    """Lists the sizes of the table's objects for blocks in the range"""
+    key_prefix = f"{table}/flashbots_"
+    first_block_digits = str(after_block_number)
+    last_block_digits = str(before_block_number - 1)
 
+    # narrows the listing to keys starting with the range's common digits
+    list_prefix = key_prefix
+    if len(first_block_digits) == len(last_block_digits):
+        list_prefix += os.path.commonprefix([first_block_digits, last_block_digits])
 
+    object_sizes = {}
+    list_kwargs = {"Bucket": bucket, "Prefix": list_prefix}
+
+    while True:
+        response = client.list_objects_v2(**list_kwargs)
+
+        for obj in response.get("Contents", []):
+            block_digits = obj["Key"][len(key_prefix) : -len(".json")]
+            if not block_digits.isdigit():
+                continue
+
+            block_number = int(block_digits)
+            if after_block_number <= block_number < before_block_number:
+                object_sizes[block_number] = obj["Size"]
+
+        if not response.get("IsTruncated"):
+            return object_sizes
+
+        list_kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+
+@lru_cache(maxsize=None)
 def get_s3_client():
+    """Creates the process' client once, its connections are pooled and reused"""
     endpoint_url = get_endpoint_url()
     return boto3.client(
         "s3",
@@ -108,6 +238,7 @@ def get_s3_client():
         region_name=get_export_bucket_region(),
         aws_access_key_id=get_export_aws_access_key_id(),
         aws_secret_access_key=get_export_aws_secret_access_key(),
+        config=Config(max_pool_connections=DEFAULT_UPLOAD_CONCURRENCY),
     )
 
 
@@ -129,15 +260,3 @@ def get_export_aws_access_key_id() -> Optional[str]:
 
 def get_export_aws_secret_access_key() -> Optional[str]:
     return os.environ.get(EXPORT_AWS_SECRET_ACCESS_KEY_ENV)
-
-
-_T = TypeVar("_T")
-
-
-def _peek(iterable: Iterator[_T]) -> Tuple[Optional[_T], Iterator[_T]]:
-    try:
-        first = next(iterable)
-    except StopIteration:
-        return None, iter([])
-
-    return first, itertools.chain([first], iterable)
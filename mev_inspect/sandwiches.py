@@ -1,4 +1,6 @@
-from typing import List, Optional
+from bisect import bisect_right
+from heapq import merge
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from mev_inspect.schemas.sandwiches import Sandwich
 from mev_inspect.schemas.swaps import Swap
@@ -7,6 +9,9 @@ UNISWAP_V2_ROUTER = "0x7a250d5630b4cf539739df2c5dacb4c659f2488d"
 UNISWAP_V3_ROUTER = "0xe592427a0aece92de3edee1f18e0157c05861564"
 UNISWAP_V3_ROUTER_2 = "0x68b3465833fb72a70ecdf485e0e4c7bd8665fc45"
 
+# contract address, token in, token out
+_PoolDirection = Tuple[str, str, str]
+
 
 def get_sandwiches(swaps: List[Swap]) -> List[Sandwich]:
     ordered_swaps = list(
@@ -16,10 +21,21 @@ def get_sandwiches(swaps: List[Swap]) -> List[Sandwich]:
         )
     )
 
+    indexes_by_pool_direction: Dict[_PoolDirection, List[int]] = {}
+    for index, swap in enumerate(ordered_swaps):
+        indexes_by_pool_direction.setdefault(_get_pool_direction(swap), []).append(
+            index
+        )
+
     sandwiches: List[Sandwich] = []
 
     for index, swap in enumerate(ordered_swaps):
-        rest_swaps = ordered_swaps[index + 1 :]
+        rest_swaps = [
+            ordered_swaps[rest_index]
+            for rest_index in _get_later_pool_swap_indexes(
+                swap, index, indexes_by_pool_direction
+            )
+        ]
         sandwich = _get_sandwich_starting_with_swap(swap, rest_swaps)
 
         if sandwich is not None:
@@ -28,6 +44,41 @@ def get_sandwiches(swaps: List[Swap]) -> List[Sandwich]:
     return sandwiches
 
 
+def _get_pool_direction(swap: Swap) -> _PoolDirection:
+    return (swap.contract_address, swap.token_in_address, swap.token_out_address)
+
+
+def _get_later_pool_swap_indexes(
+    front_swap: Swap,
+    front_index: int,
+    indexes_by_pool_direction: Dict[_PoolDirection, List[int]],
+) -> Iterable[int]:
+    """
+    Indexes of swaps after front_swap on the same pool, in either direction,
+    in their original order. Swaps on other pools can't be part of a sandwich
+    starting with front_swap.
+    """
+    same_direction = _get_pool_direction(front_swap)
+    reverse_direction = (
+        front_swap.contract_address,
+        front_swap.token_out_address,
+        front_swap.token_in_address,
+    )
+
+    directions = (
+        [same_direction]
+        if same_direction == reverse_direction
+        else [same_direction, reverse_direction]
+    )
+
+    later_indexes = []
+    for direction in directions:
+        indexes = indexes_by_pool_direction.get(direction, [])
+        later_indexes.append(indexes[bisect_right(indexes, front_index) :])
+
+    return merge(*later_indexes)
+
+
 def _get_sandwich_starting_with_swap(
     front_swap: Swap,
     rest_swaps: List[Swap],
@@ -57,3 +57,33 @@ class ABIFunctionDescription(BaseModel):
 
 ABIDescription = Union[ABIFunctionDescription, ABIGenericDescription]
 ABI = List[ABIDescription]
+
+
+class CompiledABIFunction(BaseModel):
+    """Everything needed to match and decode calls to a function, precomputed"""
+
+    selector: str
+    name: str
+    signature: str
+    input_names: List[str]
+    input_types: List[str]
+
+    @classmethod
+    def from_description(
+        cls, description: ABIFunctionDescription
+    ) -> "CompiledABIFunction":
+        return cls(
+            selector=description.get_selector(),
+            name=description.name,
+            signature=description.get_signature(),
+            input_names=[input.name for input in description.inputs],
+            input_types=[
+                input.type
+                if input.type != "tuple"
+                else eth_utils.abi.collapse_if_tuple(input.dict())
+                for input in description.inputs
+            ],
+        )
+
+
+CompiledABI = List[CompiledABIFunction]
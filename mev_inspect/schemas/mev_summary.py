@@ -0,0 +1,29 @@
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class MevType(Enum):
+    arbitrage = "arbitrage"
+    liquidation = "liquidation"
+
+
+class MevSummary(BaseModel):
+    block_number: int
+    block_timestamp: datetime
+    protocol: Optional[str]
+    transaction_hash: str
+    type: MevType
+    gross_profit_usd: Optional[Decimal]
+    miner_payment_usd: Optional[Decimal]
+    gas_used: int
+    gas_price: int
+    coinbase_transfer: int
+    gas_price_with_coinbase_transfer: int
+    miner_address: str
+    base_fee_per_gas: int
+    error: Optional[str]
+    protocols: List[str]
@@ -1,9 +1,17 @@
 import json
+import os
+from typing import Type, TypeVar
 
 from hexbytes import HexBytes
 from pydantic import BaseModel
 from web3.datastructures import AttributeDict
 
+STRICT_VALIDATION_ENV = "MEV_INSPECT_STRICT_VALIDATION"
+
+_strict_validation = os.getenv(STRICT_VALIDATION_ENV, "").lower() in ("1", "true")
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
 
 def to_camel(string: str) -> str:
     return "".join(
@@ -31,3 +39,15 @@ class CamelModel(BaseModel):
     class Config(Web3Model.Config):
         alias_generator = to_camel
         allow_population_by_field_name = True
+
+
+def construct_trusted(model_class: Type[ModelT], **values) -> ModelT:
+    """
+    Builds a model from values the pipeline produced itself without
+    validating them. Values must already have the field types, since nothing
+    is coerced. Set MEV_INSPECT_STRICT_VALIDATION=1 to validate anyway.
+    """
+    if _strict_validation:
+        return model_class(**values)
+
+    return model_class.construct(**values)
@@ -5,7 +5,7 @@ from mev_inspect.schemas.classifiers import SwapClassifier
 from mev_inspect.schemas.swaps import Swap
 from mev_inspect.schemas.traces import Classification, ClassifiedTrace, DecodedCallTrace
 from mev_inspect.schemas.transfers import Transfer
-from mev_inspect.traces import get_traces_by_transaction_hash
+from mev_inspect.traces import TraceTree
 from mev_inspect.transfers import (
     get_child_transfers,
     get_transfer,
@@ -13,17 +13,26 @@ from mev_inspect.transfers import (
 )
 
 
-def get_swaps(traces: List[ClassifiedTrace]) -> List[Swap]:
+def get_swaps(
+    traces: List[ClassifiedTrace],
+    trace_tree: Optional[TraceTree] = None,
+) -> List[Swap]:
+    if trace_tree is None:
+        trace_tree = TraceTree(traces)
+
     swaps = []
 
-    for _, transaction_traces in get_traces_by_transaction_hash(traces).items():
-        swaps += _get_swaps_for_transaction(list(transaction_traces))
+    for transaction_hash in trace_tree.get_transaction_hashes():
+        swaps += _get_swaps_for_transaction(transaction_hash, trace_tree)
 
     return swaps
 
 
-def _get_swaps_for_transaction(traces: List[ClassifiedTrace]) -> List[Swap]:
-    ordered_traces = list(sorted(traces, key=lambda t: t.trace_address))
+def _get_swaps_for_transaction(
+    transaction_hash: str,
+    trace_tree: TraceTree,
+) -> List[Swap]:
+    ordered_traces = trace_tree.get_transaction_traces(transaction_hash)
 
     swaps: List[Swap] = []
     prior_transfers: List[Transfer] = []
@@ -41,7 +50,7 @@ def _get_swaps_for_transaction(traces: List[ClassifiedTrace]) -> List[Swap]:
             child_transfers = get_child_transfers(
                 trace.transaction_hash,
                 trace.trace_address,
-                traces,
+                trace_tree,
             )
 
             swap = _parse_swap(
@@ -0,0 +1,82 @@
+from typing import List, Optional
+
+from mev_inspect.schemas.traces import Trace, TraceType
+from mev_inspect.utils import hex_to_int
+
+
+class BlockTraceStore:
+    """
+    Column oriented view over the traces of a block
+
+    Call fields that classification needs are parsed once out of each
+    trace's action and result dicts into typed columns, so they can be read
+    by index without building CallAction and CallResult models. Trace
+    addresses are copied once here and handed to the classified traces.
+
+    Columns that only apply to calls are None for other trace types, except
+    inputs, which is empty.
+    """
+
+    __slots__ = (
+        "traces",
+        "types",
+        "from_addresses",
+        "to_addresses",
+        "values",
+        "gas",
+        "gas_used",
+        "inputs",
+        "trace_addresses",
+    )
+
+    def __init__(self, traces: List[Trace]):
+        self.traces = traces
+        self.types: List[TraceType] = []
+        self.from_addresses: List[Optional[str]] = []
+        self.to_addresses: List[Optional[str]] = []
+        self.values: List[Optional[int]] = []
+        self.gas: List[Optional[int]] = []
+        self.gas_used: List[Optional[int]] = []
+        self.inputs: List[str] = []
+        self.trace_addresses: List[List[int]] = []
+
+        for trace in traces:
+            self.types.append(trace.type)
+            self.trace_addresses.append(list(trace.trace_address))
+
+            call_input = ""
+
+            if trace.type == TraceType.call:
+                action = trace.action
+                call_input = action["input"]
+
+                self.from_addresses.append(action["from"])
+                self.to_addresses.append(action["to"])
+                self.values.append(_to_int(action["value"]))
+                self.gas.append(_to_int(action["gas"]))
+                self.gas_used.append(_get_gas_used(trace.result))
+            else:
+                self.from_addresses.append(None)
+                self.to_addresses.append(None)
+                self.values.append(None)
+                self.gas.append(None)
+                self.gas_used.append(None)
+
+            self.inputs.append(call_input)
+
+    def __len__(self) -> int:
+        return len(self.traces)
+
+
+def _to_int(value) -> int:
+    if isinstance(value, str):
+        return hex_to_int(value)
+    return value
+
+
+def _get_gas_used(result: Optional[dict]) -> Optional[int]:
+    if result is None:
+        return None
+
+    gas_used = result["gasUsed"] if "gasUsed" in result else result["gas_used"]
+    return _to_int(gas_used)
@@ -1,5 +1,6 @@
+from bisect import bisect_right
 from itertools import groupby
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from mev_inspect.schemas.traces import ClassifiedTrace
 
@@ -16,24 +17,6 @@ def is_child_trace_address(
     )
 
 
-def get_child_traces(
-    transaction_hash: str,
-    parent_trace_address: List[int],
-    traces: List[ClassifiedTrace],
-) -> List[ClassifiedTrace]:
-    ordered_traces = sorted(traces, key=lambda t: t.trace_address)
-    child_traces = []
-
-    for trace in ordered_traces:
-        if trace.transaction_hash == transaction_hash and is_child_trace_address(
-            trace.trace_address,
-            parent_trace_address,
-        ):
-            child_traces.append(trace)
-
-    return child_traces
-
-
 def is_child_of_any_address(
     trace: ClassifiedTrace, parent_trace_addresses: List[List[int]]
 ) -> bool:
@@ -57,3 +40,78 @@ def get_traces_by_transaction_hash(
             key=get_transaction_hash,
         )
     }
+
+
+_TraceKey = Tuple[str, Tuple[int, ...]]
+
+
+class TraceTree:
+    """
+    Index over the traces of a block, keyed by transaction hash
+
+    Traces of each transaction are kept ordered by trace address, so the
+    descendants of a trace are the contiguous run of traces right after it.
+    Queries take time proportional to the size of their result.
+    """
+
+    def __init__(self, traces: List[ClassifiedTrace]):
+        self._ordered_traces: Dict[str, List[ClassifiedTrace]] = {}
+        self._ordered_trace_addresses: Dict[str, List[List[int]]] = {}
+        self._traces_by_key: Dict[_TraceKey, ClassifiedTrace] = {}
+        self._children_by_key: Dict[_TraceKey, List[ClassifiedTrace]] = {}
+
+        for transaction_hash, transaction_traces in get_traces_by_transaction_hash(
+            traces
+        ).items():
+            ordered_traces = sorted(transaction_traces, key=lambda t: t.trace_address)
+
+            self._ordered_traces[transaction_hash] = ordered_traces
+            self._ordered_trace_addresses[transaction_hash] = [
+                trace.trace_address for trace in ordered_traces
+            ]
+
+            for trace in ordered_traces:
+                trace_address = tuple(trace.trace_address)
+                self._traces_by_key[(transaction_hash, trace_address)] = trace
+
+                if len(trace_address) > 0:
+                    parent_key = (transaction_hash, trace_address[:-1])
+                    self._children_by_key.setdefault(parent_key, []).append(trace)
+
+    def get_transaction_hashes(self) -> List[str]:
+        return list(self._ordered_traces.keys())
+
+    def get_transaction_traces(self, transaction_hash: str) -> List[ClassifiedTrace]:
+        return list(self._ordered_traces.get(transaction_hash, []))
+
+    def get_trace(
+        self, transaction_hash: str, trace_address: List[int]
+    ) -> Optional[ClassifiedTrace]:
+        return self._traces_by_key.get((transaction_hash, tuple(trace_address)))
+
+    def get_children(
+        self, transaction_hash: str, parent_trace_address: List[int]
+    ) -> List[ClassifiedTrace]:
+        return list(
+            self._children_by_key.get(
+                (transaction_hash, tuple(parent_trace_address)), []
+            )
+        )
+
+    def get_descendants(
+        self, transaction_hash: str, parent_trace_address: List[int]
+    ) -> List[ClassifiedTrace]:
+        ordered_traces = self._ordered_traces.get(transaction_hash, [])
+        ordered_trace_addresses = self._ordered_trace_addresses.get(
+            transaction_hash, []
+        )
+
+        start = bisect_right(ordered_trace_addresses, parent_trace_address)
+        end = start
+
+        while end < len(ordered_trace_addresses) and is_child_trace_address(
+            ordered_trace_addresses[end], parent_trace_address
+        ):
+            end += 1
+
+        return ordered_traces[start:end]
@@ -1,11 +1,12 @@
-from typing import Dict, List, Optional, Sequence
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
 from mev_inspect.classifiers.specs import get_classifier
 from mev_inspect.schemas.classifiers import TransferClassifier
 from mev_inspect.schemas.prices import ETH_TOKEN_ADDRESS
 from mev_inspect.schemas.traces import ClassifiedTrace, DecodedCallTrace
 from mev_inspect.schemas.transfers import Transfer
-from mev_inspect.traces import get_child_traces, is_child_trace_address
+from mev_inspect.schemas.utils import construct_trusted
+from mev_inspect.traces import TraceTree
 
 
 def get_transfers(traces: List[ClassifiedTrace]) -> List[Transfer]:
@@ -49,10 +50,11 @@ def _is_simple_eth_transfer(trace: ClassifiedTrace) -> bool:
 
 
 def build_eth_transfer(trace: ClassifiedTrace) -> Transfer:
-    return Transfer(
+    return construct_trusted(
+        Transfer,
         block_number=trace.block_number,
         transaction_hash=trace.transaction_hash,
-        trace_address=trace.trace_address,
+        trace_address=list(trace.trace_address),
         amount=trace.value,
         to_address=trace.to_address,
         from_address=trace.from_address,
@@ -71,16 +73,11 @@ def _build_erc20_transfer(trace: DecodedCallTrace) -> Optional[Transfer]:
 def get_child_transfers(
     transaction_hash: str,
     parent_trace_address: List[int],
-    traces: List[ClassifiedTrace],
+    trace_tree: TraceTree,
 ) -> List[Transfer]:
-    child_transfers = []
-
-    for child_trace in get_child_traces(transaction_hash, parent_trace_address, traces):
-        transfer = get_transfer(child_trace)
-        if transfer is not None:
-            child_transfers.append(transfer)
-
-    return child_transfers
+    return get_transfers(
+        trace_tree.get_descendants(transaction_hash, parent_trace_address)
+    )
 
 
 def filter_transfers(
@@ -106,23 +103,23 @@ def remove_child_transfers_of_transfers(
     transfers: List[Transfer],
 ) -> List[Transfer]:
     updated_transfers = []
-    transfer_addresses_by_transaction: Dict[str, List[List[int]]] = {}
+    transfer_addresses_by_transaction: Dict[str, Set[Tuple[int, ...]]] = {}
 
     sorted_transfers = sorted(transfers, key=lambda t: t.trace_address)
 
     for transfer in sorted_transfers:
-        existing_addresses = transfer_addresses_by_transaction.get(
-            transfer.transaction_hash, []
+        existing_addresses = transfer_addresses_by_transaction.setdefault(
+            transfer.transaction_hash, set()
         )
+        trace_address = tuple(transfer.trace_address)
 
+        # parents sort before their children, so any parent is already seen
         if not any(
-            is_child_trace_address(transfer.trace_address, parent_address)
-            for parent_address in existing_addresses
+            trace_address[:parent_length] in existing_addresses
+            for parent_length in range(len(trace_address))
         ):
             updated_transfers.append(transfer)
 
-        transfer_addresses_by_transaction[
-            transfer.transaction_hash
-        ] = existing_addresses + [transfer.trace_address]
+        existing_addresses.add(trace_address)
 
     return updated_transfers
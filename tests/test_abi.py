@@ -0,0 +1,27 @@
+from mev_inspect import abi
+from mev_inspect.schemas.traces import Protocol
+
+
+def test_compiled_abi_from_registry_matches_json_abi(tmp_path, monkeypatch):
+    monkeypatch.setattr(abi, "ABI_REGISTRY_PATH", tmp_path / "abi_registry.json")
+    abi._load_abi_registry.cache_clear()
+
+    try:
+        assert abi._load_abi_registry() is None
+
+        abi.build_abi_registry()
+        assert abi._load_abi_registry() is not None
+
+        for abi_name, protocol in [
+            ("ERC20", None),
+            ("UniswapV3Pool", Protocol.uniswap_v3),
+            ("exchangeProxy", Protocol.zero_ex),
+        ]:
+            expected_abi = abi.compile_abi(abi.get_abi(abi_name, protocol))
+            assert abi.get_compiled_abi(abi_name, protocol) == expected_abi
+    finally:
+        abi._load_abi_registry.cache_clear()
+
+
+def test_compiled_abi_missing_abi():
+    assert abi.get_compiled_abi("NotARealABI", None) is None
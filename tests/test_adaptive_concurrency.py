@@ -0,0 +1,118 @@
+import asyncio
+
+from aiohttp import RequestInfo
+from aiohttp.client_exceptions import ClientResponseError
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from mev_inspect.adaptive_concurrency import (
+    AdaptiveConcurrencyLimiter,
+    adaptive_concurrency_middleware,
+)
+
+
+def _rate_limited_error():
+    request_info = RequestInfo(
+        URL("http://localhost:8545"),
+        "POST",
+        CIMultiDictProxy(CIMultiDict()),
+    )
+    return ClientResponseError(request_info, (), status=429)
+
+
+def test_limiter_grows_while_healthy():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4)
+
+    async def make_requests():
+        for _ in range(20):
+            started_at = [await limiter.acquire() for _ in range(limiter.limit)]
+            for request_started_at in started_at:
+                limiter.release("trace_block", request_started_at)
+
+    asyncio.run(make_requests())
+
+    stats = limiter.get_stats()
+    assert stats.limit == 4
+    assert stats.increases == 2
+    assert stats.decreases == 0
+
+
+def test_limiter_backs_off_once_per_overload():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, max_limit=8)
+
+    async def fail_requests():
+        started_at = [await limiter.acquire() for _ in range(4)]
+        for request_started_at in started_at:
+            limiter.release(
+                "trace_block", request_started_at, error=asyncio.TimeoutError()
+            )
+
+        started_at = await limiter.acquire()
+        limiter.release("trace_block", started_at, error=_rate_limited_error())
+
+    asyncio.run(fail_requests())
+
+    stats = limiter.get_stats()
+    assert stats.limit == 2
+    assert stats.decreases == 2
+    assert stats.timeouts == 4
+    assert stats.rate_limited == 1
+
+
+def test_limiter_ignores_other_errors():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=4)
+
+    async def fail_request():
+        started_at = await limiter.acquire()
+        limiter.release("trace_block", started_at, error=ValueError())
+
+    asyncio.run(fail_request())
+
+    assert limiter.get_stats().limit == 4
+
+
+def test_middleware_limits_concurrent_requests():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def make_request(method, params):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return {"result": params}
+
+    async def make_requests():
+        middleware = await adaptive_concurrency_middleware(make_request, None, limiter)
+        return await asyncio.gather(
+            *[middleware("trace_block", [index]) for index in range(10)]
+        )
+
+    responses = asyncio.run(make_requests())
+
+    assert [response["result"] for response in responses] == [
+        [index] for index in range(10)
+    ]
+    assert max_in_flight == 2
+    assert limiter.get_stats().in_flight == 0
+
+
+def test_limiter_backs_off_on_slow_responses(monkeypatch):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=4)
+    now = 0.0
+    monkeypatch.setattr("mev_inspect.adaptive_concurrency.time.monotonic", lambda: now)
+
+    async def make_requests():
+        nonlocal now
+        for latency_seconds in [0.2, 0.2, 5.0]:
+            started_at = await limiter.acquire()
+            now += latency_seconds
+            limiter.release("trace_block", started_at)
+
+    asyncio.run(make_requests())
+
+    stats = limiter.get_stats()
+    assert stats.slow_responses == 1
+    assert stats.limit == 2
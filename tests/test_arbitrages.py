@@ -228,6 +228,30 @@ def test_get_shortest_route():
     _assert_route_tokens_equal(actual_shortest_route, expected_shortest_route)
 
 
+def test_get_shortest_route_max_route_length():
+    # A->B, B->C, C->D, D->A
+    start_swap = create_generic_swap("0xa", "0xb")
+    other_swaps = [
+        create_generic_swap("0xb", "0xc"),
+        create_generic_swap("0xc", "0xd"),
+    ]
+    end_swap = create_generic_swap("0xd", "0xa")
+
+    assert (
+        _get_shortest_route(start_swap, [end_swap], other_swaps, max_route_length=3)
+        is None
+    )
+
+    shortest_route = _get_shortest_route(
+        start_swap, [end_swap], other_swaps, max_route_length=4
+    )
+    assert shortest_route is not None
+    _assert_route_tokens_equal(
+        shortest_route,
+        [("0xa", "0xb"), ("0xb", "0xc"), ("0xc", "0xd"), ("0xd", "0xa")],
+    )
+
+
 def _assert_route_tokens_equal(
     route: List[Swap],
     expected_token_in_out_pairs: List[Tuple[str, str]],
@@ -0,0 +1,84 @@
+import asyncio
+
+from mev_inspect import block as block_module
+from mev_inspect.block import create_from_block_range
+from tests.utils import load_test_block
+
+
+class FakeTraceDBSession:
+    def __init__(self, rows_by_table):
+        self.rows_by_table = rows_by_table
+        self.queried_tables = []
+
+    def execute(self, query, params, execution_options):
+        assert execution_options == {"stream_results": True}
+
+        for table, rows in self.rows_by_table.items():
+            if f"FROM {table}" in query:
+                self.queried_tables.append(table)
+                return [
+                    row
+                    for row in rows
+                    if params["after_block_number"]
+                    <= row[0]
+                    < params["before_block_number"]
+                ]
+
+        raise AssertionError(f"Unexpected query {query}")
+
+
+def test_create_from_block_range_fetches_only_missing_blocks(monkeypatch):
+    test_block = load_test_block(12914944)
+    raw_traces = [trace.dict(by_alias=True) for trace in test_block.traces]
+    raw_receipts = [receipt.dict(by_alias=True) for receipt in test_block.receipts]
+
+    # block 101 is missing from the trace DB
+    trace_db_session = FakeTraceDBSession(
+        {
+            "block_timestamps": [(100, 1000), (102, 1002)],
+            "block_receipts": [(100, raw_receipts), (102, raw_receipts)],
+            "block_traces": [(100, raw_traces), (102, raw_traces)],
+            "base_fee": [(100, 10), (102, 12)],
+        }
+    )
+
+    fetched_block_numbers = []
+
+    async def fake_fetch_block_timestamp(w3, block_number):
+        fetched_block_numbers.append(block_number)
+        return 2000 + block_number
+
+    async def fake_fetch_block_receipts(w3, block_number):
+        return test_block.receipts
+
+    async def fake_fetch_block_traces(w3, block_number):
+        return test_block.traces
+
+    async def fake_fetch_base_fee_per_gas(w3, block_number):
+        return 20
+
+    monkeypatch.setattr(
+        block_module, "_fetch_block_timestamp", fake_fetch_block_timestamp
+    )
+    monkeypatch.setattr(
+        block_module, "_fetch_block_receipts", fake_fetch_block_receipts
+    )
+    monkeypatch.setattr(block_module, "_fetch_block_traces", fake_fetch_block_traces)
+    monkeypatch.setattr(
+        block_module, "fetch_base_fee_per_gas", fake_fetch_base_fee_per_gas
+    )
+
+    blocks = asyncio.run(create_from_block_range(None, 100, 103, trace_db_session))
+
+    assert sorted(trace_db_session.queried_tables) == [
+        "base_fee",
+        "block_receipts",
+        "block_timestamps",
+        "block_traces",
+    ]
+    assert fetched_block_numbers == [101]
+
+    assert [block.block_number for block in blocks] == [100, 101, 102]
+    assert [block.block_timestamp for block in blocks] == [1000, 2101, 1002]
+    assert [block.base_fee_per_gas for block in blocks] == [10, 20, 12]
+    assert all(len(block.traces) == len(test_block.traces) for block in blocks)
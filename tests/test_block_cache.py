@@ -0,0 +1,106 @@
+import asyncio
+
+from mev_inspect import inspector
+from mev_inspect.block_cache import BlockCache
+from mev_inspect.inspector import MEVInspector
+from tests.utils import load_test_block
+
+
+def test_block_cache_round_trip(tmp_path):
+    block = load_test_block(12914944)
+    block_cache = BlockCache(tmp_path)
+
+    assert block.block_number not in block_cache
+    assert block_cache.get(block.block_number) is None
+
+    block_cache.put(block)
+
+    assert block.block_number in block_cache
+    assert block_cache.get(block.block_number) == block
+
+    # reopening reads the index from disk
+    block_cache.close()
+    assert BlockCache(tmp_path).get(block.block_number) == block
+
+
+def test_block_cache_skips_unchanged_blocks(tmp_path):
+    block = load_test_block(12914944)
+    block_cache = BlockCache(tmp_path)
+
+    block_cache.put(block)
+    size_bytes = block_cache.get_size_bytes()
+    block_cache.put(block)
+
+    assert block_cache.get_size_bytes() == size_bytes
+
+    changed_block = block.copy(update={"block_timestamp": 1})
+    block_cache.put(changed_block)
+
+    assert block_cache.get_size_bytes() > size_bytes
+    assert block_cache.get(block.block_number) == changed_block
+
+
+def test_block_cache_evicts_least_recently_used_segments(tmp_path):
+    block = load_test_block(12914944)
+    block_cache = BlockCache(tmp_path, max_size_bytes=1, segment_size_bytes=1)
+
+    first_block = block.copy(update={"block_number": 1})
+    second_block = block.copy(update={"block_number": 2})
+    third_block = block.copy(update={"block_number": 3})
+
+    block_cache.put(first_block)
+    block_cache.put(second_block)
+
+    # the segment being written to is kept
+    assert 1 not in block_cache
+    assert block_cache.get(2) == second_block
+
+    block_cache.put(third_block)
+
+    assert 2 not in block_cache
+    assert block_cache.get(3) == third_block
+
+
+def test_block_cache_drops_corrupt_blocks(tmp_path):
+    block = load_test_block(12914944)
+    block_cache = BlockCache(tmp_path)
+    block_cache.put(block)
+
+    for segment_path in tmp_path.glob("segment-*.bin"):
+        segment_path.write_bytes(b"corrupt")
+
+    assert block_cache.get(block.block_number) is None
+    assert block.block_number not in block_cache
+
+
+def test_prewarm_block_cache_limits_blocks_in_flight(tmp_path, monkeypatch):
+    fetched_ranges = []
+    in_flight_counts = []
+    in_flight = 0
+
+    async def fake_create_from_block_range(
+        w3, after_block_number, before_block_number, trace_db_session, block_cache
+    ):
+        nonlocal in_flight
+        in_flight += before_block_number - after_block_number
+        in_flight_counts.append(in_flight)
+        await asyncio.sleep(0)
+        in_flight -= before_block_number - after_block_number
+        fetched_ranges.append((after_block_number, before_block_number))
+
+    monkeypatch.setattr(
+        inspector, "create_from_block_range", fake_create_from_block_range
+    )
+
+    mev_inspector = MEVInspector(
+        "http://localhost:8545", max_concurrency=5, block_cache_dir=str(tmp_path)
+    )
+    asyncio.run(
+        mev_inspector.prewarm_block_cache(
+            trace_db_session=None, after_block=100, before_block=112
+        )
+    )
+    mev_inspector.close()
+
+    assert sorted(fetched_ranges) == [(100, 105), (105, 110), (110, 112)]
+    assert max(in_flight_counts) <= 5
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import tarfile
+import zipfile
+
+import cli
+import pytest
+from click.testing import CliRunner
+
+from mev_inspect.block_files import BlockFileSource
+from tests.utils import TEST_BLOCKS_DIRECTORY, load_test_block
+
+
+def test_block_file_source_reads_directory(tmp_path):
+    block = load_test_block(12914944)
+    (tmp_path / "dump").mkdir()
+    (tmp_path / "dump" / "12914944.json").write_text(block.json())
+
+    block_source = BlockFileSource(tmp_path)
+
+    assert 12914944 in block_source
+    assert block_source.load_block(12914944) == block
+
+    with pytest.raises(ValueError):
+        block_source.load_block(1)
+
+
+def test_block_file_source_requires_timestamps():
+    # the test blocks were dumped without timestamps
+    block_source = BlockFileSource(TEST_BLOCKS_DIRECTORY)
+
+    with pytest.raises(ValueError, match="block_timestamp"):
+        block_source.load_block(12914944)
+
+
+@pytest.mark.parametrize("archive_suffix", [".zip", ".tar"])
+def test_block_file_source_reads_archives(tmp_path, archive_suffix):
+    block = load_test_block(12914944)
+
+    block_path = tmp_path / "12914944.json"
+    block_path.write_text(block.json())
+
+    archive_path = tmp_path / f"blocks{archive_suffix}"
+    if archive_suffix == ".zip":
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.write(block_path, "dump/12914944.json")
+    else:
+        with tarfile.open(archive_path, "w") as archive:
+            archive.add(block_path, "dump/12914944.json")
+
+    block_source = BlockFileSource(archive_path)
+
+    assert block_source.get_block_numbers() == [12914944]
+    assert block_source.load_block(12914944) == block
+
+    block_source.close()
+
+
+def test_block_file_source_rejects_compressed_tar(tmp_path):
+    block_path = tmp_path / "12914944.json"
+    block_path.write_text(json.dumps({"block_number": 12914944}))
+
+    archive_path = tmp_path / "blocks.tar.gz"
+    with tarfile.open(archive_path, "w:gz") as archive:
+        archive.add(block_path, "dump/12914944.json")
+
+    with pytest.raises(ValueError, match="compressed"):
+        BlockFileSource(archive_path)
+
+
+def test_inspect_many_blocks_rejects_missing_block_files(tmp_path, monkeypatch):
+    block = load_test_block(12914944)
+    (tmp_path / "12914944.json").write_text(block.json())
+
+    def get_inspect_session():
+        raise AssertionError("Sessions are created after the files are checked")
+
+    monkeypatch.setattr(cli, "get_inspect_session", get_inspect_session)
+
+    # the command runs in the current event loop
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        result = CliRunner().invoke(
+            cli.cli,
+            [
+                "inspect-many-blocks-command",
+                "12914944",
+                "12914947",
+                "--from-dir",
+                tmp_path,
+            ],
+        )
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+    assert result.exit_code == 2
+    assert "missing 2 blocks: 12914945, 12914946" in result.output
@@ -0,0 +1,29 @@
+import asyncio
+import logging
+
+from mev_inspect.block_inspection import inspect_block_data
+from mev_inspect.classifier_pool import ClassifierPool
+from mev_inspect.classifiers.trace import TraceClassifier
+
+from .utils import load_test_block
+
+
+def test_classifier_pool_matches_in_process(trace_classifier: TraceClassifier):
+    block = load_test_block(12914944)
+    expected_inspection = inspect_block_data(trace_classifier, block)
+
+    with ClassifierPool(max_workers=2) as classifier_pool:
+        classifier_pool.warm_up()
+        inspection = asyncio.run(classifier_pool.inspect_block(block))
+
+    assert inspection == expected_inspection
+    assert len(inspection.swaps) == 51
+    assert len(inspection.arbitrages) == 2
+
+
+def test_classifier_pool_warm_up_starts_every_worker(caplog):
+    with ClassifierPool(max_workers=3) as classifier_pool:
+        with caplog.at_level(logging.INFO):
+            classifier_pool.warm_up()
+
+    assert "Started 3 classifier workers" in caplog.text
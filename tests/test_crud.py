@@ -0,0 +1,519 @@
+import re
+import struct
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from mev_inspect.block_inspection import inspect_block_data
+from mev_inspect.crud.block_prices import (
+    UPSERT_BLOCK_PRICES_FOR_BLOCK_RANGE_QUERY,
+    UPSERT_BLOCK_PRICES_FOR_TOKEN_QUERY,
+)
+from mev_inspect.crud.prices import write_prices
+from mev_inspect.crud.shared import (
+    BLOCK_PARTITION_SIZE,
+    get_changed_transaction_keys,
+    get_missing_partition_starts,
+    parse_partition_bound,
+)
+from mev_inspect.crud.summary import update_summary_for_block_range
+from mev_inspect.crud.traces import replace_classified_traces_for_blocks
+from mev_inspect.db import to_postgres_list
+from mev_inspect.inspect_block import write_block_inspections
+from mev_inspect.pg_binary import COPY_HEADER, COPY_TRAILER
+from mev_inspect.schemas.prices import ETH_TOKEN_ADDRESS, WETH_TOKEN_ADDRESS, Price
+
+from .utils import load_test_block
+
+# fields are separated by pipes that aren't escaped
+FIELD_SEPARATOR = re.compile(r"(?<!\\)\|")
+
+# tables written without a column list
+TABLE_COLUMN_COUNTS = {"blocks": 2}
+
+BINARY_COPY_STATEMENT = re.compile(
+    r"COPY (\w+) \(([\w, ]+)\) FROM STDIN WITH \(FORMAT binary\)"
+)
+
+
+class FakeCursor:
+    def __init__(self, copied_rows):
+        self.copied_rows = copied_rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def copy_from(self, file, table, sep, columns=None):
+        assert sep == "|"
+
+        for line in file.read().splitlines():
+            fields = FIELD_SEPARATOR.split(line)
+            expected_count = (
+                len(columns) if columns is not None else TABLE_COLUMN_COUNTS[table]
+            )
+            assert len(fields) == expected_count, (table, fields)
+            self.copied_rows[table].append(fields)
+
+    def copy_expert(self, sql, file):
+        match = BINARY_COPY_STATEMENT.fullmatch(sql)
+        assert match is not None, sql
+        table, columns = match.group(1), match.group(2).split(", ")
+
+        self.copied_rows[table].extend(read_binary_copy(file.read(), len(columns)))
+
+
+def read_binary_copy(data, column_count):
+    assert data.startswith(COPY_HEADER)
+    assert data.endswith(COPY_TRAILER)
+
+    rows = []
+    offset = len(COPY_HEADER)
+
+    while offset < len(data) - len(COPY_TRAILER):
+        (field_count,) = struct.unpack_from("!h", data, offset)
+        assert field_count == column_count
+        offset += 2
+
+        fields = []
+        for _ in range(field_count):
+            (length,) = struct.unpack_from("!i", data, offset)
+            offset += 4
+
+            if length == -1:
+                fields.append(None)
+            else:
+                fields.append(data[offset : offset + length])
+                offset += length
+
+        rows.append(fields)
+
+    assert offset == len(data) - len(COPY_TRAILER)
+    return rows
+
+
+class FakeQuery:
+    def __init__(self, session, model_class):
+        self.session = session
+        self.model_class = model_class
+
+    def filter(self, *args):
+        return self
+
+    def delete(self, **kwargs):
+        self.session.deleted_tables.append(self.model_class.__tablename__)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalar(self):
+        return self.rows[0][0] if len(self.rows) > 0 else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(
+        self,
+        fail_on_table=None,
+        partition_bounds=None,
+        returned_rows=(),
+        selected_rows=None,
+    ):
+        self.fail_on_table = fail_on_table
+        self.partition_bounds = partition_bounds
+        self.returned_rows = list(returned_rows)
+        # rows returned by selects, keyed by a part of their statement
+        self.selected_rows = selected_rows or {}
+        self.executed_params = []
+        self.copied_rows = defaultdict(list)
+        self.deleted_tables = []
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def query(self, model_class):
+        if model_class.__tablename__ == self.fail_on_table:
+            raise RuntimeError("Failed to delete")
+        return FakeQuery(self, model_class)
+
+    def execute(self, statement, params=None):
+        self.statements.append(statement)
+        self.executed_params.append(params)
+
+        if not isinstance(statement, str):
+            return FakeResult(self.returned_rows)
+        if "relkind" in statement:
+            return FakeResult([(self.partition_bounds is not None,)])
+        if "relpartbound" in statement:
+            return FakeResult([(bound,) for bound in self.partition_bounds or []])
+        for statement_part, rows in self.selected_rows.items():
+            if statement_part in statement:
+                return FakeResult(rows)
+        return FakeResult([])
+
+    def connection(self):
+        session = self
+
+        class Connection:
+            class connection:  # pylint: disable=invalid-name
+                @staticmethod
+                def cursor():
+                    return FakeCursor(session.copied_rows)
+
+        return Connection()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_write_block_inspections_commits_once(trace_classifier):
+    block = load_test_block(13370850)
+    block_inspection = inspect_block_data(trace_classifier, block)
+    session = FakeSession()
+
+    write_block_inspections(
+        session,
+        block.block_number,
+        block.block_number + 1,
+        [block],
+        [block_inspection],
+    )
+
+    assert session.commits == 1
+    assert session.rollbacks == 0
+    assert UPSERT_BLOCK_PRICES_FOR_BLOCK_RANGE_QUERY not in session.statements
+
+    assert len(session.copied_rows["swaps_staging"]) == len(block_inspection.swaps)
+    assert len(session.copied_rows["transfers_staging"]) == len(
+        block_inspection.transfers
+    )
+    assert len(session.copied_rows["arbitrages"]) == len(block_inspection.arbitrages)
+    assert len(session.copied_rows["arbitrage_swaps"]) == sum(
+        len(arbitrage.swaps) for arbitrage in block_inspection.arbitrages
+    )
+    assert len(session.copied_rows["sandwiches"]) == len(block_inspection.sandwiches)
+    assert len(session.copied_rows["liquidations"]) == len(
+        block_inspection.liquidations
+    )
+    assert len(session.copied_rows["nft_trades"]) == len(block_inspection.nft_trades)
+    assert len(session.copied_rows["miner_payments_staging"]) == len(
+        block_inspection.miner_payments
+    )
+    assert len(session.copied_rows["classified_traces_staging"]) == len(
+        block_inspection.classified_traces
+    )
+
+
+def test_write_block_inspections_rolls_back_on_failure(trace_classifier):
+    block = load_test_block(13370850)
+    block_inspection = inspect_block_data(trace_classifier, block)
+    session = FakeSession(fail_on_table="sandwiches")
+
+    with pytest.raises(RuntimeError):
+        write_block_inspections(
+            session,
+            block.block_number,
+            block.block_number + 1,
+            [block],
+            [block_inspection],
+        )
+
+    assert session.commits == 0
+    assert session.rollbacks == 1
+
+
+def test_replace_upserts_changed_rows_and_deletes_stale_ones(trace_classifier):
+    block = load_test_block(13370850)
+    block_inspection = inspect_block_data(trace_classifier, block)
+    session = FakeSession()
+
+    replace_classified_traces_for_blocks(
+        session,
+        block.block_number,
+        block.block_number + 1,
+        block_inspection.classified_traces,
+    )
+
+    assert session.deleted_tables == []
+    assert len(session.copied_rows["classified_traces_staging"]) == len(
+        block_inspection.classified_traces
+    )
+
+    upsert_statement = next(
+        statement for statement in session.statements if "ON CONFLICT" in statement
+    )
+    assert "(block_number, transaction_hash, trace_address)" in upsert_statement
+    assert (
+        "classified_traces.inputs::text IS DISTINCT FROM EXCLUDED.inputs::text"
+        in upsert_statement
+    )
+    assert "classified_at = EXCLUDED.classified_at" not in upsert_statement
+
+    assert any("NOT EXISTS" in statement for statement in session.statements)
+
+
+def test_write_block_inspections_only_rewrites_changed_summaries(trace_classifier):
+    block = load_test_block(13370850)
+    block_inspection = inspect_block_data(trace_classifier, block)
+    changed_arbitrage, *unchanged_arbitrages = block_inspection.arbitrages
+
+    session = FakeSession(
+        selected_rows=_get_stored_rows(
+            unchanged_arbitrages,
+            block_inspection.liquidations,
+            block_inspection.sandwiches,
+        ),
+    )
+
+    write_block_inspections(
+        session,
+        block.block_number,
+        block.block_number + 1,
+        [block],
+        [block_inspection],
+    )
+
+    assert len(session.copied_rows["arbitrages"]) == 1
+    assert len(session.copied_rows["liquidations"]) == 0
+
+    (summary_delete_params,) = [
+        params
+        for statement, params in zip(session.statements, session.executed_params)
+        if "DELETE FROM mev_summary" in statement
+    ]
+    assert summary_delete_params["block_numbers"] == [changed_arbitrage.block_number]
+    assert summary_delete_params["transaction_hashes"] == [
+        changed_arbitrage.transaction_hash
+    ]
+
+
+def test_write_block_inspections_rewrites_summaries_of_changed_sandwiches(
+    trace_classifier,
+):
+    block = load_test_block(13370850)
+    block_inspection = inspect_block_data(trace_classifier, block)
+    (sandwich,) = block_inspection.sandwiches
+
+    # only the sandwich is new
+    session = FakeSession(
+        selected_rows=_get_stored_rows(
+            block_inspection.arbitrages, block_inspection.liquidations, []
+        ),
+    )
+
+    write_block_inspections(
+        session,
+        block.block_number,
+        block.block_number + 1,
+        [block],
+        [block_inspection],
+    )
+
+    (summary_delete_params,) = [
+        params
+        for statement, params in zip(session.statements, session.executed_params)
+        if "DELETE FROM mev_summary" in statement
+    ]
+    assert sorted(summary_delete_params["transaction_hashes"]) == sorted(
+        [
+            sandwich.frontrun_swap.transaction_hash,
+            sandwich.backrun_swap.transaction_hash,
+        ]
+    )
+
+
+def _get_stored_rows(arbitrages, liquidations, sandwiches):
+    """Rows as selected back from the database by the writers"""
+    return {
+        "FROM arbitrages a": [
+            (
+                Decimal(arbitrage.block_number),
+                arbitrage.transaction_hash,
+                arbitrage.account_address,
+                arbitrage.profit_token_address,
+                Decimal(arbitrage.start_amount),
+                Decimal(arbitrage.end_amount),
+                Decimal(arbitrage.profit_amount),
+                arbitrage.error,
+                sorted({swap.protocol.value for swap in arbitrage.swaps}),
+                [to_postgres_list(swap.trace_address) for swap in arbitrage.swaps],
+            )
+            for arbitrage in arbitrages
+        ],
+        "FROM liquidations": [
+            (
+                Decimal(liquidation.block_number),
+                liquidation.transaction_hash,
+                to_postgres_list(liquidation.trace_address),
+                liquidation.liquidated_user,
+                liquidation.liquidator_user,
+                liquidation.debt_token_address,
+                Decimal(liquidation.debt_purchase_amount),
+                Decimal(liquidation.received_amount),
+                liquidation.received_token_address,
+                liquidation.protocol.value,
+                liquidation.error,
+            )
+            for liquidation in liquidations
+        ],
+        "FROM sandwiches": [
+            (
+                Decimal(sandwich.block_number),
+                sandwich.frontrun_swap.transaction_hash,
+                sandwich.backrun_swap.transaction_hash,
+            )
+            for sandwich in sandwiches
+        ],
+    }
+
+
+def test_get_changed_transaction_keys():
+    existing_rows = [
+        (1, "0xa", "x", Decimal(1)),
+        (1, "0xb", "y", Decimal(2)),
+        (2, "0xc", "z", Decimal(3)),
+        (2, "0xc", "z", Decimal(3)),
+    ]
+    new_rows = [
+        (1, "0xa", "x", 1),
+        (1, "0xb", "y", 3),
+        (2, "0xc", "z", 3),
+        (3, "0xd", "w", 4),
+    ]
+
+    assert get_changed_transaction_keys(existing_rows, new_rows) == {
+        (1, "0xb"),
+        (2, "0xc"),
+        (3, "0xd"),
+    }
+
+
+def test_replace_creates_missing_partitions(trace_classifier):
+    block = load_test_block(13370850)
+    block_inspection = inspect_block_data(trace_classifier, block)
+    session = FakeSession(
+        partition_bounds=["FOR VALUES FROM (MINVALUE) TO ('13300000')"],
+    )
+
+    replace_classified_traces_for_blocks(
+        session,
+        block.block_number,
+        block.block_number + 1,
+        block_inspection.classified_traces,
+    )
+
+    created_partitions = [
+        statement for statement in session.statements if "PARTITION OF" in statement
+    ]
+    assert len(created_partitions) == 1
+    assert "classified_traces_13300000" in created_partitions[0]
+
+
+def test_parse_partition_bound():
+    assert parse_partition_bound("FOR VALUES FROM (MINVALUE) TO ('13300000')") == (
+        None,
+        13300000,
+    )
+    assert parse_partition_bound("FOR VALUES FROM ('100') TO (200)") == (100, 200)
+
+    with pytest.raises(ValueError):
+        parse_partition_bound("FOR VALUES IN (1)")
+
+
+def test_get_missing_partition_starts():
+    first_start = 10 * BLOCK_PARTITION_SIZE
+    partition_ranges = [
+        (None, first_start),
+        (first_start, first_start + BLOCK_PARTITION_SIZE),
+    ]
+
+    assert get_missing_partition_starts(partition_ranges, 5, 6) == []
+    assert (
+        get_missing_partition_starts(partition_ranges, first_start + 5, first_start + 6)
+        == []
+    )
+    assert get_missing_partition_starts(
+        partition_ranges,
+        first_start + BLOCK_PARTITION_SIZE - 1,
+        first_start + 2 * BLOCK_PARTITION_SIZE + 1,
+    ) == [
+        first_start + BLOCK_PARTITION_SIZE,
+        first_start + 2 * BLOCK_PARTITION_SIZE,
+    ]
+
+
+def test_write_prices_updates_block_prices_from_earliest_new_price():
+    first_timestamp = datetime(2021, 10, 1)
+    second_timestamp = datetime(2021, 10, 2)
+    prices = [
+        Price(token_address=token_address, usd_price=1.0, timestamp=timestamp)
+        for token_address in [ETH_TOKEN_ADDRESS, WETH_TOKEN_ADDRESS]
+        for timestamp in [first_timestamp, second_timestamp]
+    ]
+
+    # the first ETH price already existed
+    session = FakeSession(
+        returned_rows=[
+            (ETH_TOKEN_ADDRESS, second_timestamp),
+            (WETH_TOKEN_ADDRESS.lower(), second_timestamp),
+            (WETH_TOKEN_ADDRESS.lower(), first_timestamp),
+        ]
+    )
+
+    write_prices(session, prices)
+
+    block_price_params = [
+        params
+        for statement, params in zip(session.statements, session.executed_params)
+        if statement == UPSERT_BLOCK_PRICES_FOR_TOKEN_QUERY
+    ]
+    assert block_price_params == [
+        {"token_address": ETH_TOKEN_ADDRESS, "after_timestamp": second_timestamp},
+        {
+            "token_address": WETH_TOKEN_ADDRESS.lower(),
+            "after_timestamp": first_timestamp,
+        },
+    ]
+    assert session.commits == 1
+
+
+def test_update_summary_prices_blocks_before_inserting():
+    session = FakeSession()
+
+    update_summary_for_block_range(session, 100, 200)
+
+    assert session.statements[0] == UPSERT_BLOCK_PRICES_FOR_BLOCK_RANGE_QUERY
+    assert session.executed_params[0] == {
+        "after_block_number": 100,
+        "before_block_number": 200,
+    }
+    assert any(
+        "INSERT INTO mev_summary" in statement for statement in session.statements[1:]
+    )
+
+
+def test_write_prices_commits_each_chunk():
+    prices = (
+        Price(token_address=ETH_TOKEN_ADDRESS, usd_price=1.0, timestamp=timestamp)
+        for timestamp in [datetime(2021, 10, day) for day in range(1, 6)]
+    )
+    session = FakeSession()
+
+    write_prices(session, prices, chunk_size=2)
+
+    inserts = [
+        statement for statement in session.statements if not isinstance(statement, str)
+    ]
+    assert len(inserts) == 3
+    assert session.commits == 3
@@ -67,3 +67,41 @@ def test_decode_function_with_tuple_argument():
     assert call_data.function_name == test_function_name
     assert call_data.function_signature == "testFunction((uint256))"
     assert call_data.inputs == {test_tuple_name: (1,)}
+
+
+def test_decode_cache_hits_and_evicts():
+    test_abi = pydantic.parse_obj_as(
+        abi.ABI,
+        [
+            {
+                "name": "testFunction",
+                "type": "function",
+                "inputs": [{"name": "testParameter", "type": "uint256"}],
+            }
+        ],
+    )
+    test_function_selector = "350c530b"
+    first_call = "0x" + test_function_selector + f"{1:064x}"
+    second_call = "0x" + test_function_selector + f"{2:064x}"
+
+    abi_decoder = decode.ABIDecoder(test_abi, cache_size=1)
+
+    assert abi_decoder.decode(first_call).inputs == {"testParameter": 1}
+    assert abi_decoder.decode(first_call).inputs == {"testParameter": 1}
+    assert abi_decoder.decode(second_call).inputs == {"testParameter": 2}
+    assert abi_decoder.decode(first_call).inputs == {"testParameter": 1}
+
+    assert abi_decoder.get_cache_stats() == decode.DecodeCacheStats(
+        hits=1,
+        misses=3,
+        size=1,
+        max_size=1,
+    )
+
+
+def test_decode_unknown_selector_skips_cache():
+    test_abi = pydantic.parse_obj_as(abi.ABI, [])
+    abi_decoder = decode.ABIDecoder(test_abi, cache_size=10)
+
+    assert abi_decoder.decode("0x12345678") is None
+    assert abi_decoder.get_cache_stats().misses == 0
@@ -0,0 +1,88 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from mev_inspect.http_session import SharedHTTPSession
+from mev_inspect.provider import PooledAsyncHTTPProvider
+from mev_inspect.queue import tasks
+from mev_inspect.queue.middleware import InspectorMiddleware
+
+
+async def _handle_rpc(request):
+    rpc_request = await request.json()
+    body = json.dumps(
+        {"jsonrpc": "2.0", "id": rpc_request["id"], "result": rpc_request["params"]}
+    ).encode()
+
+    return web.Response(
+        body=gzip.compress(body),
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+    )
+
+
+def test_pooled_provider_reuses_connections():
+    http_session = SharedHTTPSession(connection_limit_per_host=1)
+
+    async def make_requests():
+        app = web.Application()
+        app.router.add_post("/", _handle_rpc)
+
+        async with TestServer(app) as server:
+            provider = PooledAsyncHTTPProvider(
+                str(server.make_url("/")), http_session=http_session
+            )
+            responses = [
+                await provider.make_request("eth_getBlockByNumber", [index])
+                for index in range(3)
+            ]
+            await http_session.close()
+
+        return responses
+
+    responses = asyncio.run(make_requests())
+
+    assert [response["result"] for response in responses] == [[0], [1], [2]]
+
+    stats = http_session.get_stats()
+    assert stats.requests == 3
+    assert stats.connections_created == 1
+    assert stats.connections_reused == 2
+
+
+def test_shared_session_is_created_per_event_loop():
+    http_session = SharedHTTPSession()
+
+    async def get_session():
+        session = http_session.get_session()
+        await http_session.close()
+        return session
+
+    first_session = asyncio.run(get_session())
+    second_session = asyncio.run(get_session())
+
+    assert first_session is not second_session
+
+
+def test_inspect_many_blocks_task_closes_http_session(monkeypatch):
+    http_session = SharedHTTPSession()
+    sessions = []
+
+    class FailingInspector:
+        async def inspect_many_blocks(self, **_kwargs):
+            sessions.append(http_session.get_session())
+            raise RuntimeError("Failed to inspect")
+
+    monkeypatch.setattr(tasks, "get_shared_http_session", lambda: http_session)
+    monkeypatch.setattr(
+        InspectorMiddleware, "get_inspector", staticmethod(FailingInspector)
+    )
+
+    with pytest.raises(RuntimeError):
+        tasks.inspect_many_blocks_task(1, 2)
+
+    (session,) = sessions
+    assert session.closed
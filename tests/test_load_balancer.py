@@ -0,0 +1,116 @@
+import asyncio
+import random
+
+import pytest
+
+from mev_inspect.load_balancer import LoadBalancingAsyncProvider
+from mev_inspect.provider import get_base_provider
+
+
+class FakeEndpointProvider:
+    def __init__(self, endpoint_uri, delay_seconds=0.0, error=None):
+        self.endpoint_uri = endpoint_uri
+        self.delay_seconds = delay_seconds
+        self.error = error
+        self.methods = []
+
+    async def make_request(self, method, params):
+        self.methods.append(method)
+        await asyncio.sleep(self.delay_seconds)
+
+        if self.error is not None:
+            raise self.error
+
+        return {"jsonrpc": "2.0", "id": 1, "result": self.endpoint_uri}
+
+
+def test_load_balancer_prefers_faster_endpoints():
+    fast_provider = FakeEndpointProvider("fast", delay_seconds=0.001)
+    slow_provider = FakeEndpointProvider("slow", delay_seconds=0.02)
+    provider = LoadBalancingAsyncProvider(
+        [fast_provider, slow_provider], random_generator=random.Random(0)
+    )
+
+    async def make_requests():
+        for _ in range(60):
+            await provider.make_request("trace_block", [1])
+
+    asyncio.run(make_requests())
+
+    assert len(fast_provider.methods) > 2 * len(slow_provider.methods)
+
+
+def test_load_balancer_ejects_failing_endpoints():
+    failing_provider = FakeEndpointProvider("failing", error=ConnectionError())
+    healthy_provider = FakeEndpointProvider("healthy")
+    provider = LoadBalancingAsyncProvider(
+        [failing_provider, healthy_provider],
+        max_consecutive_failures=2,
+        random_generator=random.Random(0),
+    )
+
+    async def make_requests():
+        responses = []
+        for _ in range(20):
+            try:
+                responses.append(await provider.make_request("trace_block", [1]))
+            except ConnectionError:
+                pass
+        return responses
+
+    responses = asyncio.run(make_requests())
+
+    failing_health, healthy_health = provider.get_endpoint_healths()
+    assert failing_health.requests == 2
+    assert failing_health.ejections == 1
+    assert len(responses) == 18
+    assert healthy_health.requests == 18
+
+
+def test_load_balancer_hedges_slow_requests():
+    slow_provider = FakeEndpointProvider("slow", delay_seconds=10)
+    fast_provider = FakeEndpointProvider("fast")
+    provider = LoadBalancingAsyncProvider(
+        [slow_provider, fast_provider], hedge_after_seconds=0.01
+    )
+
+    # the slow endpoint is picked first
+    slow_health, fast_health = provider.get_endpoint_healths()
+    slow_health.latency_seconds = 0.001
+    fast_health.latency_seconds = 1000
+
+    response = asyncio.run(
+        asyncio.wait_for(provider.make_request("trace_block", [1]), timeout=1)
+    )
+
+    assert response["result"] == "fast"
+    assert slow_health.requests == 1
+    assert fast_health.hedged_requests == 1
+
+
+def test_load_balancer_does_not_hedge_unsafe_methods():
+    slow_provider = FakeEndpointProvider("slow", delay_seconds=0.05)
+    fast_provider = FakeEndpointProvider("fast")
+    provider = LoadBalancingAsyncProvider(
+        [slow_provider, fast_provider], hedge_after_seconds=0.01
+    )
+    slow_health, fast_health = provider.get_endpoint_healths()
+    slow_health.latency_seconds = 0.001
+    fast_health.latency_seconds = 1000
+
+    response = asyncio.run(provider.make_request("eth_sendTransaction", [{}]))
+
+    assert response["result"] == "slow"
+    assert fast_provider.methods == []
+
+
+@pytest.mark.parametrize(
+    "rpc,expected_load_balanced",
+    [("http://a:8545", False), ("http://a:8545, http://b:8545", True)],
+)
+def test_get_base_provider_load_balances_endpoint_lists(rpc, expected_load_balanced):
+    base_provider = get_base_provider(rpc)
+
+    assert (
+        isinstance(base_provider, LoadBalancingAsyncProvider) == expected_load_balanced
+    )
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from mev_inspect.block_inspection import inspect_block_data
+from mev_inspect.mev_summary import get_mev_summaries
+from mev_inspect.price_oracle import PriceOracle
+from mev_inspect.schemas.mev_summary import MevType
+from mev_inspect.schemas.prices import ETH_TOKEN_ADDRESS, WETH_TOKEN_ADDRESS
+
+from .utils import load_test_block
+
+CRETH_TOKEN_ADDRESS = "0x2db6c82ce72c8d7d770ba1b5f5ed0b6e075066d6"
+
+
+def test_price_oracle_returns_latest_price_as_of_time():
+    day = datetime(2021, 10, 1)
+    price_oracle = PriceOracle(
+        [
+            (ETH_TOKEN_ADDRESS, day + timedelta(days=1), Decimal(3100)),
+            (ETH_TOKEN_ADDRESS, day, Decimal(3000)),
+        ],
+        {ETH_TOKEN_ADDRESS: 18},
+    )
+
+    assert price_oracle.get_usd_price(ETH_TOKEN_ADDRESS, day - timedelta(1)) is None
+    assert price_oracle.get_usd_price(ETH_TOKEN_ADDRESS, day) == 3000
+    assert price_oracle.get_usd_price(ETH_TOKEN_ADDRESS, day + timedelta(0.5)) == 3000
+    assert price_oracle.get_usd_price(ETH_TOKEN_ADDRESS, day + timedelta(2)) == 3100
+    assert price_oracle.get_usd_price(WETH_TOKEN_ADDRESS, day) is None
+
+    assert price_oracle.get_usd_value(ETH_TOKEN_ADDRESS, 5 * 10**17, day) == 1500
+
+
+def test_get_mev_summaries(trace_classifier):
+    block = load_test_block(13404932)
+    block_inspection = inspect_block_data(trace_classifier, block)
+    block_timestamp = datetime.fromtimestamp(block.block_timestamp)
+
+    weth_token_address = WETH_TOKEN_ADDRESS.lower()
+    price_oracle = PriceOracle(
+        [
+            (ETH_TOKEN_ADDRESS, block_timestamp - timedelta(days=1), Decimal(3500)),
+            (weth_token_address, block_timestamp - timedelta(days=1), Decimal(3500)),
+            (weth_token_address, block_timestamp + timedelta(days=1), Decimal(1)),
+            (CRETH_TOKEN_ADDRESS, block_timestamp, Decimal(70)),
+        ],
+        {
+            ETH_TOKEN_ADDRESS: 18,
+            weth_token_address: 18,
+            CRETH_TOKEN_ADDRESS: 8,
+        },
+    )
+
+    mev_summaries = get_mev_summaries(price_oracle, [block], [block_inspection])
+
+    # the other two arbitrages are the front and back of a sandwich
+    arbitrage_summaries = [
+        mev_summary
+        for mev_summary in mev_summaries
+        if mev_summary.type == MevType.arbitrage
+    ]
+    assert [mev_summary.transaction_hash for mev_summary in arbitrage_summaries] == [
+        "0x0838b27697f717b861630470888ef0abf2b15a6a6b8bce6789f7d13dc56cb923",
+        "0x1abcaf29e25654d5fb1c8afa962d6880e0a9325b1f9829b799a3b681b12ce131",
+    ]
+    assert arbitrage_summaries[0].gross_profit_usd == (
+        Decimal(10423532709333084) * 3500 / Decimal(10**18)
+    )
+    assert arbitrage_summaries[0].block_timestamp == block_timestamp
+
+    miner_payment = next(
+        miner_payment
+        for miner_payment in block_inspection.miner_payments
+        if miner_payment.transaction_hash == arbitrage_summaries[0].transaction_hash
+    )
+    assert arbitrage_summaries[0].miner_payment_usd == (
+        Decimal(
+            miner_payment.gas_used * miner_payment.gas_price
+            + miner_payment.coinbase_transfer
+        )
+        / Decimal(10**18)
+        * 3500
+    )
+
+    (liquidation_summary,) = [
+        mev_summary
+        for mev_summary in mev_summaries
+        if mev_summary.type == MevType.liquidation
+    ]
+    assert liquidation_summary.protocol == "cream"
+    assert liquidation_summary.protocols == ["cream"]
+    assert liquidation_summary.gross_profit_usd == (
+        Decimal(417926832636968) * 70 / Decimal(10**8)
+        - Decimal(1002704779407853614) * 3500 / Decimal(10**18)
+    )
+
+
+def test_get_mev_summaries_skips_unknown_tokens(trace_classifier):
+    block = load_test_block(13404932)
+    block_inspection = inspect_block_data(trace_classifier, block)
+
+    mev_summaries = get_mev_summaries(PriceOracle([], {}), [block], [block_inspection])
+
+    assert mev_summaries == []
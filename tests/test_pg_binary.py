@@ -0,0 +1,115 @@
+import json
+import struct
+from datetime import datetime, timezone
+
+import pytest
+
+from mev_inspect.crud.traces import CLASSIFIED_TRACE_COLUMNS
+from mev_inspect.pg_binary import (
+    COPY_HEADER,
+    COPY_TRAILER,
+    INT4_OID,
+    encode_int_array,
+    encode_numeric,
+    encode_timestamp,
+    iter_copy_data,
+)
+
+from .utils import load_test_block
+
+
+def decode_numeric(data):
+    ndigits, weight, sign, dscale = struct.unpack_from("!hhHh", data)
+    digits = struct.unpack_from(f"!{ndigits}H", data, 8)
+
+    assert dscale == 0
+    assert len(data) == 8 + 2 * ndigits
+
+    value = 0
+    for index, digit in enumerate(digits):
+        value += digit * 10000 ** (weight - index)
+
+    return -value if sign == 0x4000 else value
+
+
+def decode_int_array(data):
+    ndim, has_null, element_oid = struct.unpack_from("!iiI", data)
+    assert has_null == 0
+    assert element_oid == INT4_OID
+
+    if ndim == 0:
+        return []
+
+    size, lower_bound = struct.unpack_from("!ii", data, 12)
+    assert ndim == 1
+    assert lower_bound == 1
+
+    fields = struct.unpack_from(f"!{2 * size}i", data, 20)
+    assert fields[::2] == (4,) * size
+    return list(fields[1::2])
+
+
+@pytest.mark.parametrize(
+    "value",
+    [0, 1, 9999, 10000, 10001, 123456789, 10**18, 2**256 - 1, -1, -(10**20)],
+)
+def test_encode_numeric(value):
+    assert decode_numeric(encode_numeric(value)) == value
+
+
+def test_encode_numeric_drops_trailing_zero_digits():
+    ndigits, weight, _, _ = struct.unpack_from("!hhHh", encode_numeric(10**20))
+
+    assert ndigits == 1
+    assert weight == 5
+
+
+@pytest.mark.parametrize("values", [[], [0], [1, 0, 2], [2**31 - 1]])
+def test_encode_int_array(values):
+    assert decode_int_array(encode_int_array(values)) == values
+
+
+def test_encode_timestamp():
+    utc_value = datetime(2021, 10, 9, 12, 30, 15, 250, tzinfo=timezone.utc)
+    (microseconds,) = struct.unpack("!q", encode_timestamp(utc_value))
+
+    assert microseconds == (
+        (datetime(2021, 10, 9, 12, 30, 15, 250) - datetime(2000, 1, 1)).days
+        * 86400
+        * 10**6
+        + (12 * 3600 + 30 * 60 + 15) * 10**6
+        + 250
+    )
+
+
+def test_iter_copy_data():
+    data = b"".join(
+        iter_copy_data(
+            [encode_numeric, encode_int_array],
+            [(1, [0, 1]), (None, [])],
+        )
+    )
+
+    assert data.startswith(COPY_HEADER)
+    assert data.endswith(COPY_TRAILER)
+
+    first_row = data[len(COPY_HEADER) :]
+    assert struct.unpack_from("!h", first_row) == (2,)
+
+
+def test_iter_copy_data_requires_every_column():
+    with pytest.raises(ValueError):
+        list(iter_copy_data([encode_numeric, encode_numeric], [(1,)]))
+
+
+def test_classified_trace_inputs_match_pydantic_json(trace_classifier):
+    block = load_test_block(13370850)
+    classified_traces = trace_classifier.classify(block.traces)
+    encode_inputs = dict(CLASSIFIED_TRACE_COLUMNS)["inputs"]
+
+    for trace in classified_traces:
+        pydantic_inputs = json.dumps(
+            json.loads(trace.json(include={"inputs"}))["inputs"]
+        )
+
+        assert encode_inputs([trace.inputs]) == f"[{pydantic_inputs}]".encode()
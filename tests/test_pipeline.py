@@ -0,0 +1,114 @@
+import asyncio
+
+from mev_inspect import pipeline
+from mev_inspect.block_files import BlockFileSource
+from mev_inspect.classifiers.trace import TraceClassifier
+from mev_inspect.pipeline import _get_batch_range, inspect_many_blocks_pipelined
+from tests.utils import load_test_block
+
+
+def test_get_batch_range():
+    assert _get_batch_range(100, 100, 125, 10) == (100, 110)
+    assert _get_batch_range(109, 100, 125, 10) == (100, 110)
+    assert _get_batch_range(110, 100, 125, 10) == (110, 120)
+    assert _get_batch_range(124, 100, 125, 10) == (120, 125)
+
+
+def test_pipeline_writes_every_batch_in_order(monkeypatch):
+    test_block = load_test_block(12914944)
+    written_batches = []
+
+    async def fake_create_from_block_number(
+        w3, block_number, trace_db_session, trace_db_blocks=None, block_cache=None
+    ):
+        await asyncio.sleep(0)
+        return test_block.copy(update={"block_number": block_number})
+
+    def fake_write_block_inspections(
+        inspect_db_session,
+        after_block_number,
+        before_block_number,
+        blocks,
+        block_inspections,
+        should_write_classified_traces,
+    ):
+        written_batches.append(
+            (
+                after_block_number,
+                before_block_number,
+                [block.block_number for block in blocks],
+                [len(inspection.swaps) for inspection in block_inspections],
+            )
+        )
+
+    monkeypatch.setattr(
+        pipeline, "create_from_block_number", fake_create_from_block_number
+    )
+    monkeypatch.setattr(
+        pipeline, "write_block_inspections", fake_write_block_inspections
+    )
+
+    asyncio.run(
+        inspect_many_blocks_pipelined(
+            None,
+            None,
+            TraceClassifier(),
+            after_block_number=100,
+            before_block_number=105,
+            trace_db_session=None,
+            block_batch_size=2,
+            fetch_concurrency=3,
+            queue_size=1,
+        )
+    )
+
+    assert sorted(written_batches) == [
+        (100, 102, [100, 101], [51, 51]),
+        (102, 104, [102, 103], [51, 51]),
+        (104, 105, [104], [51]),
+    ]
+
+
+def test_pipeline_reads_blocks_from_files(tmp_path, monkeypatch):
+    test_block = load_test_block(12914944)
+    for block_number in range(100, 103):
+        block_path = tmp_path / f"{block_number}.json"
+        block_path.write_text(
+            test_block.copy(update={"block_number": block_number}).json()
+        )
+
+    written_block_numbers = []
+
+    async def fail_create_from_block_number(*args, **kwargs):
+        raise AssertionError("Blocks should come from files")
+
+    def fake_write_block_inspections(
+        inspect_db_session,
+        after_block_number,
+        before_block_number,
+        blocks,
+        block_inspections,
+        should_write_classified_traces,
+    ):
+        written_block_numbers.extend(block.block_number for block in blocks)
+
+    monkeypatch.setattr(
+        pipeline, "create_from_block_number", fail_create_from_block_number
+    )
+    monkeypatch.setattr(
+        pipeline, "write_block_inspections", fake_write_block_inspections
+    )
+
+    asyncio.run(
+        inspect_many_blocks_pipelined(
+            None,
+            None,
+            TraceClassifier(),
+            after_block_number=100,
+            before_block_number=103,
+            trace_db_session=None,
+            block_source=BlockFileSource(tmp_path),
+        )
+    )
+
+    assert written_block_numbers == [100, 101, 102]
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from mev_inspect.prices import PriceCache, TokenBucket, fetch_prices_range
+from mev_inspect.schemas.prices import ETH_TOKEN_ADDRESS, TOKEN_ADDRESSES
+
+AFTER = datetime(2021, 10, 1)
+BEFORE = datetime(2021, 10, 3)
+
+
+class StubPriceSource:
+    def __init__(self, fail_on_token=None):
+        self.fail_on_token = fail_on_token
+        self.requested_tokens = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_time_series(self, token_address, after, before):
+        self.requested_tokens.append(token_address)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            await asyncio.sleep(0.01)
+
+            if token_address == self.fail_on_token:
+                raise RuntimeError("Failed to fetch prices")
+
+            return [
+                (int(after.timestamp() * 1000), 1.0),
+                (int(before.timestamp() * 1000), 2.0),
+            ]
+        finally:
+            self.in_flight -= 1
+
+
+def _fetch_all(price_source, **kwargs):
+    async def fetch():
+        return [
+            prices
+            async for prices in fetch_prices_range(
+                AFTER,
+                BEFORE,
+                price_source=price_source,
+                rate_limiter=TokenBucket(1000, len(TOKEN_ADDRESSES)),
+                **kwargs,
+            )
+        ]
+
+    return asyncio.run(fetch())
+
+
+def test_fetch_prices_range_fetches_every_token_concurrently():
+    price_source = StubPriceSource()
+
+    token_prices = _fetch_all(price_source, max_concurrency=3)
+
+    assert sorted(prices[0].token_address for prices in token_prices) == sorted(
+        token_address.lower() for token_address in TOKEN_ADDRESSES
+    )
+    assert all(
+        [price.usd_price for price in prices] == [1.0, 2.0] for prices in token_prices
+    )
+    assert price_source.max_in_flight == 3
+
+
+def test_fetch_prices_range_raises_failed_fetches():
+    with pytest.raises(RuntimeError):
+        _fetch_all(StubPriceSource(fail_on_token=ETH_TOKEN_ADDRESS))
+
+
+def test_fetch_prices_range_resumes_from_cache(tmp_path):
+    price_cache = PriceCache(tmp_path)
+
+    last_token_address = TOKEN_ADDRESSES[-1]
+
+    with pytest.raises(RuntimeError):
+        _fetch_all(
+            StubPriceSource(fail_on_token=last_token_address),
+            price_cache=price_cache,
+            max_concurrency=1,
+        )
+
+    price_source = StubPriceSource()
+    token_prices = _fetch_all(price_source, price_cache=price_cache)
+
+    assert len(token_prices) == len(TOKEN_ADDRESSES)
+    assert price_source.requested_tokens == [last_token_address]
+
+
+def test_price_cache_drops_corrupt_files(tmp_path):
+    price_cache = PriceCache(tmp_path)
+    price_cache.put(ETH_TOKEN_ADDRESS, AFTER, BEFORE, [(1000, 1.0)])
+
+    assert price_cache.get(ETH_TOKEN_ADDRESS, AFTER, BEFORE) == [(1000, 1.0)]
+
+    (cached_path,) = tmp_path.iterdir()
+    cached_path.write_text("[[1000,")
+
+    assert price_cache.get(ETH_TOKEN_ADDRESS, AFTER, BEFORE) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_token_bucket_limits_rate_after_burst():
+    rate_limiter = TokenBucket(rate_per_second=20, capacity=2)
+
+    async def acquire_all():
+        started_at = time.monotonic()
+        for _ in range(4):
+            await rate_limiter.acquire()
+        return time.monotonic() - started_at
+
+    elapsed_seconds = asyncio.run(acquire_all())
+
+    # the first two are the burst, the next two wait 50ms each
+    assert 0.09 <= elapsed_seconds < 0.5
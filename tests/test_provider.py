@@ -0,0 +1,82 @@
+import asyncio
+
+from mev_inspect.provider import BatchingAsyncHTTPProvider
+
+
+def test_batching_provider_batches_and_demultiplexes(monkeypatch):
+    provider = BatchingAsyncHTTPProvider(
+        "http://localhost:8545", batch_size=3, batch_wait_seconds=0
+    )
+    sent_batches = []
+
+    async def fake_post_batch(rpc_requests):
+        sent_batches.append([rpc_request["method"] for rpc_request in rpc_requests])
+        return [
+            {"jsonrpc": "2.0", "id": rpc_request["id"], "result": rpc_request["params"]}
+            for rpc_request in reversed(rpc_requests)
+        ]
+
+    monkeypatch.setattr(provider, "_post_batch", fake_post_batch)
+
+    async def make_requests():
+        return await asyncio.gather(
+            *[provider.make_request(f"method_{index}", [index]) for index in range(7)]
+        )
+
+    responses = asyncio.run(make_requests())
+
+    assert [response["result"] for response in responses] == [
+        [index] for index in range(7)
+    ]
+    assert sent_batches == [
+        ["method_0", "method_1", "method_2"],
+        ["method_3", "method_4", "method_5"],
+        ["method_6"],
+    ]
+
+
+def test_batching_provider_fails_requests_missing_from_batch(monkeypatch):
+    provider = BatchingAsyncHTTPProvider(
+        "http://localhost:8545", batch_size=2, batch_wait_seconds=0
+    )
+
+    async def fake_post_batch(rpc_requests):
+        first_request = rpc_requests[0]
+        return [{"jsonrpc": "2.0", "id": first_request["id"], "result": "0x1"}]
+
+    monkeypatch.setattr(provider, "_post_batch", fake_post_batch)
+
+    async def make_requests():
+        return await asyncio.gather(
+            provider.make_request("eth_blockNumber", []),
+            provider.make_request("eth_chainId", []),
+            return_exceptions=True,
+        )
+
+    first_response, second_response = asyncio.run(make_requests())
+
+    assert first_response["result"] == "0x1"
+    assert isinstance(second_response, ValueError)
+
+
+def test_batching_provider_fails_requests_with_batch_error(monkeypatch):
+    provider = BatchingAsyncHTTPProvider(
+        "http://localhost:8545", batch_size=2, batch_wait_seconds=0
+    )
+    batch_error = {"code": -32600, "message": "batch size too large"}
+
+    async def fake_post_batch(rpc_requests):
+        return [{"jsonrpc": "2.0", "id": None, "error": batch_error}]
+
+    monkeypatch.setattr(provider, "_post_batch", fake_post_batch)
+
+    async def make_requests():
+        return await asyncio.gather(
+            provider.make_request("eth_blockNumber", []),
+            provider.make_request("eth_chainId", []),
+            return_exceptions=True,
+        )
+
+    for response in asyncio.run(make_requests()):
+        assert isinstance(response, ValueError)
+        assert response.args == (batch_error,)
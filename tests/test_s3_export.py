@@ -0,0 +1,135 @@
+import json
+import re
+import threading
+
+import pytest
+
+from mev_inspect.s3_export import (
+    EXPORT_BUCKET_NAME_ENV,
+    export_block_range,
+    supported_tables,
+)
+
+BUCKET_NAME = "test-bucket"
+
+EXPORT_TABLE = re.compile(r"FROM (\w+)")
+
+
+class LocalS3Client:
+    """In-memory stand-in for the S3 calls the exporter makes"""
+
+    # pylint: disable=invalid-name
+
+    def __init__(self, objects=None, max_keys=2):
+        self.objects = dict(objects or {})
+        self.max_keys = max_keys
+        self.list_calls = 0
+        self.put_calls = 0
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body):
+        assert Bucket == BUCKET_NAME
+
+        with self._lock:
+            self.put_calls += 1
+            self.objects[Key] = Body
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        assert Bucket == BUCKET_NAME
+        self.list_calls += 1
+
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start : start + self.max_keys]
+        is_truncated = start + self.max_keys < len(keys)
+
+        response = {
+            "Contents": [{"Key": key, "Size": len(self.objects[key])} for key in page],
+            "IsTruncated": is_truncated,
+        }
+        if is_truncated:
+            response["NextContinuationToken"] = str(start + self.max_keys)
+
+        return response
+
+    def delete_objects(self, Bucket, Delete):
+        assert Bucket == BUCKET_NAME
+
+        for obj in Delete["Objects"]:
+            self.objects.pop(obj["Key"], None)
+
+
+class FakeExportSession:
+    def __init__(self, rows_by_table):
+        self.rows_by_table = rows_by_table
+        self.statements = []
+
+    def execute(self, statement, params, execution_options):
+        assert execution_options == {"stream_results": True}
+        self.statements.append(statement)
+
+        table = EXPORT_TABLE.search(statement).group(1)
+        return iter(
+            (block_number, row)
+            for block_number, row in self.rows_by_table.get(table, [])
+            if params["after_block_number"]
+            <= block_number
+            < params["before_block_number"]
+        )
+
+
+@pytest.fixture(autouse=True)
+def export_bucket_name(monkeypatch):
+    monkeypatch.setenv(EXPORT_BUCKET_NAME_ENV, BUCKET_NAME)
+
+
+def test_export_block_range_uses_one_query_per_table():
+    session = FakeExportSession(
+        {
+            "arbitrages": [
+                (100, {"transaction_hash": "0xa"}),
+                (100, {"transaction_hash": "0xb"}),
+                (102, {"transaction_hash": "0xc"}),
+            ],
+            "blocks": [(block_number, {}) for block_number in range(100, 103)],
+        }
+    )
+    client = LocalS3Client()
+
+    export_block_range(session, 100, 103, client=client, upload_concurrency=2)
+
+    assert len(session.statements) == len(supported_tables)
+    assert client.objects["arbitrages/flashbots_100.json"] == (
+        f'{json.dumps({"transaction_hash": "0xa"})}\n'
+        f'{json.dumps({"transaction_hash": "0xb"})}\n'
+    ).encode("utf-8")
+    assert "arbitrages/flashbots_101.json" not in client.objects
+    assert "arbitrages/flashbots_102.json" in client.objects
+    assert sorted(key for key in client.objects if key.startswith("blocks/")) == [
+        "blocks/flashbots_100.json",
+        "blocks/flashbots_101.json",
+        "blocks/flashbots_102.json",
+    ]
+    assert client.put_calls == 5
+
+
+def test_export_block_range_clears_blocks_without_data():
+    client = LocalS3Client(
+        {
+            "liquidations/flashbots_100.json": b"{}\n",
+            "liquidations/flashbots_101.json": b"",
+            "liquidations/flashbots_102.json": b"{}\n",
+            "liquidations/flashbots_103.json": b"{}\n",
+            "liquidations/flashbots_1010.json": b"{}\n",
+        }
+    )
+    session = FakeExportSession({"liquidations": [(102, {"trace_address": [0]})]})
+
+    export_block_range(session, 100, 103, client=client)
+
+    assert client.objects == {
+        "liquidations/flashbots_100.json": b"",
+        "liquidations/flashbots_102.json": b'{"trace_address": [0]}\n',
+        "liquidations/flashbots_103.json": b"{}\n",
+        "liquidations/flashbots_1010.json": b"{}\n",
+    }
@@ -7,10 +7,13 @@ from mev_inspect.classifiers.specs.uniswap import (
     UNISWAP_V2_PAIR_ABI_NAME,
     UNISWAP_V3_POOL_ABI_NAME,
 )
+from mev_inspect.classifiers.trace import TraceClassifier
+from mev_inspect.schemas import utils as schema_utils
 from mev_inspect.schemas.traces import Protocol
 from mev_inspect.swaps import get_swaps
 
 from .helpers import make_swap_trace, make_transfer_trace, make_unknown_trace
+from .utils import load_test_block
 
 
 def test_swaps(
@@ -245,3 +248,21 @@ def test_swaps(
     assert bancor_swap.token_in_amount == fourth_token_in_amount
     assert bancor_swap.token_out_address == fourth_token_out_address
     assert bancor_swap.token_out_amount == fourth_token_out_amount
+
+
+def test_swaps_match_with_strict_validation(
+    trace_classifier: TraceClassifier, monkeypatch
+):
+    block = load_test_block(12914944)
+
+    monkeypatch.setattr(schema_utils, "_strict_validation", False)
+    trusted_traces = trace_classifier.classify(block.traces)
+    trusted_swaps = get_swaps(trusted_traces)
+
+    monkeypatch.setattr(schema_utils, "_strict_validation", True)
+    strict_traces = TraceClassifier(decode_cache_size=0).classify(block.traces)
+    strict_swaps = get_swaps(strict_traces)
+
+    assert trusted_traces == strict_traces
+    assert trusted_swaps == strict_swaps
+    assert len(strict_swaps) == 51
@@ -0,0 +1,31 @@
+from mev_inspect.schemas.blocks import CallAction, CallResult
+from mev_inspect.schemas.traces import TraceType
+from mev_inspect.trace_store import BlockTraceStore
+from tests.utils import load_test_block
+
+
+def test_block_trace_store_matches_traces():
+    block = load_test_block(12914944)
+    store = BlockTraceStore(block.traces)
+
+    assert len(store) == len(block.traces)
+
+    for index, trace in enumerate(block.traces):
+        assert store.types[index] == trace.type
+        assert store.trace_addresses[index] == trace.trace_address
+
+        if trace.type == TraceType.call:
+            action = CallAction(**trace.action)
+            result = CallResult(**trace.result) if trace.result is not None else None
+
+            assert store.to_addresses[index] == action.to
+            assert store.from_addresses[index] == action.from_
+            assert store.values[index] == action.value
+            assert store.gas[index] == action.gas
+            assert store.gas_used[index] == (
+                result.gas_used if result is not None else None
+            )
+            assert store.inputs[index] == action.input
+        else:
+            assert store.to_addresses[index] is None
+            assert store.inputs[index] == ""
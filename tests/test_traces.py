@@ -1,7 +1,7 @@
 from typing import List
 
 from mev_inspect.schemas.traces import ClassifiedTrace
-from mev_inspect.traces import get_child_traces, is_child_trace_address
+from mev_inspect.traces import TraceTree, is_child_trace_address
 
 from .helpers import make_many_unknown_traces
 
@@ -19,7 +19,7 @@ def test_is_child_trace_address():
     assert not is_child_trace_address([100, 2, 10], [100, 1])
 
 
-def test_get_child_traces(get_transaction_hashes):
+def test_trace_tree_get_descendants(get_transaction_hashes):
     block_number = 123
     [first_hash, second_hash] = get_transaction_hashes(2)
 
@@ -75,16 +75,77 @@ def test_get_child_traces(get_transaction_hashes):
     )
 
 
+def test_trace_tree(get_transaction_hashes):
+    block_number = 123
+    [first_hash, second_hash] = get_transaction_hashes(2)
+
+    first_hash_trace_addresses = [
+        [1, 2],
+        [0, 0],
+        [],
+        [1, 0, 1],
+        [1],
+        [0],
+        [1, 0],
+        [1, 1],
+        [1, 0, 0],
+    ]
+    second_hash_trace_addresses = [[], [0], [1], [1, 0], [2]]
+
+    traces = make_many_unknown_traces(
+        block_number,
+        first_hash,
+        first_hash_trace_addresses,
+    ) + make_many_unknown_traces(
+        block_number,
+        second_hash,
+        second_hash_trace_addresses,
+    )
+
+    trace_tree = TraceTree(traces)
+
+    assert sorted(trace_tree.get_transaction_hashes()) == sorted(
+        [first_hash, second_hash]
+    )
+    assert get_trace_addresses(trace_tree.get_transaction_traces(first_hash)) == sorted(
+        first_hash_trace_addresses
+    )
+
+    assert get_trace_addresses(trace_tree.get_descendants(first_hash, [1])) == [
+        [1, 0],
+        [1, 0, 0],
+        [1, 0, 1],
+        [1, 1],
+        [1, 2],
+    ]
+    assert get_trace_addresses(trace_tree.get_descendants(second_hash, [2])) == []
+    assert get_trace_addresses(trace_tree.get_children(first_hash, [1])) == [
+        [1, 0],
+        [1, 1],
+        [1, 2],
+    ]
+
+    child_trace = trace_tree.get_trace(first_hash, [1, 0, 1])
+    assert child_trace is not None
+    assert child_trace.trace_address == [1, 0, 1]
+    assert child_trace.transaction_hash == first_hash
+
+    assert trace_tree.get_trace(first_hash, [5]) is None
+
+
+def get_trace_addresses(traces: List[ClassifiedTrace]) -> List[List[int]]:
+    return [trace.trace_address for trace in traces]
+
+
 def has_expected_child_traces(
     transaction_hash: str,
     parent_trace_address: List[int],
     traces: List[ClassifiedTrace],
     expected_trace_addresses: List[List[int]],
 ):
-    child_traces = get_child_traces(
+    child_traces = TraceTree(traces).get_descendants(
         transaction_hash,
         parent_trace_address,
-        traces,
     )
 
     distinct_trace_addresses = distinct_lists(expected_trace_addresses)
@@ -15,6 +15,7 @@ from mev_inspect.queue.tasks import (
     HIGH_PRIORITY_QUEUE,
     LOW_PRIORITY,
     LOW_PRIORITY_QUEUE,
+    backfill_export_range_task,
     backfill_export_task,
     inspect_many_blocks_task,
     realtime_export_task,
@@ -34,6 +35,9 @@ dramatiq.actor(
 dramatiq.actor(
     backfill_export_task, queue_name=LOW_PRIORITY_QUEUE, priority=LOW_PRIORITY
 )
+dramatiq.actor(
+    backfill_export_range_task, queue_name=LOW_PRIORITY_QUEUE, priority=LOW_PRIORITY
+)
 dramatiq.actor(
     realtime_export_task, queue_name=HIGH_PRIORITY_QUEUE, priority=HIGH_PRIORITY
 )